@@ -1,26 +1,8 @@
-import os
-from flask import Flask
-from flask_cors import CORS
-from flask_restplus import Api, Resource, reqparse
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, Blueprint
+from app.sharding import ShardedSQLAlchemy, init_sharding
 from instance.config import app_config
 from app.error_handler import JsonExceptionHandler
 
-app = Flask(__name__)
-CORS(app)
-
-CELERY_BROKER_URL = 'redis://localhost:6379',
-CELERY_RESULT_BACKEND = 'redis://localhost:6379'
-DEBUG = True
-MAIL_SERVER = 'smtp.gmail.com'
-MAIL_PORT = 587
-MAIL_USE_SSL = False
-MAIL_USE_TLS = True
-MAIL_USERNAME = os.getenv('MAIL_USERNAME')
-MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
-SECRET_KEY = os.getenv('SECRET_KEY')
-
-app.config.from_object(app_config[os.getenv('APP_SETTINGS')])
 authorization = {
     'apiKey': {
         'type': 'apiKey',
@@ -28,13 +10,53 @@ authorization = {
         'name': 'Authorization'
     }
 }
-api = Api(app, version='1.0',
-          authorizations=authorization,
-          title='Yummy Recipe RESTful API',
-          description='Yummy Recipes RESTful API with Endpoints.',
-          prefix='/api/v1')
-db = SQLAlchemy(app)
-from . import views
-JsonExceptionHandler(app)
+# every API route, the spec and the docs live under this path
+API_PREFIX = '/api/v1'
+# objects stay loaded after commit, handlers read them back without another SELECT
+db = ShardedSQLAlchemy(session_options={'expire_on_commit': False})
+
+
+def create_app(config_name):
+    """
+    Builds and configures a Flask app
+    :param config_name: one of the keys of instance.config.app_config
+    :return: Flask app
+    """
+    # imported here so that importing the package stays cheap for CLI commands and workers
+    from flask_cors import CORS
+    from flask_restplus import Api
+    from app import views
+    from app.apispec import CachedSpec
+    from app.compression import Compress
+    from app.metrics import Metrics
+    from app.profiling import Profiler
+    from app.ownership import Ownership
+
+    app = Flask(__name__)
+    app.config.from_object(app_config[config_name])
+    CORS(app)
+    init_sharding(app)
+    db.init_app(app)
+    Ownership(app)
+    # registered first so that it runs after every other after_request hook
+    Compress(app)
+    # next, so that profiles cover every other hook but compression
+    Profiler(app)
 
+    # the Swagger UI is optional, the JSON spec is always served
+    # the prefix is set on the blueprint, an Api prefix would leave swagger.json at the root
+    blueprint = Blueprint('api', __name__, url_prefix=API_PREFIX)
+    api = Api(blueprint, version='1.0',
+              authorizations=authorization,
+              title='Yummy Recipe RESTful API',
+              description='Yummy Recipes RESTful API with Endpoints.',
+              doc='/' if app.config.get('API_DOCS') else False)
+    for namespace in views.namespaces:
+        api.add_namespace(namespace)
+    app.register_blueprint(blueprint)
+    app.extensions['api'] = api
+    CachedSpec(app, api)
+    Metrics(app, api)
 
+    JsonExceptionHandler(app)
+    return app
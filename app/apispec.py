@@ -0,0 +1,49 @@
+import hashlib
+import json
+import os
+
+from flask import current_app, request
+
+
+def build_spec(app, api):
+    """
+    Renders the Swagger spec of an Api
+    :param app: Flask app the Api is registered on
+    :param api: flask_restplus Api
+    :return: spec serialized as JSON bytes
+    """
+    with app.test_request_context():
+        return json.dumps(api.__schema__, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class CachedSpec(object):
+    """
+    This class serves swagger.json from a spec built once at startup
+    :returns: spec with a strong ETag and long cache headers
+    """
+    def __init__(self, app, api):
+        """
+        Build or load the spec and take over the spec endpoint of the Api
+        :param app: Flask app
+        :param api: flask_restplus Api registered on the app
+        """
+        self.init_app(app, api)
+
+    def init_app(self, app, api):
+        path = app.config.get('API_SPEC_PATH')
+        if path and os.path.exists(path):
+            # spec exported at build time with `python manage.py export_spec`
+            with open(path, 'rb') as spec:
+                self.body = spec.read()
+        else:
+            self.body = build_spec(app, api)
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.max_age = app.config.get('API_SPEC_MAX_AGE', 86400)
+        app.view_functions[api.endpoint('specs')] = self.view
+
+    def view(self):
+        """Returns the cached spec, or 304 when the client already has it"""
+        response = current_app.response_class(self.body, mimetype='application/json')
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = 'public, max-age={}'.format(self.max_age)
+        return response.make_conditional(request)
@@ -0,0 +1,107 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    # brotli is optional, without it only gzip is offered
+    brotli = None
+
+
+class Compress(object):
+    """
+    This class compresses responses with gzip or brotli
+    negotiated from the Accept-Encoding header of the request
+    """
+    def __init__(self, app):
+        """
+        Initialize the app to compress outgoing responses
+        :param app: Flask app
+        """
+        self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.min_size = config.get('COMPRESS_MIN_SIZE', 500)
+        self.level = config.get('COMPRESS_LEVEL', 6)
+        self.br_level = config.get('COMPRESS_BR_LEVEL', 4)
+        self.mimetypes = config.get('COMPRESS_MIMETYPES', ['application/json'])
+        self.stream_threshold = config.get('COMPRESS_STREAM_THRESHOLD', 256 * 1024)
+        self.chunk_size = config.get('COMPRESS_CHUNK_SIZE', 64 * 1024)
+        self.cache_size = config.get('COMPRESS_CACHE_SIZE', 64)
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+        # compressed bodies of recent responses, keyed by ETag or body digest and encoding
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        app.extensions['compress'] = self
+        if config.get('COMPRESS_ENABLED', True):
+            app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304) or
+                response.direct_passthrough or 'Content-Encoding' in response.headers or
+                response.mimetype not in self.mimetypes):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if not encoding:
+            return response
+
+        if response.is_streamed:
+            response.response = self.stream(response.response, encoding)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            if len(body) >= self.stream_threshold:
+                chunks = (body[i:i + self.chunk_size] for i in range(0, len(body), self.chunk_size))
+                response.response = self.stream(chunks, encoding)
+            else:
+                response.set_data(self.cached(response, body, encoding))
+
+        if response.is_streamed:
+            response.headers.pop('Content-Length', None)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # the bytes on the wire differ from the identity body, as nginx does
+            response.set_etag(etag, weak=True)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def cached(self, response, body, encoding):
+        """Compresses a body, reusing the result for a response seen recently"""
+        etag = response.get_etag()[0]
+        key = (etag or hashlib.sha1(body).hexdigest(), encoding)
+        with self.lock:
+            data = self.cache.get(key)
+            if data is not None:
+                self.cache[key] = self.cache.pop(key)
+                return data
+        data = b''.join(self.stream([body], encoding))
+        with self.lock:
+            self.cache[key] = data
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return data
+
+    def stream(self, chunks, encoding):
+        """Compresses an iterable of chunks incrementally"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.br_level)
+            compress, finish = compressor.process, compressor.finish
+        else:
+            # wbits + 16 writes a gzip header and trailer
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, zlib.MAX_WBITS + 16)
+            compress, finish = compressor.compress, compressor.flush
+        for chunk in chunks:
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode('utf-8')
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
@@ -0,0 +1,38 @@
+"""Parsing of free-text cooking times such as '1 hour 30 minutes' into minutes."""
+import re
+
+# a number followed by an optional unit
+AMOUNT = re.compile(r"(\d+(?:\.\d+)?)\s*([a-z]*)")
+# between the ends of a range, '20-30 minutes' or '30 minutes to 1 hour'
+RANGE = re.compile(r"-|\bto\b")
+UNITS = {
+    'm': 1, 'min': 1, 'mins': 1, 'minute': 1, 'minutes': 1,
+    'h': 60, 'hr': 60, 'hrs': 60, 'hour': 60, 'hours': 60,
+    'd': 1440, 'day': 1440, 'days': 1440,
+}
+# largest value of an integer column
+MAX_MINUTES = 2 ** 31 - 1
+
+
+def parse_minutes(text):
+    """
+    Converts a cooking time to whole minutes, '1 hour 30 minutes' gives 90
+    A range counts as its upper end and a number without a unit as minutes.
+    :param text: free-text time of a recipe
+    :return: int, or None when no time can be read from the text
+    """
+    ends = [minutes for minutes in map(sum_minutes, RANGE.split((text or '').lower())) if minutes is not None]
+    if not ends:
+        return None
+    return min(int(round(max(ends))), MAX_MINUTES)
+
+
+def sum_minutes(text):
+    """Adds up the amounts of a time that is not a range, None when there is none"""
+    total, found = 0.0, False
+    for amount, unit in AMOUNT.findall(text):
+        if unit and unit not in UNITS:
+            continue
+        total += float(amount) * UNITS.get(unit, 1)
+        found = True
+    return total if found else None
@@ -0,0 +1,109 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+The first request sent with a key runs as usual and its response is stored
+for IDEMPOTENCY_TTL seconds. A retry with the same key gets the stored
+response back, with an Idempotent-Replayed header, without the handler, its
+validation or any query on the business tables running again.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, current_app, json, Response
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import IdempotencyKey, is_unique_violation
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 64
+
+
+def fingerprint():
+    """sha1 of the method, path and parsed body of the current request"""
+    content = [request.method, request.path, request.get_json(silent=True),
+               sorted(request.form.items(multi=True))]
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def error(message, status_code):
+    response = Response(json.dumps({"message": message, "status": "error"}), mimetype='application/json')
+    response.status_code = status_code
+    return response
+
+
+def replay(entry):
+    response = Response(entry.body, mimetype='application/json')
+    response.status_code = entry.status_code
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def claim(user_id, key, digest):
+    """
+    Stores a pending entry for a key, unless a live one already exists
+    :return: tuple of (new entry or None, existing entry or None)
+    """
+    ttl = current_app.config.get('IDEMPOTENCY_TTL', 86400)
+    existing = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+    if existing is not None:
+        if existing.date_created >= datetime.utcnow() - timedelta(seconds=ttl):
+            return None, existing
+        # deleted right away, the unit of work would insert the new entry before deleting the old one
+        IdempotencyKey.query.filter_by(id=existing.id).delete(synchronize_session=False)
+    entry = IdempotencyKey(user_id=user_id, key=key, fingerprint=digest)
+    db.session.add(entry)
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not is_unique_violation(e):
+            raise
+        # a concurrent request with the same key got there first
+        return None, IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+    return entry, None
+
+
+def idempotent(f):
+    """Replays the stored response of a POST retried with the same Idempotency-Key"""
+    @wraps(f)
+    def run(resource, user_id, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return f(resource, user_id, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return error("{} must be at most {} characters".format(HEADER, MAX_KEY_LENGTH), 400)
+
+        digest = fingerprint()
+        entry, existing = claim(user_id, key, digest)
+        if entry is None:
+            if existing is not None and existing.fingerprint != digest:
+                return error("{} was already used for a different request".format(HEADER), 422)
+            if existing is None or existing.status_code is None:
+                return error("A request with this {} is still in progress".format(HEADER), 409)
+            return replay(existing)
+
+        try:
+            result = f(resource, user_id, *args, **kwargs)
+        except Exception:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(id=entry.id).delete(synchronize_session=False)
+            db.session.commit()
+            raise
+        if isinstance(result, Response):
+            status_code, body = result.status_code, result.get_data(as_text=True)
+        else:
+            # restplus handlers may return (dict, status)
+            data, status_code = (result[0], result[1]) if isinstance(result, tuple) else (result, 200)
+            body = json.dumps(data)
+
+        if status_code >= 500:
+            # server errors are not stored, the retry runs again
+            IdempotencyKey.query.filter_by(id=entry.id).delete(synchronize_session=False)
+        else:
+            entry.status_code, entry.body = status_code, body
+            db.session.add(entry)
+        db.session.commit()
+        return result
+    return run
@@ -0,0 +1,48 @@
+"""Checks of uploaded recipe images and their thumbnails."""
+import io
+
+try:
+    from PIL import Image
+except ImportError:
+    # Pillow is optional, without it recipes keep only their original image
+    Image = None
+
+# content type to a test of the first bytes of the file
+SIGNATURES = {
+    'image/jpeg': lambda head: head.startswith(b'\xff\xd8\xff'),
+    'image/png': lambda head: head.startswith(b'\x89PNG\r\n\x1a\n'),
+    'image/gif': lambda head: head.startswith((b'GIF87a', b'GIF89a')),
+    'image/webp': lambda head: head.startswith(b'RIFF') and head[8:12] == b'WEBP',
+}
+FORMATS = {'image/jpeg': 'JPEG', 'image/png': 'PNG', 'image/gif': 'GIF', 'image/webp': 'WEBP'}
+
+
+class InvalidImage(Exception):
+    """Raised when an upload does not start like an image of its content type"""
+
+
+def image_chunks(stream, content_type, chunk_size=64 * 1024):
+    """Reads an upload in chunks, checking the first one matches the content type"""
+    chunk = stream.read(chunk_size)
+    if not SIGNATURES[content_type](chunk):
+        raise InvalidImage(content_type)
+    while chunk:
+        yield chunk
+        chunk = stream.read(chunk_size)
+
+
+def make_thumbnail(source, content_type, size):
+    """
+    Scales an image down to fit a size x size box
+    :param source: file object of the image
+    :return: bytes in the same format, None when Pillow is not installed
+    """
+    if Image is None:
+        return None
+    image = Image.open(source)
+    image.thumbnail((size, size))
+    if content_type == 'image/jpeg' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    output = io.BytesIO()
+    image.save(output, FORMATS[content_type])
+    return output.getvalue()
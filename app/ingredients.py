@@ -0,0 +1,75 @@
+"""Parsing of free-text recipe ingredients into (name, quantity, unit) rows."""
+import re
+
+SEPARATORS = re.compile(r"[,;\n]+")
+QUANTITY = re.compile(r"^(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)\s*")
+NOISE = re.compile(r"\([^)]*\)|[^a-z\s-]")
+UNITS = {
+    'cup': 'cup', 'cups': 'cup',
+    'tbsp': 'tbsp', 'tbs': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'g': 'g', 'gram': 'g', 'grams': 'g', 'kg': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'ml': 'ml', 'l': 'l', 'litre': 'l', 'litres': 'l', 'liter': 'l', 'liters': 'l',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz', 'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'pinch': 'pinch', 'pinches': 'pinch', 'dash': 'dash', 'handful': 'handful', 'handfuls': 'handful',
+    'clove': 'clove', 'cloves': 'clove', 'slice': 'slice', 'slices': 'slice',
+    'can': 'can', 'cans': 'can', 'piece': 'piece', 'pieces': 'piece',
+}
+MAX_NAME_LENGTH = 64
+
+
+def parse_quantity(text):
+    """Converts '2', '1.5', '1/2' or '1 1/2' to a float"""
+    total = 0.0
+    for part in text.split():
+        if '/' in part:
+            numerator, denominator = part.split('/')
+            if float(denominator):
+                total += float(numerator) / float(denominator)
+        else:
+            total += float(part)
+    return total
+
+
+def singular(word):
+    """Naive singular form, enough to match 'eggs' with 'egg'"""
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith('oes'):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')) and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def normalize(name):
+    """Normalizes an ingredient name for matching, e.g. 'Tomatoes (ripe)' -> 'tomato'"""
+    words = NOISE.sub(' ', name.lower()).split()
+    if words and words[0] == 'of':
+        words = words[1:]
+    return ' '.join(singular(word) for word in words)[:MAX_NAME_LENGTH]
+
+
+def parse_ingredients(text):
+    """
+    Splits a free-text ingredient list into parsed ingredients
+    :param text: e.g. '2 cups flour, 3 eggs; 1/2 tsp salt'
+    :return: list of (name, quantity, unit) tuples, one per distinct name
+    """
+    parsed, seen = [], set()
+    for item in SEPARATORS.split((text or '').lower()):
+        item = item.strip()
+        quantity = unit = None
+        match = QUANTITY.match(item)
+        if match:
+            quantity = parse_quantity(match.group(1))
+            item = item[match.end():]
+        words = item.split()
+        if words and words[0].rstrip('.') in UNITS:
+            unit = UNITS[words[0].rstrip('.')]
+            words = words[1:]
+        name = normalize(' '.join(words))
+        if name and name not in seen:
+            seen.add(name)
+            parsed.append((name, quantity, unit))
+    return parsed
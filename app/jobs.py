@@ -0,0 +1,137 @@
+"""
+Deferred work, queued in the jobs table and run by `python manage.py worker`.
+
+A function registered with @task(name) is queued with enqueue(name, payload)
+and the request can answer 202 right away. Workers claim due jobs with
+SELECT ... FOR UPDATE SKIP LOCKED, so several of them never run the same job,
+and retry failed ones with an exponential backoff. A claimed job is leased
+for JOBS_LEASE seconds: if its worker dies, another one picks it up again
+once the lease expires, so job functions have to be safe to run twice.
+With JOBS_EAGER the job runs inline instead, as in the tests.
+"""
+import json
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import Jobs
+
+TASKS = {}
+
+
+def task(name):
+    """Registers a function as the job of this name"""
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+
+def enqueue(name, payload, user_id=None):
+    """
+    Queues a job
+    :param payload: JSON serializable keyword arguments of the job's function
+    :param user_id: owner of the job, who may poll its status
+    :return: Jobs instance
+    """
+    config = current_app.config
+    job = Jobs(name=name, payload=json.dumps(payload), user_id=user_id,
+               max_attempts=config.get('JOBS_MAX_ATTEMPTS', 5))
+    eager = config.get('JOBS_EAGER', False)
+    if eager:
+        job.status, job.attempts = 'running', 1
+    db.session.add(job)
+    db.session.commit()
+    if eager:
+        run_job(job)
+    return job
+
+
+def claim():
+    """Takes the next due job, or one whose worker stopped, and leases it"""
+    now = datetime.utcnow()
+    job = Jobs.query.filter(Jobs.status.in_(('queued', 'running')), Jobs.run_at <= now) \
+        .order_by(Jobs.run_at).with_for_update(skip_locked=True).first()
+    if job is None:
+        db.session.rollback()
+        return None
+    job.status = 'running'
+    job.attempts += 1
+    job.run_at = now + timedelta(seconds=current_app.config.get('JOBS_LEASE', 300))
+    db.session.commit()
+    return job
+
+
+def run_job(job):
+    """Runs a claimed job and records the outcome, scheduling a retry when it failed"""
+    function = TASKS.get(job.name)
+    try:
+        if function is None:
+            raise LookupError('No task named {}'.format(job.name))
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Gave up after {} attempts'.format(job.max_attempts))
+        function(**json.loads(job.payload))
+    except Exception as error:
+        db.session.rollback()
+        job.last_error = '{}: {}'.format(type(error).__name__, error)[:500]
+        if function is not None and job.attempts < job.max_attempts:
+            delay = current_app.config.get('JOBS_RETRY_DELAY', 10) * 2 ** (job.attempts - 1)
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+        else:
+            job.status = 'failed'
+    else:
+        job.status = 'done'
+        job.last_error = None
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+class Worker(object):
+    """
+    This class runs queued jobs from several threads
+    :param app: Flask app
+    :param concurrency: number of threads, JOBS_CONCURRENCY by default
+    :param poll_interval: seconds to wait when the queue is empty, JOBS_POLL_INTERVAL by default
+    """
+
+    def __init__(self, app, concurrency=None, poll_interval=None):
+        self.app = app
+        self.concurrency = concurrency or app.config.get('JOBS_CONCURRENCY', 4)
+        self.poll_interval = poll_interval or app.config.get('JOBS_POLL_INTERVAL', 1.0)
+        self.stopping = threading.Event()
+
+    def run(self, once=False):
+        """
+        Runs jobs until interrupted
+        :param once: returns as soon as the queue is empty instead
+        """
+        threads = [threading.Thread(target=self.loop, args=(once,)) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            # running jobs are finished, the threads stop before the next one
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+
+    def loop(self, once):
+        while not self.stopping.is_set():
+            # a new app context per job, so a shard picked by one job does not leak into the next
+            with self.app.app_context():
+                job = claim()
+                if job is not None:
+                    run_job(job)
+                db.session.remove()
+            if job is None:
+                if once:
+                    return
+                self.stopping.wait(self.poll_interval)
@@ -0,0 +1,126 @@
+"""
+Prometheus metrics of the API, served at /metrics.
+
+Under gunicorn every worker is a separate process. When the
+prometheus_multiproc_dir environment variable is set (see gunicorn_config.py)
+the workers write their samples to files in that directory and /metrics adds
+them up, whichever worker answers the scrape.
+"""
+import os
+import time
+
+from flask import Response, request, g, has_app_context
+from prometheus_client import (Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST,
+                               generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import API_PREFIX
+
+# latency buckets in seconds, from a cached GET to a slow bcrypt login
+BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Time spent handling a request',
+                            ['namespace', 'route', 'method'], buckets=BUCKETS)
+REQUESTS = Counter('http_requests_total', 'Requests handled', ['namespace', 'route', 'method', 'status'])
+IN_PROGRESS = Gauge('http_requests_in_progress', 'Requests being handled', ['namespace'],
+                    multiprocess_mode='livesum')
+BCRYPT_SECONDS = Histogram('bcrypt_duration_seconds', 'Time spent hashing and checking passwords',
+                           ['operation'], buckets=BUCKETS)
+DB_SECONDS = Histogram('db_query_duration_seconds', 'Time spent running SQL statements', ['namespace'],
+                       buckets=BUCKETS)
+
+
+def current_namespace():
+    """Namespace label of the current request, background for threads, jobs and commands"""
+    return getattr(g, 'metrics_namespace', 'background') if has_app_context() else 'background'
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.time())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_started'].pop()
+    DB_SECONDS.labels(current_namespace()).observe(time.time() - started)
+
+
+def handle_error(context):
+    """A failed statement, e.g. a unique violation, never reaches after_cursor_execute"""
+    started = context.connection.info.get('metrics_started') if context.connection is not None else None
+    if started:
+        DB_SECONDS.labels(current_namespace()).observe(time.time() - started.pop())
+
+
+class Metrics(object):
+    """
+    This class records the latency, status and concurrency of requests
+    and serves every metric at /metrics
+    """
+    def __init__(self, app, api):
+        """
+        Initialize the app to record metrics
+        :param app: Flask app
+        :param api: flask-restplus Api whose namespaces label the metrics
+        """
+        self.init_app(app, api)
+
+    def init_app(self, app, api):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        # routes are labelled with the namespace of the longest matching path, recipes are nested under /category
+        self.prefixes = sorted((((API_PREFIX + namespace.path).rstrip('/') + '/', namespace.name)
+                                for namespace in api.namespaces if namespace.path.strip('/')),
+                               key=lambda item: len(item[0]), reverse=True)
+        self.namespaces = {}
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.export)
+        # every engine, shards included; listened to once however many apps are created
+        if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+            event.listen(Engine, 'handle_error', handle_error)
+
+    def namespace(self, route):
+        """Namespace of a route, looked up once per route"""
+        name = self.namespaces.get(route)
+        if name is None:
+            name = next((name for prefix, name in self.prefixes if (route + '/').startswith(prefix)),
+                        'none')
+            self.namespaces[route] = name
+        return name
+
+    def before_request(self):
+        if request.endpoint == 'metrics':
+            return
+        # unmatched urls share one label instead of one per url
+        g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.metrics_namespace = self.namespace(g.metrics_route)
+        # kept in the environ, the sub-requests of a batch share g but skip these hooks
+        request.environ['metrics.started'] = time.time()
+        IN_PROGRESS.labels(g.metrics_namespace).inc()
+
+    def after_request(self, response):
+        started = request.environ.get('metrics.started')
+        if started is not None:
+            labels = (g.metrics_namespace, g.metrics_route, request.method)
+            REQUEST_SECONDS.labels(*labels).observe(time.time() - started)
+            REQUESTS.labels(*(labels + (str(response.status_code),))).inc()
+        return response
+
+    def teardown_request(self, error):
+        # also runs when a request failed before after_request
+        if request.environ.pop('metrics.started', None) is not None:
+            IN_PROGRESS.labels(g.metrics_namespace).dec()
+
+    @staticmethod
+    def export():
+        """Metrics in the Prometheus text format, of every worker when running multi-process"""
+        if 'prometheus_multiproc_dir' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
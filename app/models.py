@@ -1,10 +1,35 @@
 import jwt
 from datetime import datetime, timedelta
-from app import db, app
+from flask import current_app
+from app import db
 from flask_bcrypt import Bcrypt
-import re
+from sqlalchemy import inspect, bindparam
+from sqlalchemy.ext import baked
+from app.ingredients import parse_ingredients
+from app.durations import parse_minutes
+from app.sharding import is_sharded, use_shard
+from app.metrics import BCRYPT_SECONDS
 
-INVALID_CHAR = re.compile(r"[<>/{}[\]~`*!@#$%^&()=+]")
+# the hottest lookups are built and compiled once per process, see benchmarks/queries.py
+bakery = baked.bakery()
+
+
+def hash_password(password):
+    """Bcrypt hash of a password, timed for the metrics"""
+    with BCRYPT_SECONDS.labels('hash').time():
+        return Bcrypt().generate_password_hash(password).decode()
+
+
+def is_unique_violation(error):
+    """True when an IntegrityError was raised by a unique constraint or index"""
+    # 23505 is unique_violation on Postgres, SQLite only reports it in the message
+    return getattr(error.orig, 'pgcode', None) == '23505' or 'UNIQUE constraint failed' in str(error.orig)
+
+
+def claim_shared_id(row):
+    """Gives a new category, recipe or image an id unique across shards, which it keeps when its user moves"""
+    if row.id is None and is_sharded():
+        row.id = SharedIds.next_id()
 
 
 class Users(db.Model):
@@ -16,24 +41,67 @@ class Users(db.Model):
     email = db.Column(db.String(40), nullable=False, unique=True)
     username = db.Column(db.String(40), nullable=False)
     password = db.Column(db.String(256), nullable=False)
+    # cleared when the user deletes their account, before their data is purged
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+    # children are removed by ON DELETE CASCADE instead of being loaded and deleted one by one
     categories = db.relationship(
-        'Categories', order_by='Categories.id', cascade='all, delete-orphan')
+        'Categories', order_by='Categories.id', cascade='all, delete-orphan', passive_deletes=True)
 
     def __init__(self, email, username, password):
         """Initialize user with email and password"""
         self.email = email
         self.username = username
-        self.password = Bcrypt().generate_password_hash(password).decode()
+        self.password = hash_password(password)
 
     def password_is_valid(self, password):
         """Validate password against its hash"""
-        return Bcrypt().check_password_hash(self.password, password)
+        with BCRYPT_SECONDS.labels('check').time():
+            return Bcrypt().check_password_hash(self.password, password)
 
     def save(self):
-        """Saves a user to the database"""
+        """Saves a user to the database, on their shard when users are sharded"""
+        if self.id is None and is_sharded():
+            # the directory hands out ids that are unique across shards
+            entry = UserDirectory(email=self.email)
+            db.session.add(entry)
+            db.session.flush()
+            self.id = entry.id
+            use_shard(self.id)
         db.session.add(self)
         db.session.commit()
 
+    @staticmethod
+    def by_email(email):
+        """Finds a user by email, switching to their shard when users are sharded"""
+        if is_sharded():
+            query = bakery(lambda session: session.query(UserDirectory))
+            query += lambda q: q.filter(db.func.lower(UserDirectory.email) == bindparam('email'))
+            entry = query(db.session()).params(email=email.lower()).first()
+            if entry is None:
+                return None
+            use_shard(entry.id)
+        # compared like ux_users_lower_email, which also serves the lookup
+        query = bakery(lambda session: session.query(Users))
+        query += lambda q: q.filter(db.func.lower(Users.email) == bindparam('email'))
+        return query(db.session()).params(email=email.lower()).first()
+
+    @staticmethod
+    def purge(user_id, batch_size=500):
+        """Deletes a user's recipes and categories in batches of batch_size, then their other rows and the user"""
+        for model in (Recipes, Categories):
+            while True:
+                batch = db.session.query(model.id).filter_by(user_id=user_id).limit(batch_size).subquery()
+                deleted = model.query.filter(model.id.in_(batch)).delete(synchronize_session=False)
+                db.session.commit()
+                if deleted < batch_size:
+                    break
+        # the stored responses hold the user's categories and recipes
+        IdempotencyKey.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        Users.query.filter_by(id=user_id).delete(synchronize_session=False)
+        if is_sharded():
+            UserDirectory.query.filter_by(id=user_id).delete(synchronize_session=False)
+        db.session.commit()
+
     @staticmethod
     def generate_token(user_id):
         """Generates access token for a user"""
@@ -51,7 +119,7 @@ class Users(db.Model):
             # create the byte string token using the payload and the SECRET
             jwt_token = jwt.encode(
                 payload,
-                app.config.get('SECRET_KEY'),
+                current_app.config.get('SECRET_KEY'),
                 algorithm='HS256'
             )
 
@@ -68,7 +136,7 @@ class Users(db.Model):
 
         try:
             # try to decode the token using SECRET
-            payload = jwt.decode(token, app.config.get('SECRET_KEY'))
+            payload = jwt.decode(token, current_app.config.get('SECRET_KEY'))
             return payload['sub']
         except jwt.ExpiredSignatureError:
             # token is valid but expired
@@ -78,6 +146,43 @@ class Users(db.Model):
             return 'invalid'
 
 
+# duplicates are rejected by the database, so inserts need no SELECT beforehand
+db.Index('ux_users_lower_email', db.func.lower(Users.email), unique=True)
+
+
+class UserDirectory(db.Model):
+    """This class defines the directory of users, used to find a user's shard by email"""
+
+    __tablename__ = "user_directory"
+    # kept on the first database only, see app.sharding
+    __table_args__ = {'info': {'directory': True}}
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(40), nullable=False)
+
+
+db.Index('ux_user_directory_lower_email', db.func.lower(UserDirectory.email), unique=True)
+
+
+class SharedIds(db.Model):
+    """This class hands out the ids of categories, recipes and images when users are sharded"""
+
+    __tablename__ = "shared_ids"
+    # on the first database like the user directory, AUTOINCREMENT stops SQLite from handing out an id twice
+    __table_args__ = {'info': {'directory': True}, 'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    @staticmethod
+    def next_id():
+        """Takes the next id, in the transaction of the first database"""
+        table = SharedIds.__table__
+        new_id = db.session.execute(table.insert(), mapper=SharedIds.__mapper__).inserted_primary_key[0]
+        # only the sequence is needed, the row is not kept
+        db.session.execute(table.delete().where(table.c.id == new_id), mapper=SharedIds.__mapper__)
+        return new_id
+
+
 class Categories(db.Model):
     """This class defines Categories tables."""
 
@@ -85,13 +190,14 @@ class Categories(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(30))
     desc = db.Column(db.String(255))
-    date_created = db.Column(db.DateTime, default=db.func.current_timestamp())
-    date_modified = db.Column(
-        db.DateTime, default=db.func.current_timestamp(),
-        onupdate=db.func.current_timestamp())
-    user_id = db.Column(db.Integer, db.ForeignKey(Users.id))
+    # dates are set in Python so that the session knows them without a SELECT after the write
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    date_modified = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey(Users.id, ondelete='CASCADE'))
+    # kept in step with the recipes table by Recipes.save, delete and move_to
+    recipe_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     recipes = db.relationship(
-        'Recipes', order_by='Recipes.id', cascade='all, delete-orphan')
+        'Recipes', order_by='Recipes.id', cascade='all, delete-orphan', passive_deletes=True)
 
     def __init__(self, name, desc, user_id):
         """Initialize Categories with name, desc and user_id"""
@@ -101,22 +207,65 @@ class Categories(db.Model):
 
     @staticmethod
     def update(name, desc, id):
-        category = Categories.query.filter_by(id=id).first()
+        # get() returns the instance already loaded by the view without a query
+        category = Categories.query.get(id)
         category.name = name
         category.desc = desc
         category.save()
         return category
 
+    @staticmethod
+    def patch(_id, user_id, values):
+        """
+        Updates only the given columns of a user's category with one UPDATE ... RETURNING
+        :param _id: id of the category
+        :param user_id: owner of the category
+        :param values: dict of column name to new value
+        :return: the updated row, or None when the user has no such category
+        """
+        table = Categories.__table__
+        row = db.session.execute(
+            table.update().where(db.and_(table.c.id == _id, table.c.user_id == user_id)).
+            values(**values).returning(*table.c)).first()
+        db.session.commit()
+        return row
+
     def save(self):
         """Saves Category to the database"""
+        claim_shared_id(self)
         db.session.add(self)
         db.session.commit()
 
+    @staticmethod
+    def adjust_recipe_count(category_id, delta):
+        """Adds delta to the recipe counter of a category, in the current transaction"""
+        # date_modified is passed through so that its onupdate default does not fire
+        Categories.query.filter_by(id=category_id).update(
+            {Categories.recipe_count: Categories.recipe_count + delta,
+             Categories.date_modified: Categories.date_modified}, synchronize_session=False)
+
+    @staticmethod
+    def repair_recipe_counts():
+        """Recomputes every recipe counter in one statement, returns the number of counters fixed"""
+        actual = db.select([db.func.count(Recipes.id)]).where(Recipes.category_id == Categories.id).as_scalar()
+        fixed = Categories.query.filter(Categories.recipe_count != actual).update(
+            {Categories.recipe_count: actual, Categories.date_modified: Categories.date_modified},
+            synchronize_session=False)
+        db.session.commit()
+        return fixed
+
     @staticmethod
     def get_all(user_id):
         """Returns all available Categories for a given user."""
         return Categories.query.filter_by(user_id=user_id)
 
+    @staticmethod
+    def owned(_id, user_id):
+        """Returns the category with id = _id if it belongs to the user, None otherwise"""
+        query = bakery(lambda session: session.query(Categories))
+        query += lambda q: q.filter(Categories.id == bindparam('id'), Categories.user_id == bindparam('user_id'))
+        return query(db.session()).params(id=_id, user_id=user_id).first()
+
     @staticmethod
     def get_single(_id):
         """Returns all available Categories for a given user."""
@@ -127,18 +276,14 @@ class Categories(db.Model):
         db.session.delete(self)
         db.session.commit()
 
-    @staticmethod
-    def validate_input(**kwargs):
-        if kwargs:
-            for key in kwargs:
-                if INVALID_CHAR.search(kwargs[key]):
-                    return key
-
     def __repr__(self):
         """Returns a representation of a Category."""
         return "<Category: {}>".format(self.name)
 
 
+db.Index('ux_categories_user_id_lower_name', Categories.user_id, db.func.lower(Categories.name), unique=True)
+
+
 class Recipes(db.Model):
     """This class defines recipes table"""
 
@@ -147,14 +292,15 @@ class Recipes(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(30))
     time = db.Column(db.String(30))
+    # time read from the text above, None when it could not be parsed
+    time_minutes = db.Column(db.Integer)
     ingredients = db.Column(db.String(256))
     procedure = db.Column(db.String(256))
-    category_id = db.Column(db.Integer, db.ForeignKey(Categories.id))
-    user_id = db.Column(db.Integer, db.ForeignKey(Users.id))
-    date_created = db.Column(db.DateTime, default=db.func.current_timestamp())
-    date_modified = db.Column(
-        db.DateTime, default=db.func.current_timestamp(),
-        onupdate=db.func.current_timestamp())
+    category_id = db.Column(db.Integer, db.ForeignKey(Categories.id, ondelete='CASCADE'))
+    user_id = db.Column(db.Integer, db.ForeignKey(Users.id, ondelete='CASCADE'))
+    # set in Python like the dates of Categories
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    date_modified = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __init__(self, name, time, ingredients, procedure, category_id, user_id):
         """Initialize Recipes with name, time, ingredient, procedure, category_id"""
@@ -167,14 +313,25 @@ class Recipes(db.Model):
         self.user_id = user_id
 
     def save(self):
-        """Saves Recipes to the database"""
+        """Saves Recipes to the database, re-parsing the time and ingredients when they changed"""
+        new = self.id is None
+        changed = new or inspect(self).attrs.ingredients.history.has_changes()
+        if new or inspect(self).attrs.time.history.has_changes():
+            self.time_minutes = parse_minutes(self.time)
+        claim_shared_id(self)
         db.session.add(self)
+        if new:
+            Categories.adjust_recipe_count(self.category_id, 1)
+        if changed:
+            # flushed first so that a new recipe has an id for its ingredient rows
+            db.session.flush()
+            RecipeIngredient.replace(self, new=new)
         db.session.commit()
 
     @staticmethod
     def update(name, time, ingredients, procedure, _id):
         """Updates an existing recipe"""
-        recipe = Recipes.query.filter_by(id=_id).first()
+        recipe = Recipes.query.get(_id)
         recipe.name = name
         recipe.time = time
         recipe.ingredients = ingredients
@@ -182,10 +339,69 @@ class Recipes(db.Model):
         recipe.save()
         return recipe
 
+    @staticmethod
+    def patch(_id, category_id, user_id, values):
+        """
+        Updates only the given columns of a user's recipe with one UPDATE ... RETURNING
+        :param _id: id of the recipe
+        :param category_id: category the recipe is in now
+        :param user_id: owner of the recipe
+        :param values: dict of column name to new value, a new category_id moves the recipe
+        :return: the updated row, or None when the user has no such recipe
+        """
+        table = Recipes.__table__
+        if 'time' in values:
+            values = dict(values, time_minutes=parse_minutes(values['time']))
+        row = db.session.execute(
+            table.update().where(db.and_(table.c.id == _id, table.c.category_id == category_id,
+                                         table.c.user_id == user_id)).
+            values(**values).returning(*table.c)).first()
+        if row is None:
+            db.session.rollback()
+            return None
+        if row.category_id != category_id:
+            Categories.adjust_recipe_count(category_id, -1)
+            Categories.adjust_recipe_count(row.category_id, 1)
+        if 'ingredients' in values:
+            RecipeIngredient.replace(row)
+        db.session.commit()
+        return row
+
+    def move_to(self, category_id):
+        """Moves a recipe to another category of the same user"""
+        if category_id != self.category_id:
+            Categories.adjust_recipe_count(self.category_id, -1)
+            Categories.adjust_recipe_count(category_id, 1)
+            self.category_id = category_id
+        self.save()
+
     def delete(self):
+        Categories.adjust_recipe_count(self.category_id, -1)
         db.session.delete(self)
         db.session.commit()
 
+    @staticmethod
+    def previews(category_ids, per_category, *options):
+        """
+        Returns the newest recipes of several categories with a single windowed query
+        :param category_ids: ids of the categories
+        :param per_category: number of recipes per category
+        :param options: query options such as load_only
+        :return: dict of category_id to list of recipes, newest first
+        """
+        position = db.func.row_number().over(
+            partition_by=Recipes.category_id,
+            order_by=(Recipes.date_created.desc(), Recipes.id.desc())).label('position')
+        ranked = db.session.query(Recipes.id.label('id'), position).\
+            filter(Recipes.category_id.in_(category_ids)).subquery()
+        recipes = Recipes.query.join(ranked, ranked.c.id == Recipes.id).\
+            filter(ranked.c.position <= per_category).\
+            order_by(Recipes.category_id, ranked.c.position).options(*options)
+        previews = {}
+        for recipe in recipes:
+            previews.setdefault(recipe.category_id, []).append(recipe)
+        return previews
+
     @staticmethod
     def get_all(category_id):
         """Returns all recipes belonging to a Category"""
@@ -194,13 +410,122 @@ class Recipes(db.Model):
     @staticmethod
     def get_single(_id, category_id):
         """Returns a single recipe by with id = _id"""
-        return Recipes.query.filter_by(id=_id, category_id=category_id).first()
+        query = bakery(lambda session: session.query(Recipes))
+        query += lambda q: q.filter(Recipes.id == bindparam('id'), Recipes.category_id == bindparam('category_id'))
+        return query(db.session()).params(id=_id, category_id=category_id).first()
 
     def __repr__(self):
         """Returns an instance of Recipe"""
         return "<Recipe: {}>".format(self.id)
 
 
+db.Index('ux_recipes_category_id_lower_name', Recipes.category_id, db.func.lower(Recipes.name), unique=True)
+# the listing filters on category_id, these serve its time range and sort=time|date_created
+db.Index('ix_recipes_category_id_time_minutes', Recipes.category_id, Recipes.time_minutes)
+db.Index('ix_recipes_category_id_date_created', Recipes.category_id, Recipes.date_created)
+
+
+class RecipeIngredient(db.Model):
+    """This class defines the parsed ingredients of recipes"""
+
+    __tablename__ = "recipe_ingredients"
+    __table_args__ = (
+        # backs the "what can I cook" lookup of a user's recipes by ingredient name
+        db.Index('ix_recipe_ingredients_user_id_name', 'user_id', 'name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey(Recipes.id, ondelete='CASCADE'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey(Users.id, ondelete='CASCADE'), nullable=False)
+    name = db.Column(db.String(64), nullable=False)
+    quantity = db.Column(db.Float)
+    unit = db.Column(db.String(16))
+
+    @staticmethod
+    def replace(recipe, new=False):
+        """Replaces the parsed ingredient rows of a recipe, in the current transaction"""
+        table = RecipeIngredient.__table__
+        if not new:
+            db.session.execute(table.delete().where(table.c.recipe_id == recipe.id))
+        rows = [{'recipe_id': recipe.id, 'user_id': recipe.user_id, 'name': name, 'quantity': quantity, 'unit': unit}
+                for name, quantity, unit in parse_ingredients(recipe.ingredients)]
+        if rows:
+            db.session.execute(table.insert(), rows)
+
+    @staticmethod
+    def cookable(user_id, names, limit=10):
+        """
+        Ranks a user's recipes by how many of their ingredients are in names
+        :param user_id: owner of the recipes
+        :param names: normalized ingredient names on hand
+        :param limit: maximum number of recipes returned
+        :return: list of (recipe, matched, total) ordered by coverage
+        """
+        candidates = db.session.query(RecipeIngredient.recipe_id).\
+            filter(RecipeIngredient.user_id == user_id, RecipeIngredient.name.in_(names))
+        matched = db.func.sum(db.case([(RecipeIngredient.name.in_(names), 1)], else_=0))
+        total = db.func.count(RecipeIngredient.id)
+        ranking = db.session.query(RecipeIngredient.recipe_id.label('recipe_id'),
+                                   matched.label('matched'), total.label('total')).\
+            filter(RecipeIngredient.recipe_id.in_(candidates.subquery())).\
+            group_by(RecipeIngredient.recipe_id).subquery()
+        return db.session.query(Recipes, ranking.c.matched, ranking.c.total).\
+            join(ranking, ranking.c.recipe_id == Recipes.id).\
+            order_by((ranking.c.matched * 1.0 / ranking.c.total).desc(), ranking.c.matched.desc(), Recipes.id).\
+            limit(limit).all()
+
+    @staticmethod
+    def names_by_recipe(recipe_ids):
+        """Returns the ingredient names of each recipe as a dict of sets"""
+        names = {}
+        rows = db.session.query(RecipeIngredient.recipe_id, RecipeIngredient.name).\
+            filter(RecipeIngredient.recipe_id.in_(recipe_ids))
+        for recipe_id, name in rows:
+            names.setdefault(recipe_id, set()).add(name)
+        return names
+
+    def __repr__(self):
+        return "<RecipeIngredient: {} {}>".format(self.recipe_id, self.name)
+
+
+class RecipeImage(db.Model):
+    """This class defines the photos of recipes, the files themselves are kept by app.storage"""
+
+    __tablename__ = "recipe_images"
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey(Recipes.id, ondelete='CASCADE'), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey(Users.id, ondelete='CASCADE'), nullable=False)
+    # storage key of the original, the thumbnail is stored under key + '-thumb'
+    key = db.Column(db.String(128), nullable=False)
+    content_type = db.Column(db.String(32), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    # sha1 of the file, changes the image urls when the image is replaced
+    digest = db.Column(db.String(40), nullable=False)
+    has_thumbnail = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    date_created = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    @property
+    def thumbnail_key(self):
+        return self.key + '-thumb'
+
+    def save(self):
+        """Saves an image to the database"""
+        claim_shared_id(self)
+        db.session.add(self)
+        db.session.commit()
+
+    @staticmethod
+    def keys_of_category(category_id):
+        """Storage keys of the images of a category's recipes, to delete along with it"""
+        rows = db.session.query(RecipeImage.key).join(Recipes, Recipes.id == RecipeImage.recipe_id).\
+            filter(Recipes.category_id == category_id).all()
+        return [key for key, in rows] + [key + '-thumb' for key, in rows]
+
+    def __repr__(self):
+        return "<RecipeImage: {}>".format(self.recipe_id)
+
+
 class Blacklist(db.Model):
     """ Model for blacklisted tokens"""
     __tablename__ = "blacklist"
@@ -208,10 +533,82 @@ class Blacklist(db.Model):
     token_id = db.Column(db.Integer, unique=True,
                          primary_key=True, autoincrement=True)
     revoked_token = db.Column(db.String(500), nullable=False)
+    # lets resharding move a user's revoked tokens along with them
+    user_id = db.Column(db.Integer)
 
     def save(self):
         db.session.add(self)
         db.session.commit()
 
+    @staticmethod
+    def is_revoked(token, user_id):
+        """Checks in one query if a token was logged out or its user deleted their account"""
+        query = bakery(lambda session: session.query(db.or_(
+            session.query(Blacklist.token_id).filter(Blacklist.revoked_token == bindparam('token')).exists(),
+            ~session.query(Users.id).filter(Users.id == bindparam('user_id'), Users.is_active == db.true()).exists())))
+        return query(db.session()).params(token=token, user_id=user_id).scalar()
+
     def __repr__(self):
         return "<Revoked token: {}".format(self.revoked_tokens)
+
+
+class IdempotencyKey(db.Model):
+    """This class defines the first responses of POST requests sent with an Idempotency-Key header"""
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='ux_idempotency_keys_user_id_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    # sha1 of the method, path and body, a key cannot be reused for another request
+    fingerprint = db.Column(db.String(40), nullable=False)
+    # null while the first request is still running
+    status_code = db.Column(db.Integer)
+    body = db.Column(db.Text)
+    date_created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @staticmethod
+    def expire(ttl):
+        """Deletes the keys older than ttl seconds, returns how many were deleted"""
+        deleted = IdempotencyKey.query.filter(
+            IdempotencyKey.date_created < datetime.utcnow() - timedelta(seconds=ttl)).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def __repr__(self):
+        return "<IdempotencyKey: {} {}>".format(self.user_id, self.key)
+
+
+class Jobs(db.Model):
+    """This class defines the queue of deferred work, run by `python manage.py worker`"""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # backs the worker's lookup of the next job that is due
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        # kept on the first database with the user directory, see app.sharding
+        {'info': {'directory': True}},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False)
+    # JSON keyword arguments of the job's function
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    # queued, running, done or failed
+    status = db.Column(db.String(16), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    # when a queued job is due, or when the lease of a running job expires
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(500))
+    user_id = db.Column(db.Integer)
+    date_created = db.Column(db.DateTime, default=db.func.current_timestamp())
+    date_modified = db.Column(
+        db.DateTime, default=db.func.current_timestamp(),
+        onupdate=db.func.current_timestamp())
+
+    def __repr__(self):
+        return "<Jobs: {} {}>".format(self.name, self.status)
@@ -0,0 +1,83 @@
+"""
+Category ownership checks shared by the recipe endpoints.
+
+An answer is remembered for the rest of the request, batches included. With
+OWNERSHIP_CACHE_TTL the categories a user owns are also kept in a small
+process cache for that many seconds. Deleting a category only clears the
+cache of the process that deleted it, so other gunicorn workers may still
+accept the category until the entry expires; keep the TTL short.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g
+
+from app.models import Categories
+
+
+class Ownership(object):
+    """
+    This class caches which categories belong to which user
+    """
+    def __init__(self, app):
+        """
+        Initialize the app with an ownership cache
+        :param app: Flask app
+        """
+        self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('OWNERSHIP_CACHE_TTL', 0)
+        self.size = app.config.get('OWNERSHIP_CACHE_SIZE', 10000)
+        # (category_id, user_id) to expiry time, only categories that were found
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        app.extensions['ownership'] = self
+
+    def cached(self, key):
+        with self.lock:
+            expires = self.cache.get(key)
+            if expires is None:
+                return False
+            # re-inserted at the most recently used end, Python 2 has no OrderedDict.move_to_end
+            del self.cache[key]
+            if expires < time.time():
+                return False
+            self.cache[key] = expires
+            return True
+
+    def remember(self, key):
+        with self.lock:
+            self.cache.pop(key, None)
+            self.cache[key] = time.time() + self.ttl
+            while len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+
+    def forget(self, category_id=None, user_id=None):
+        with self.lock:
+            for key in [key for key in self.cache if key[0] == category_id or key[1] == user_id]:
+                del self.cache[key]
+
+
+def owns_category(category_id, user_id):
+    """True when the category belongs to the user, looked up at most once per request"""
+    key = (category_id, user_id)
+    answers = g.setdefault('owned_categories', {})
+    if key not in answers:
+        ownership = current_app.extensions['ownership']
+        if ownership.ttl and ownership.cached(key):
+            answers[key] = True
+        else:
+            answers[key] = Categories.owned(category_id, user_id) is not None
+            if answers[key] and ownership.ttl:
+                ownership.remember(key)
+    return answers[key]
+
+
+def forget_category(category_id=None, user_id=None):
+    """Drops a deleted category, or every category of a deleted user, from the caches"""
+    answers = g.get('owned_categories', {})
+    for key in [key for key in answers if key[0] == category_id or key[1] == user_id]:
+        del answers[key]
+    current_app.extensions['ownership'].forget(category_id, user_id)
@@ -0,0 +1,111 @@
+"""
+Opt-in cProfile profiles of single requests.
+
+With PROFILE_ENABLED a request is profiled when it carries the PROFILE_HEADER
+header set to PROFILE_TOKEN, or at random for PROFILE_SAMPLE_RATE of the
+requests. Each profile is written to PROFILE_DIR with the endpoint and the
+duration in its name, `python manage.py profile_summary` adds them up.
+"""
+import cProfile
+import os
+import pstats
+import random
+import re
+import time
+from collections import defaultdict
+
+from flask import request
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+UNSAFE = re.compile(r"[^A-Za-z0-9_.]+")
+
+
+class Profiler(object):
+    """
+    This class profiles requests picked by header or sampling
+    and writes one .prof file per request
+    """
+    def __init__(self, app):
+        """
+        Initialize the app to profile requests
+        :param app: Flask app
+        """
+        self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.token = config.get('PROFILE_TOKEN')
+        self.header = config.get('PROFILE_HEADER', 'X-Profile')
+        self.sample_rate = config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.directory = config.get('PROFILE_DIR', 'profiles')
+        if not config.get('PROFILE_ENABLED', False) or not (self.token or self.sample_rate):
+            return
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def wanted(self):
+        """True when the current request should be profiled"""
+        if self.token and request.headers.get(self.header) == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def before_request(self):
+        if self.wanted():
+            profiler = cProfile.Profile()
+            # kept in the environ, the sub-requests of a batch share g and tear down their own context
+            request.environ['profiling.started'] = time.time()
+            request.environ['profiling.profiler'] = profiler
+            profiler.enable()
+
+    def after_request(self, response):
+        profiler = request.environ.pop('profiling.profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            started = request.environ['profiling.started']
+            milliseconds = int((time.time() - started) * 1000)
+            endpoint = UNSAFE.sub('_', request.endpoint or 'unmatched')
+            name = '{}-{}-{}-{}ms.prof'.format(int(started * 1000), endpoint, request.method, milliseconds)
+            profiler.dump_stats(os.path.join(self.directory, name))
+        return response
+
+    def teardown_request(self, error):
+        # after_request does not run when the request raised, the profiler must not stay on for the thread
+        profiler = request.environ.pop('profiling.profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+
+def summarize(directory, limit=20, endpoint=None):
+    """
+    Adds up the profiles written to a directory
+    :param limit: number of functions listed, by cumulative time
+    :param endpoint: only the profiles of this endpoint
+    :return: text report, None when there is no profile
+    """
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.prof'))
+    if endpoint:
+        files = [name for name in files if name.split('-')[1] == UNSAFE.sub('_', endpoint)]
+    if not files:
+        return None
+
+    durations = defaultdict(list)
+    for name in files:
+        _, route, method, milliseconds = name[:-len('ms.prof')].split('-')
+        durations[(route, method)].append(int(milliseconds))
+    output = StringIO()
+    output.write('{:<40} {:>6} {:>10} {:>10}\n'.format('endpoint', 'count', 'mean ms', 'max ms'))
+    for (route, method), values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        output.write('{:<40} {:>6} {:>10} {:>10}\n'.format(
+            '{} {}'.format(method, route), len(values), sum(values) // len(values), max(values)))
+    output.write('\n')
+
+    stats = pstats.Stats(*[os.path.join(directory, name) for name in files], stream=output)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
@@ -0,0 +1,202 @@
+"""Bulk generation of synthetic users, categories and recipes.
+
+Rows are generated in batches from a seeded random generator and streamed
+into Postgres with ``COPY`` so millions of rows can be loaded without going
+through the ORM, bcrypt or one commit per object.
+"""
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from flask_bcrypt import Bcrypt
+
+from app.ingredients import parse_ingredients
+from app.durations import parse_minutes
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+WORDS = ['apple', 'basil', 'bean', 'beef', 'bread', 'butter', 'cake', 'carrot',
+         'cheese', 'chicken', 'chili', 'corn', 'curry', 'egg', 'fish', 'garlic',
+         'ginger', 'honey', 'lamb', 'lemon', 'lentil', 'mango', 'milk', 'mint',
+         'mushroom', 'noodle', 'oat', 'onion', 'pasta', 'pea', 'pepper', 'pie',
+         'pork', 'potato', 'rice', 'salad', 'salt', 'soup', 'spinach', 'stew',
+         'sugar', 'tofu', 'tomato', 'vanilla', 'yam', 'yogurt']
+UNITS = ['cup', 'cups', 'tbsp', 'tsp', 'g', 'kg', 'ml', 'pinch']
+TIMES = ['10 minutes', '15 minutes', '20 minutes', '30 minutes', '45 minutes',
+         '1 hour', '1 hour 30 minutes', '2 hours', '3 hours']
+STEPS = ['stir', 'bake', 'boil', 'fry', 'chop', 'mix', 'simmer', 'grill', 'serve']
+# fixed anchor so that the same seed always produces the same timestamps
+EPOCH = datetime(2018, 1, 1)
+
+
+def parse_distribution(spec):
+    """
+    Builds a sampler from a distribution spec.
+    :param spec: one of ``fixed:N``, ``uniform:LOW:HIGH``, ``poisson:MEAN``
+                 or ``pareto:ALPHA:MAX``
+    :return: callable taking a random.Random and returning a count >= 0
+    """
+    parts = str(spec).split(':')
+    kind, args = parts[0], parts[1:]
+    try:
+        if kind == 'fixed' and len(args) == 1:
+            n = int(args[0])
+            return lambda rng: n
+        if kind == 'uniform' and len(args) == 2:
+            low, high = int(args[0]), int(args[1])
+            if low > high:
+                raise ValueError(spec)
+            return lambda rng: rng.randint(low, high)
+        if kind == 'poisson' and len(args) == 1:
+            mean = float(args[0])
+            return lambda rng: _poisson(rng, mean)
+        if kind == 'pareto' and len(args) == 2:
+            alpha, maximum = float(args[0]), int(args[1])
+            return lambda rng: min(maximum, int(rng.paretovariate(alpha)) - 1)
+    except ValueError:
+        pass
+    raise ValueError("Invalid distribution '{}'".format(spec))
+
+
+def _poisson(rng, mean):
+    """Samples a Poisson variate, using a normal approximation for large means"""
+    if mean > 30:
+        return max(0, int(round(rng.gauss(mean, math.sqrt(mean)))))
+    limit, k, p = math.exp(-mean), 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+def _copy_row(values):
+    """Formats one row in Postgres COPY text format"""
+    fields = []
+    for value in values:
+        if value is None:
+            fields.append('\\N')
+        else:
+            fields.append(str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n'))
+    return '\t'.join(fields) + '\n'
+
+
+class Seeder(object):
+    """
+    Generates synthetic users with categories and recipes and bulk loads them
+    """
+    def __init__(self, db, users, categories='uniform:1:5', recipes='uniform:0:20',
+                 batch_size=5000, seed=None, password='password', days=365, out=sys.stderr):
+        """
+        :param db: Flask-SQLAlchemy instance bound to a Postgres database
+        :param users: number of users to create
+        :param categories: distribution spec for categories per user
+        :param recipes: distribution spec for recipes per category
+        :param batch_size: users generated and copied per transaction
+        :param seed: seed for deterministic output
+        :param password: password shared by every generated user
+        :param days: spread of date_created values back from EPOCH
+        """
+        self.db = db
+        self.users = users
+        self.categories = parse_distribution(categories)
+        self.recipes = parse_distribution(recipes)
+        self.batch_size = max(1, batch_size)
+        self.rng = random.Random(seed)
+        self.password = password
+        self.days = days
+        self.out = out
+
+    def run(self):
+        """Generates and loads every batch, returns the number of rows per table"""
+        # one hash shared by every user, bcrypt is by far the most expensive step
+        password_hash = Bcrypt().generate_password_hash(self.password).decode()
+        connection = self.db.engine.raw_connection()
+        totals = {'users': 0, 'categories': 0, 'recipes': 0}
+        started = time.time()
+        try:
+            cursor = connection.cursor()
+            ids = dict((table, self._max_id(cursor, table)) for table in totals)
+            done = 0
+            while done < self.users:
+                size = min(self.batch_size, self.users - done)
+                buffers = self._generate_batch(size, ids, password_hash, totals)
+                for table, columns in (('users', 'id, email, username, password'),
+                                       ('categories', 'id, name, "desc", date_created, date_modified, user_id, '
+                                                      'recipe_count'),
+                                       ('recipes', 'id, name, time, time_minutes, ingredients, procedure, '
+                                                   'category_id, user_id, date_created, date_modified'),
+                                       ('recipe_ingredients', 'recipe_id, user_id, name, quantity, unit')):
+                    buffers[table].seek(0)
+                    cursor.copy_expert('COPY {} ({}) FROM STDIN'.format(table, columns), buffers[table])
+                connection.commit()
+                done += size
+                self._report(done, totals, started)
+            for table in totals:
+                cursor.execute("SELECT setval(pg_get_serial_sequence('{0}', 'id'), "
+                               "(SELECT coalesce(max(id), 1) FROM {0}))".format(table))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        return totals
+
+    @staticmethod
+    def _max_id(cursor, table):
+        cursor.execute('SELECT coalesce(max(id), 0) FROM {}'.format(table))
+        return cursor.fetchone()[0]
+
+    def _generate_batch(self, size, ids, password_hash, totals):
+        """Generates one batch of rows into COPY buffers"""
+        rng = self.rng
+        buffers = {'users': StringIO(), 'categories': StringIO(), 'recipes': StringIO(),
+                   'recipe_ingredients': StringIO()}
+        for _ in range(size):
+            ids['users'] += 1
+            user_id = ids['users']
+            buffers['users'].write(_copy_row((
+                user_id, 'user{}@seed.example.com'.format(user_id),
+                'user{}'.format(user_id), password_hash)))
+            totals['users'] += 1
+
+            for c in range(self.categories(rng)):
+                ids['categories'] += 1
+                category_id = ids['categories']
+                created = self._timestamp()
+                recipe_count = self.recipes(rng)
+                buffers['categories'].write(_copy_row((
+                    category_id, '{} {}'.format(rng.choice(WORDS), c + 1),
+                    'seeded {} dishes'.format(rng.choice(WORDS)), created, created, user_id, recipe_count)))
+                totals['categories'] += 1
+
+                for r in range(recipe_count):
+                    ids['recipes'] += 1
+                    created = self._timestamp()
+                    ingredients = ', '.join('{} {} {}'.format(rng.randint(1, 5), rng.choice(UNITS), rng.choice(WORDS))
+                                            for _ in range(rng.randint(2, 6)))
+                    cooking_time = rng.choice(TIMES)
+                    buffers['recipes'].write(_copy_row((
+                        ids['recipes'], '{} {} {}'.format(rng.choice(WORDS), rng.choice(WORDS), r + 1),
+                        cooking_time, parse_minutes(cooking_time), ingredients,
+                        ' then '.join(rng.choice(STEPS) for _ in range(rng.randint(1, 4))),
+                        category_id, user_id, created, created)))
+                    for name, quantity, unit in parse_ingredients(ingredients):
+                        buffers['recipe_ingredients'].write(_copy_row((ids['recipes'], user_id, name, quantity, unit)))
+                    totals['recipes'] += 1
+        return buffers
+
+    def _timestamp(self):
+        return EPOCH - timedelta(seconds=self.rng.randint(0, self.days * 86400))
+
+    def _report(self, done, totals, started):
+        elapsed = max(time.time() - started, 1e-6)
+        rows = sum(totals.values())
+        self.out.write('users {}/{} categories {} recipes {} ({:.0f} rows/s)\n'.format(
+            done, self.users, totals['categories'], totals['recipes'], rows / elapsed))
+        self.out.flush()
@@ -0,0 +1,217 @@
+"""
+Routing of users and their data to one of several databases.
+
+SQLALCHEMY_SHARDS lists the database URIs. The first one is the usual
+SQLALCHEMY_DATABASE_URI and also holds the user directory, which maps emails to
+user ids and hands out the ids, the shared ids of categories, recipes and images,
+and the job queue. Everything else a user owns lives on the shard picked by a
+hash of their id. Every request works for a single user, so once the user is
+known all the queries of the request go to their shard.
+"""
+import zlib
+
+import jwt
+
+from flask import g, has_app_context, current_app
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import func, orm, select as db_select
+
+
+def shard_uris(app):
+    """The database URIs of an app, a single one when it is not sharded"""
+    return app.config.get('SQLALCHEMY_SHARDS') or [app.config['SQLALCHEMY_DATABASE_URI']]
+
+
+def init_sharding(app):
+    """Registers every shard but the first as a Flask-SQLAlchemy bind, before db.init_app"""
+    uris = shard_uris(app)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uris[0]
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.update((bind_key(shard), uri) for shard, uri in enumerate(uris) if shard)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def is_sharded():
+    return len(shard_uris(current_app)) > 1
+
+
+def bind_key(shard):
+    """Flask-SQLAlchemy bind of a shard, the first one is the default database"""
+    return 'shard{}'.format(shard) if shard else None
+
+
+def shard_for(user_id, count=None):
+    """Shard of a user, stable across processes and Python versions"""
+    count = count or len(shard_uris(current_app))
+    return zlib.crc32(str(user_id).encode()) % count
+
+
+def use_shard(user_id):
+    """Sends the remaining queries of the request, or app context, to the user's shard"""
+    g.shard = shard_for(user_id)
+
+
+class ShardedSession(SignallingSession):
+    """Session that runs every statement on the shard of the current user"""
+
+    def __init__(self, db, **options):
+        # SignallingSession only keeps the app, the engines of the shards come from db
+        self.db = db
+        SignallingSession.__init__(self, db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        shard = getattr(g, 'shard', 0) if has_app_context() else 0
+        table = getattr(mapper, 'local_table', None)
+        # tables flagged as directory tables, the user directory and jobs, live on the first database
+        if shard and not (table is not None and table.info.get('directory')):
+            return self.db.get_engine(self.app, bind=bind_key(shard))
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+class ShardedSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy with sessions routed by ShardedSession"""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=ShardedSession, db=self, **options)
+
+
+def shard_engines(db, app):
+    """Engine of every shard, in order"""
+    return [db.get_engine(app, bind=bind_key(shard)) for shard in range(len(shard_uris(app)))]
+
+
+def shard_tables(db):
+    """Tables kept on every shard, all but the directory tables"""
+    return [table for table in db.Model.metadata.sorted_tables if not table.info.get('directory')]
+
+
+def create_shards(db, app):
+    """Creates every table on the first database and the user tables on the other shards"""
+    engines = shard_engines(db, app)
+    db.Model.metadata.create_all(engines[0])
+    for engine in engines[1:]:
+        db.Model.metadata.create_all(engine, tables=shard_tables(db))
+
+
+def drop_shards(db, app):
+    engines = shard_engines(db, app)
+    for engine in engines[1:]:
+        db.Model.metadata.drop_all(engine, tables=shard_tables(db))
+    db.Model.metadata.drop_all(engines[0])
+
+
+def reshard(db, app, old_count):
+    """
+    Moves the users whose shard changed after shards were added to SQLALCHEMY_SHARDS
+    :param old_count: number of shards the users were spread over before
+    :return: number of users moved
+    """
+    from app.models import Users, Categories, Recipes, RecipeIngredient, RecipeImage, Blacklist, UserDirectory, \
+        IdempotencyKey, SharedIds
+
+    engines = shard_engines(db, app)
+    if old_count > len(engines):
+        raise ValueError('Shards can only be added, list every shard in SQLALCHEMY_SHARDS')
+    create_shards(db, app)
+    rebuild_directory(engines, old_count, Users.__table__, UserDirectory.__table__)
+    advance_shared_ids(engines, old_count, SharedIds.__table__,
+                       [Categories.__table__, Recipes.__table__, RecipeImage.__table__])
+    for engine in engines[:old_count]:
+        claim_revoked_tokens(engine, Blacklist.__table__, app.config.get('SECRET_KEY'))
+
+    users = Users.__table__
+    tables = [users, Categories.__table__, Recipes.__table__, RecipeIngredient.__table__, RecipeImage.__table__,
+              Blacklist.__table__, IdempotencyKey.__table__]
+    moved = 0
+    for source in range(old_count):
+        user_ids = [row.id for row in engines[source].execute(db_select([users.c.id]))]
+        for user_id in user_ids:
+            target = shard_for(user_id, len(engines))
+            if target != source:
+                move_user(user_id, engines[source], engines[target], tables)
+                moved += 1
+    return moved
+
+
+def rebuild_directory(engines, count, users, directory):
+    """Adds the users of the first count shards missing from the directory"""
+    with engines[0].begin() as connection:
+        known = set(row.id for row in connection.execute(db_select([directory.c.id])))
+        for engine in engines[:count]:
+            rows = [{'id': row.id, 'email': row.email}
+                    for row in engine.execute(db_select([users.c.id, users.c.email])) if row.id not in known]
+            if rows:
+                connection.execute(directory.insert(), rows)
+        if connection.dialect.name == 'postgresql':
+            # ids are handed out by the directory from now on
+            connection.execute("SELECT setval(pg_get_serial_sequence('user_directory', 'id'), "
+                               "coalesce((SELECT max(id) FROM user_directory), 0) + 1, false)")
+
+
+def advance_shared_ids(engines, count, shared_ids, tables):
+    """Moves the shared ids past the ids of tables on the first count shards, given out before they were shared"""
+    highest = max([engine.execute(db_select([func.max(table.c.id)])).scalar() or 0
+                   for engine in engines[:count] for table in tables])
+    with engines[0].begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            connection.execute("SELECT setval(pg_get_serial_sequence('shared_ids', 'id'), "
+                               "greatest(%(highest)s, nextval(pg_get_serial_sequence('shared_ids', 'id'))))",
+                               highest=highest)
+        elif highest:
+            # AUTOINCREMENT continues after the largest id ever inserted
+            connection.execute(shared_ids.insert(), id=highest)
+            connection.execute(shared_ids.delete().where(shared_ids.c.id == highest))
+
+
+def claim_revoked_tokens(engine, blacklist, secret):
+    """
+    Sets the owner of tokens revoked before blacklist.user_id existed, read from their subject
+    Tokens that do not decode are left alone: they are refused before the blacklist is looked at.
+    """
+    with engine.begin() as connection:
+        for row in connection.execute(blacklist.select().where(blacklist.c.user_id.is_(None))):
+            try:
+                # an expired token still names its owner
+                user_id = jwt.decode(row.revoked_token, secret, options={'verify_exp': False})['sub']
+            except (jwt.InvalidTokenError, KeyError):
+                continue
+            connection.execute(blacklist.update().where(blacklist.c.token_id == row.token_id).
+                               values(user_id=user_id))
+
+
+def move_user(user_id, source, target, tables):
+    """
+    Copies a user's rows to another shard and deletes them from the old one
+    Categories, recipes and images keep their shared ids, the ingredient and
+    idempotency rows are renumbered. A copy left over by an interrupted move
+    is replaced, so the move can be run again.
+    """
+    users, categories, recipes, ingredients, images, blacklist, idempotency_keys = tables
+    with source.begin() as old, target.begin() as new:
+        for table in (images, ingredients, recipes, categories, blacklist, idempotency_keys, users):
+            new.execute(table.delete().where(table.c.user_id == user_id) if table is not users
+                        else table.delete().where(table.c.id == user_id))
+
+        new.execute(users.insert(), dict(old.execute(users.select().where(users.c.id == user_id)).first()))
+        for table in (categories, recipes, images):
+            rows = [dict(row) for row in old.execute(table.select().where(table.c.user_id == user_id))]
+            if rows:
+                new.execute(table.insert(), rows)
+        # clients never see these ids, each shard numbers its own
+        for table in (ingredients, idempotency_keys):
+            rows = []
+            for row in old.execute(table.select().where(table.c.user_id == user_id)):
+                row = dict(row)
+                del row['id']
+                rows.append(row)
+            if rows:
+                new.execute(table.insert(), rows)
+        rows = [{'revoked_token': row.revoked_token, 'user_id': user_id}
+                for row in old.execute(blacklist.select().where(blacklist.c.user_id == user_id))]
+        if rows:
+            new.execute(blacklist.insert(), rows)
+
+        # children first, SQLite shards do not enforce ON DELETE CASCADE
+        for table in (images, ingredients, recipes, categories, blacklist, idempotency_keys):
+            old.execute(table.delete().where(table.c.user_id == user_id))
+        old.execute(users.delete().where(users.c.id == user_id))
@@ -0,0 +1,101 @@
+"""
+Storage of uploaded files, picked with IMAGE_STORAGE.
+
+Backends take uploads as an iterator of chunks, so a file is never held in
+memory as a whole, and answer downloads themselves: the local disk backend
+hands the open file to the WSGI server, which sends it with sendfile.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from flask import current_app, send_file
+
+
+class FileTooLarge(Exception):
+    """Raised when an upload goes past its maximum size"""
+
+
+class LocalStorage(object):
+    """
+    This class keeps files under a directory of the local disk
+    :param root: directory of the files, created when missing
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError('Invalid key {}'.format(key))
+        return path
+
+    def save(self, prefix, chunks, max_size):
+        """
+        Writes chunks to a file named after their sha1
+        :param prefix: start of the key, e.g. '4/17'
+        :param chunks: iterator of bytes
+        :param max_size: largest accepted size in bytes, FileTooLarge is raised past it
+        :return: tuple of (key, size, sha1 hex digest)
+        """
+        directory = os.path.dirname(self.path(prefix + '-'))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        digest, size = hashlib.sha1(), 0
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLarge(max_size)
+                    digest.update(chunk)
+                    output.write(chunk)
+            key = '{}-{}'.format(prefix, digest.hexdigest())
+            # a rename, readers never see a partly written file
+            os.rename(temporary, self.path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+        return key, size, digest.hexdigest()
+
+    def put(self, key, data):
+        """Writes a small file, e.g. a thumbnail"""
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(self.path(key)), suffix='.part')
+        with os.fdopen(handle, 'wb') as output:
+            output.write(data)
+        os.rename(temporary, self.path(key))
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def delete(self, *keys):
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def delete_prefix(self, prefix):
+        """Deletes a directory of files, e.g. every file of a user"""
+        shutil.rmtree(self.path(prefix), ignore_errors=True)
+
+    def send(self, key, mimetype, max_age):
+        """Response with the file, answering Range and conditional requests"""
+        return send_file(self.path(key), mimetype=mimetype, conditional=True, cache_timeout=max_age)
+
+
+STORAGES = {'local': lambda config: LocalStorage(config['IMAGE_DIR'])}
+
+
+def get_storage():
+    """Returns the storage of the current app, created on first use"""
+    storage = current_app.extensions.get('storage')
+    if storage is None:
+        storage = STORAGES[current_app.config.get('IMAGE_STORAGE', 'local')](current_app.config)
+        current_app.extensions['storage'] = storage
+    return storage
@@ -0,0 +1,192 @@
+"""
+Request validation with schemas compiled once, when the views are imported.
+
+Each Field turns its options into a list of checks up front. At request time a
+Schema reads the query string, form and JSON body once, runs every field through
+its checks and collects all the errors instead of stopping at the first one.
+"""
+import re
+from collections import OrderedDict
+
+from flask import request
+from flask_restplus import reqparse
+
+INVALID_CHAR = re.compile(r"[<>/{}[\]~`*!@#$%^&()=+]")
+EMAIL = re.compile(r"^[a-zA-Z0-9_.]+@[a-zA-Z0-9-]+\.[a-z]+$")
+
+# the first error in this order becomes the message of the response
+CODES = ('missing', 'type', 'too_long', 'empty', 'pattern', 'forbidden', 'too_short', 'minimum')
+MESSAGES = {
+    'missing': "{Field} is required",
+    'type': "Invalid {field} value",
+    'too_long': "Please make the length of the {field} less than {max_length} characters",
+    'empty': "{Field} cannot be empty",
+    'pattern': "Invalid {field}",
+    'forbidden': "{field} contains invalid characters",
+    'too_short': "{Field} must be {min_length} or more characters",
+    'minimum': "{Field} must be at least {minimum}",
+}
+BODY = ('json', 'form')
+QUERY = ('args',)
+MISSING = object()
+
+
+class Field(object):
+    """
+    One input of a request
+    :param name: key in the query string, form or JSON body
+    :param type: str or int
+    :param required: the field must be sent and, for strings, not be blank
+    :param default: value when an optional field is not sent
+    :param locations: where to look for the field, BODY or QUERY
+    :param strip: strips surrounding whitespace from strings
+    :param lower: lower-cases strings
+    :param max_length: longest accepted string
+    :param min_length: shortest accepted string
+    :param pattern: compiled regex a string must match
+    :param forbid: compiled regex a string must not contain
+    :param minimum: smallest accepted int
+    :param messages: dict of error code to message, overriding MESSAGES
+    :param help: description shown in the API docs
+    :param blank: error code of a blank required string, 'empty' unless the field reports it otherwise
+    """
+
+    def __init__(self, name, type=str, required=False, default=None, locations=BODY, strip=True, lower=False,
+                 max_length=None, min_length=None, pattern=None, forbid=None, minimum=None, messages=None,
+                 help=None, blank='empty'):
+        self.name = name
+        self.blank = blank
+        self.type = type
+        self.required = required
+        self.default = default
+        self.locations = locations
+        self.help = help or name
+        options = dict(field=name, Field=name.title(), max_length=max_length, min_length=min_length,
+                       minimum=minimum)
+        messages = dict(MESSAGES, **(messages or {}))
+        self.messages = dict((code, message.format(**options)) for code, message in messages.items())
+        self.convert = self.compile_conversion(type, strip, lower)
+        self.checks = self.compile_checks(type, max_length, min_length, pattern, forbid, minimum)
+
+    @staticmethod
+    def compile_conversion(type, strip, lower):
+        """Returns the function turning a raw value into a value of the field's type"""
+        if type is int:
+            return int
+        steps = [str]
+        if strip:
+            steps.append(str.strip)
+        if lower:
+            steps.append(str.lower)
+
+        def convert(value):
+            for step in steps:
+                value = step(value)
+            return value
+        return convert
+
+    def compile_checks(self, type, max_length, min_length, pattern, forbid, minimum):
+        """Returns (error code, test) pairs, a test returns True for an invalid value"""
+        checks = []
+        if type is int:
+            if minimum is not None:
+                checks.append(('minimum', lambda value: value < minimum))
+            return checks
+        if self.required:
+            checks.append((self.blank, lambda value: not value))
+        if max_length is not None:
+            checks.append(('too_long', lambda value: len(value) > max_length))
+        if pattern is not None:
+            checks.append(('pattern', lambda value: value and not pattern.match(value)))
+        if forbid is not None:
+            checks.append(('forbidden', lambda value: forbid.search(value)))
+        if min_length is not None:
+            checks.append(('too_short', lambda value: value and len(value) < min_length))
+        return checks
+
+    def lookup(self, sources):
+        """Returns the raw value from the first location that has it"""
+        for location in self.locations:
+            value = sources[location].get(self.name, MISSING)
+            if value is not MISSING and value is not None:
+                return value
+        return MISSING
+
+    def validate(self, value):
+        """
+        Converts and checks a raw value
+        :return: tuple of (error code or None, converted value)
+        """
+        try:
+            value = self.convert(value)
+        except (TypeError, ValueError):
+            return 'type', None
+        for code, test in self.checks:
+            if test(value):
+                return code, value
+        return None, value
+
+
+class Schema(object):
+    """
+    The fields of one endpoint
+    :param fields: Field instances
+    :param messages: error code to the message of the response, for messages clients already rely on
+    """
+
+    def __init__(self, *fields, **messages):
+        self.fields = fields
+        self.messages = messages
+        self.locations = set(location for field in fields for location in field.locations)
+        self.parser = self.doc_parser()
+
+    def doc_parser(self):
+        """RequestParser describing the fields, only used for the Swagger docs"""
+        parser = reqparse.RequestParser()
+        for field in self.fields:
+            location = 'args' if field.locations == QUERY else 'form'
+            parser.add_argument(field.name, type=field.type, help=field.help, location=location,
+                                required=field.required)
+        return parser
+
+    def sources(self):
+        """Reads the query string, form and JSON body of the request once"""
+        sources = {'args': request.args if 'args' in self.locations else {},
+                   'form': request.form if 'form' in self.locations else {},
+                   'json': {}}
+        if 'json' in self.locations and request.is_json:
+            body = request.get_json(silent=True)
+            if isinstance(body, dict):
+                sources['json'] = body
+        return sources
+
+    def load(self, partial=False):
+        """
+        Validates the current request in one pass
+        :param partial: only validates the fields that were sent, for PATCH
+        :return: tuple of (dict of values, None) or (None, error response body)
+        """
+        sources = self.sources()
+        data, errors, codes = {}, OrderedDict(), {}
+        for field in self.fields:
+            value = field.lookup(sources)
+            if value is MISSING:
+                if field.required and not partial:
+                    codes[field.name] = 'missing'
+                    errors[field.name] = field.messages['missing']
+                elif not partial:
+                    data[field.name] = field.default
+                continue
+            code, value = field.validate(value)
+            if code:
+                codes[field.name] = code
+                errors[field.name] = field.messages[code]
+            else:
+                data[field.name] = value
+        if not errors:
+            return data, None
+
+        first = min(errors, key=lambda name: CODES.index(codes[name]))
+        code = codes[first]
+        message = self.messages[code].format(field=first) if code in self.messages else errors[first]
+        return None, {"message": message, "errors": errors, "status": "error"}
@@ -1,34 +1,69 @@
-from functools import wraps
-from flask import request, jsonify, url_for
 import re
+from functools import wraps
+from flask import request, jsonify, current_app, json, abort, stream_with_context
+from flask_sqlalchemy import Pagination
 from sqlalchemy import desc, asc
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
+from werkzeug.test import EnvironBuilder
 import humanize
-from itsdangerous import URLSafeTimedSerializer
-from flask_bcrypt import Bcrypt
-from flask_mail import Mail, Message
-from app import api, Resource, app
-from app.models import Users, Categories, Recipes, Blacklist
-
-mail = Mail(app)
+from six import string_types
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from flask_restplus import Namespace, Resource
+from app.ingredients import normalize
+from app import db, API_PREFIX
+from app.models import Users, Categories, Recipes, RecipeIngredient, RecipeImage, Blacklist, Jobs, \
+    is_unique_violation, hash_password
+from app.validation import Schema, Field, QUERY, INVALID_CHAR, EMAIL
+from app.sharding import use_shard
+from app.jobs import task, enqueue
+from app.idempotency import idempotent
+from app.ownership import owns_category, forget_category
+from app.storage import get_storage, FileTooLarge
+from app.images import SIGNATURES, InvalidImage, image_chunks, make_thumbnail
 
-recipients = []
 sender = 'Admin'
 
-s = URLSafeTimedSerializer(app.config['SECRET_KEY'])
+# namespaces
+auth_namespace = Namespace('auth', description="Authentication/Authorization operations.")
+category_namespace = Namespace('category', description="Category operations.", path="/category")
+recipe_namespace = Namespace('recipe', description="Recipe operations.",
+                             path="/category/<int:category_id>/recipes")
+pantry_namespace = Namespace('pantry', description="Find recipes by ingredients on hand.", path="/pantry")
+jobs_namespace = Namespace('jobs', description="Status of deferred work.", path="/jobs")
+batch_namespace = Namespace('batch', description="Several requests in one round trip.", path="/batch")
+namespaces = [auth_namespace, category_namespace, recipe_namespace, pantry_namespace, jobs_namespace,
+              batch_namespace]
+# set by /batch on the environ of its sub-requests, which are authenticated once for the whole batch
+BATCH_USER_ID = 'yummy.batch_user_id'
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
 
-INVALID_CHAR = re.compile(r"[<>/{}[\]~`*!@#$%^&()=+]")
 
-# namespaces
-auth_namespace = api.namespace('auth', description="Authentication/Authorization operations.")
-category_namespace = api.namespace('category', description="Category operations.", path="/category")
-recipe_namespace = api.namespace('recipe', description="Recipe operations.",
-                                 path="/category/<int:category_id>/recipes")
+def get_serializer():
+    """Returns the serializer used to sign password reset tokens"""
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'])
+
+
+def job_token(job):
+    """Signed job id to poll GET /jobs/<token> with, it works without logging in"""
+    return get_serializer().dumps(job.id, salt='job')
+
+
+def get_mail():
+    """Returns the mail state of the current app, registering Flask-Mail on first use"""
+    mail = current_app.extensions.get('mail')
+    if mail is None:
+        from flask_mail import Mail
+        mail = Mail().init_app(current_app)
+    return mail
 
 
 def token_required(f):
     @wraps(f)
     def validate_user(*args, **kwargs):
-        user_id = None
+        user_id = request.environ.get(BATCH_USER_ID)
+        if user_id is not None:
+            return f(user_id, *args, **kwargs)
         auth_header = request.headers.get('Authorization', '')
         if auth_header:
             try:
@@ -56,9 +91,9 @@ def token_required(f):
             user_id = Users.decode_token(access_token)
             if user_id:
                 if isinstance(user_id, int):
-                    blacklisted = Blacklist.query.filter_by(revoked_token=str(access_token)).first()
-
-                    if blacklisted:
+                    # every query of the request goes to the user's shard
+                    use_shard(user_id)
+                    if Blacklist.is_revoked(str(access_token), user_id):
                         response = jsonify({
                             "message": "Session not available, Please login",
                             "status": "error"
@@ -73,118 +108,231 @@ def token_required(f):
     return validate_user
 
 
-# Enables adding and parsing of multiple arguments in the context of a single request
-registration_parser = api.parser()
-registration_parser.add_argument('email', type=str, help='Email', location='form', required=True)
-registration_parser.add_argument('username', type=str, help='username', location='form', required=True)
-registration_parser.add_argument('password', type=str, help='Password', location='form', required=True)
+CATEGORY_FIELDS = ('id', 'name', 'desc', 'date_created', 'date_modified', 'user_id', 'recipe_count')
+RECIPE_FIELDS = ('id', 'name', 'time', 'time_minutes', 'ingredients', 'procedure', 'category_id', 'date_created',
+                 'date_modified')
+# fields returned with view=summary, enough to draw a list of names
+CATEGORY_SUMMARY = ('id', 'name', 'recipe_count')
+RECIPE_SUMMARY = ('id', 'name', 'time', 'category_id')
+# sort= of the recipe listing, each backed by an index starting with category_id
+RECIPE_SORTS = {
+    'time': Recipes.time_minutes,
+    # the expression of ux_recipes_category_id_lower_name
+    'name': db.func.lower(Recipes.name),
+    'date_created': Recipes.date_created,
+}
+
+FORMATTERS = {
+    'name': lambda name: name.title(),
+    'date_created': humanize.naturaldate,
+    'date_modified': humanize.naturaldate,
+}
+
+
+def serialize(obj, fields):
+    """
+    Converts a model instance to a dict
+    :param obj: Categories or Recipes instance
+    :param fields: names of the fields to include
+    :return: dict of formatted field values
+    """
+    return dict((field, FORMATTERS.get(field, lambda value: value)(getattr(obj, field))) for field in fields)
+
+
+def requested_fields(args, fields, summary):
+    """
+    Works out the fields asked for with fields= or view=summary
+    :param args: parsed query arguments
+    :param fields: every field of the resource, returned by default
+    :param summary: fields returned with view=summary
+    :return: tuple of (fields, error message)
+    """
+    if args.get('fields'):
+        requested = tuple(field.strip() for field in args['fields'].split(',') if field.strip())
+        unknown = [field for field in requested if field not in fields]
+        if unknown or not requested:
+            return None, "Unknown field(s): {}. Choose from {}".format(', '.join(unknown), ', '.join(fields))
+        if 'id' not in requested:
+            requested = ('id',) + requested
+        return requested, None
+    if args.get('view') in (None, '', 'full'):
+        return fields, None
+    if args['view'] == 'summary':
+        return summary, None
+    return None, "Invalid view '{}'. Use summary or full".format(args['view'])
+
+
+def page_limit_error(limit):
+    """Returns an error message when limit= is above MAX_PAGE_LIMIT, None otherwise"""
+    maximum = current_app.config.get('MAX_PAGE_LIMIT', 1000)
+    if limit > maximum:
+        return "Limit number must be at most {}".format(maximum)
+    return None
+
+
+def paginate(query, page, limit, load_items=True):
+    """
+    query.paginate(page, limit), or only the counts of the page when its items are streamed afterwards
+    :return: flask_sqlalchemy Pagination
+    """
+    if load_items:
+        return query.paginate(page, limit, error_out=True)
+    total = query.order_by(None).count()
+    if page > 1 and (page - 1) * limit >= total:
+        abort(404)
+    return Pagination(query, page, limit, total, [])
+
+
+def page_meta(pagination):
+    return {'Next Page': pagination.next_num,
+            'Prev Page': pagination.prev_num,
+            'Has next': pagination.has_next,
+            'total items': pagination.total,
+            'current page': pagination.page,
+            'total pages': pagination.pages,
+            'Has previous': pagination.has_prev}
+
+
+def stream_page(meta, query, fields):
+    """
+    Streams the same [meta, [items]] body as jsonify(meta, items), one row at a time
+    Rows are fetched JSON_STREAM_YIELD_PER at a time, so memory does not grow with the page size.
+    """
+    per = current_app.config.get('JSON_STREAM_YIELD_PER', 100)
+
+    def generate():
+        yield '[' + json.dumps(meta) + ', ['
+        for number, row in enumerate(query.yield_per(per)):
+            yield (', ' if number else '') + json.dumps(serialize(row, fields))
+        yield ']]\n'
+    # the request context, and with it the database session, stays open until the last row is sent
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+
+def filter_recipes(query, args):
+    """Applies min_time=, max_time= and sort= of the recipe listing to a query"""
+    if args['min_time'] is not None:
+        query = query.filter(Recipes.time_minutes >= args['min_time'])
+    if args['max_time'] is not None:
+        query = query.filter(Recipes.time_minutes <= args['max_time'])
+    sort = args['sort'] or '-date_created'
+    column = RECIPE_SORTS[sort.lstrip('-')]
+    return query.order_by(desc(column) if sort.startswith('-') else asc(column))
+
+
+def load_fields(model, fields):
+    """Query option that only SELECTs the columns behind the given fields"""
+    return load_only(*[getattr(model, field) for field in fields])
+
+
+def requested_expansion(args):
+    """
+    Works out how many recipes to embed per category with expand=recipes&per_category=K
+    :param args: parsed query arguments
+    :return: tuple of (recipes per category or 0, error message)
+    """
+    if not args.get('expand'):
+        return 0, None
+    if args['expand'] != 'recipes':
+        return 0, "Invalid expand '{}'. Use recipes".format(args['expand'])
+    per_category = args.get('per_category') or 3
+    maximum = current_app.config.get('EXPAND_MAX_PER_CATEGORY', 10)
+    if not 1 <= per_category <= maximum:
+        return 0, "per_category must be between 1 and {}".format(maximum)
+    return per_category, None
+
+
+def expand_recipes(categories, serialized, per_category):
+    """
+    Embeds the newest recipes of each category, fetched together in one query
+    :param categories: Categories instances on the page
+    :param serialized: their serialized dicts, updated in place
+    :param per_category: number of recipes per category
+    """
+    previews = Recipes.previews([category.id for category in categories], per_category,
+                                load_fields(Recipes, RECIPE_SUMMARY))
+    for category, item in zip(categories, serialized):
+        item['recipes'] = [serialize(recipe, RECIPE_SUMMARY) for recipe in previews.get(category.id, [])]
+
+
+# Schemas are compiled once at import, the messages are the ones clients already rely on
+registration_schema = Schema(
+    # a blank email is reported as an invalid one, after blank usernames and passwords
+    Field('email', required=True, max_length=40, pattern=EMAIL, blank='pattern', help='Email'),
+    Field('username', required=True, max_length=40, forbid=INVALID_CHAR, help='username'),
+    Field('password', required=True, min_length=6, help='Password'),
+    missing="Please fill all fields",
+    too_long="Please make the length of the email or username less than 40 characters",
+    empty="Please fill all fields",
+    pattern="Please enter a valid email address",
+    forbidden="Username contains invalid characters",
+    too_short="Password must be more than 6 characters.")
 
 
 @auth_namespace.route('/register')
 class UserRegistration(Resource):
-    @api.expect(registration_parser)
+    @auth_namespace.expect(registration_schema.parser)
     def post(self):
         """Handles POST request for auth/register"""
-        args = registration_parser.parse_args()
-        # check if user already exists
-        user = Users.query.filter_by(email=args['email']).first()
-
-        if not user:
-            # There is no user, try to register them
-            try:
-
-                email = args['email'].strip()
-                username = args['username'].strip()
-                password = args['password'].strip()
-
-                if len(email) > 40 or len(username) > 40:
-                    response = jsonify({
-                        "Message": "Please make the length of the email or username less than 40 characters",
-                        "Status": "error"
-                    })
-                    response.status_code = 400
-                    return response
-
-                regex = r"(^[a-zA-Z0-9_.]+@[a-zA-Z0-9-]+\.[a-z]+$)"
-                if username and password:
-                    if re.match(regex, email):
-
-                        if INVALID_CHAR.search(username):
-                            response = jsonify({
-                                "message": "Username contains invalid characters",
-                                "status": "error"})
-                            response.status_code = 400
-                            return response
-
-                        if len(password) < 6:
-                            response = jsonify({
-                                "message": "Password must be more than 6 characters.",
-                                "status": "error"})
-                            response.status_code = 400
-                            return response
+        args, error = registration_schema.load()
+        if error:
+            return error, 400
 
-                        user = Users(email=email, username=username,
-                                     password=password)
-                        user.save()
-
-                        response = jsonify({
-                            "message": "You registered successfully. Please log in.",
-                            "status": "success"
-                        })
-                        response.status_code = 201
-                        return response
-                    else:
-
-                        response = jsonify({
-                            "message": "Please enter a valid email address",
-                            "status": "error"
-                        })
+        try:
+            # the unique index on lower(email) rejects an existing user in the same INSERT
+            user = Users(email=args['email'], username=args['username'],
+                         password=args['password'])
+            user.save()
 
-                        response.status_code = 400
-                        return response
-                response = jsonify({
-                    "message": "Please fill all fields",
-                    "status": "error"
-                })
-                response.status_code = 400
-                return response
+            response = jsonify({
+                "message": "You registered successfully. Please log in.",
+                "status": "success"
+            })
+            response.status_code = 201
+            return response
 
-            except Exception as e:
-                # Error occured during registration, return error
-                response = jsonify({
-                    "message": str(e),
-                    "status": "error"
-                })
-                response.status_code = 401
-                return response
-        else:
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
             # User already exists
             response = jsonify({
                 "message": "User already exists. Please login",
                 "status": "error"
             })
             response.status_code = 409
+            return response
 
+        except Exception as e:
+            # Error occured during registration, return error
+            response = jsonify({
+                "message": str(e),
+                "status": "error"
+            })
+            response.status_code = 401
             return response
 
 
-login_parser = api.parser()
-login_parser.add_argument('email', type=str, help='Email', location='form', required=True)
-login_parser.add_argument('password', type=str, help='Password', location='form', required=True)
+login_schema = Schema(
+    Field('email', required=True, strip=False, help='Email'),
+    Field('password', required=True, strip=False, help='Password'),
+    empty="Invalid email or password, Please try again")
 
 
 @auth_namespace.route('/login')
 class UserLogin(Resource):
-    @api.expect(login_parser)
+    @auth_namespace.expect(login_schema.parser)
     def post(self):
         """Handles POST request for /auth/login"""
-        data = login_parser.parse_args()
+        data, error = login_schema.load()
+        if error:
+            return error, 400
 
         try:
             # check if user exists, email is unique to each user
-            user = Users.query.filter_by(email=data['email']).first()
+            user = Users.by_email(data['email'])
 
-            if user and user.password_is_valid(data['password']):
+            if user and user.is_active and user.password_is_valid(data['password']):
                 # generate access token
                 access_token = user.generate_token(user.id)
                 if access_token:
@@ -222,7 +370,7 @@ class UserLogout(Resource):
         auth_header = request.headers.get('Authorization', '')
         access_token = auth_header.split(" ")[1]
 
-        revoked_token = Blacklist(revoked_token=access_token)
+        revoked_token = Blacklist(revoked_token=access_token, user_id=user_id)
         revoked_token.save()
 
         response = jsonify({
@@ -233,85 +381,119 @@ class UserLogout(Resource):
         return response
 
 
+@auth_namespace.route('/account')
+class UserAccount(Resource):
+    method_decorators = [token_required]
+
+    @staticmethod
+    def delete(user_id):
+        """Handles DELETE request for /auth/account"""
+        auth_header = request.headers.get('Authorization', '')
+        access_token = auth_header.split(" ")[1]
+
+        # lock the account out right away, the data itself is purged in batches afterwards
+        Users.query.filter_by(id=user_id).update({'is_active': False}, synchronize_session=False)
+        revoked_token = Blacklist(revoked_token=access_token, user_id=user_id)
+        revoked_token.save()
+        job = enqueue('purge_account', {'user_id': user_id,
+                                        'batch_size': current_app.config['ACCOUNT_PURGE_BATCH_SIZE']},
+                      user_id=user_id)
+
+        response = jsonify({
+            "message": "Your account is being deleted.",
+            "job": job_token(job),
+            "status": "success"
+        })
+        response.status_code = 202
+        return response
+
+
+@task('purge_account')
+def purge_account(user_id, batch_size):
+    """Deletes the data of a deleted account, in batches"""
+    use_shard(user_id)
+    Users.purge(user_id, batch_size)
+    forget_category(user_id=user_id)
+    get_storage().delete_prefix(str(user_id))
+
+
+@task('send_reset_email')
+def send_reset_email(email, link):
+    """Mails a password reset link"""
+    email_notification('Reset password', [email], link)
+
+
 def email_notification(subject, recipients, _link):
+    from flask_mail import Message
     msg = Message(subject, sender=sender, recipients=recipients)
     msg.body = "Use the token to reset password in the app: {}".format(_link)
-    with app.app_context():
-        mail.send(msg)
+    get_mail().send(msg)
     return "\n\nEmail sent successfully\n\n"
 
 
-reset_parser = api.parser()
-reset_parser.add_argument('email', type=str, help='Email', location='form', required=True)
+reset_schema = Schema(
+    Field('email', required=True, pattern=EMAIL, help='Email'),
+    empty="Email Invalid. Do not include special characters.",
+    pattern="Email Invalid. Do not include special characters.")
 
 
 @auth_namespace.route('/reset-password')
 class ResetPasswordView(Resource):
 
-    @api.expect(reset_parser)
+    @auth_namespace.expect(reset_schema.parser)
     def post(self):
         """Handles POST request for /auth/reset-password"""
-        data = reset_parser.parse_args()
+        data, error = reset_schema.load()
+        if error:
+            return error, 400
         email = data['email']
 
-        regex = r"(^[a-zA-Z0-9_.]+@[a-zA-Z0-9-]+\.[a-z]+$)"
-        if re.match(regex, email) and email.strip(' '):
-            user = Users.query.filter_by(email=email).first()
-            if user:
-                token = s.dumps(email, salt='password-reset')
-                recipients.append(email)
-                _link = 'http://localhost:3000/newpassword/' + token
+        user = Users.by_email(email)
+        if user:
+            token = get_serializer().dumps(email, salt='password-reset')
+            _link = 'http://localhost:3000/newpassword/' + token
 
-                email_notification('Reset password', recipients, _link)
-
-                response = jsonify({
-                    'message': 'A reset link has been sent to : {} <br/>'.format(email),
-                    'status': 'success'
-                })
-                response.status_code = 200
-                return response
-            else:
-                response = jsonify({
-                    'message': "User email does not exist.",
-                    'status': 'error'
-                })
-                response.status_code = 404
-                return response
+            # mailed by a worker, the SMTP round trip no longer holds up the request
+            job = enqueue('send_reset_email', {'email': email, 'link': _link}, user_id=user.id)
 
+            response = jsonify({
+                'message': 'A reset link has been sent to : {} <br/>'.format(email),
+                'job': job_token(job),
+                'status': 'success'
+            })
+            response.status_code = 202
+            return response
         else:
             response = jsonify({
-                'message': "Email Invalid. Do not include special characters.",
+                'message': "User email does not exist.",
                 'status': 'error'
             })
-            response.status_code = 400
+            response.status_code = 404
             return response
 
 
-new_parser = api.parser()
-new_parser.add_argument('newpassword', type=str, help='New password', location='form')
+new_password_schema = Schema(
+    Field('newpassword', required=True, min_length=6, help='New password'),
+    too_short="Password must be more than 6 characters.")
 
 
 @auth_namespace.route('/new-password/<token>')
 class NewPasswordView(Resource):
 
-    @api.expect(new_parser)
+    @auth_namespace.expect(new_password_schema.parser)
     def post(self, token):
         """Handles POST request for /auth/new-password/<token>"""
-        data = new_parser.parse_args()
+        data, error = new_password_schema.load()
+        if error:
+            return error, 400
         password = data['newpassword']
 
         try:
-            email = s.loads(token, salt='password-reset', max_age=60 * 10)  # 24hrs
-            user = Users.query.filter_by(email=email).first()
+            email = get_serializer().loads(token, salt='password-reset', max_age=60 * 10)  # 24hrs
+            user = Users.by_email(email)
 
             if user:
-                if len(password) < 6:
-                    response = jsonify({
-                        "message": "Password must be more than 6 characters.",
-                        "status": "error"})
-                    response.status_code = 400
-                    return response
-                user.password = Bcrypt().generate_password_hash(password).decode()
+                user.password = hash_password(password)
                 user.save()
                 response = jsonify({
                     "message": "Password for {} has been reset. You can now login".format(email, password),
@@ -330,77 +512,92 @@ class NewPasswordView(Resource):
             return 'You are not allowed to do this operation'
 
 
-category_get_parser = api.parser()
-category_parser = api.parser()
+@jobs_namespace.route('/<token>')
+class JobStatus(Resource):
 
-category_get_parser.add_argument('q', type=str, help='Search')
-category_get_parser.add_argument('page', type=int, help='Page number, default=1')
-category_get_parser.add_argument('limit', type=int, help='Limit per page, default=6')
-category_parser.add_argument('name', type=str, help='Category name', location='form', required=True)
-category_parser.add_argument('desc', type=str, help='Category Description', location='form', required=True)
+    @staticmethod
+    def get(token):
+        """Handles GET request for /jobs/<token>, with the token returned when the job was queued"""
+        try:
+            job = Jobs.query.get(get_serializer().loads(token, salt='job'))
+        except BadSignature:
+            job = None
+        if job is None:
+            response = jsonify({
+                "message": "Job not found",
+                "status": "error"
+            })
+            response.status_code = 404
+            return response
+
+        response = jsonify({
+            "job": {
+                "name": job.name,
+                "state": job.status,
+                "attempts": job.attempts,
+                "date_created": humanize.naturaltime(job.date_created),
+                "date_modified": humanize.naturaltime(job.date_modified)
+            },
+            "status": "success"
+        })
+        response.status_code = 200
+        return response
+
+
+# fields= and view= for every GET endpoint
+fields_fields = (
+    Field('fields', locations=QUERY, help='Comma separated fields to return'),
+    Field('view', locations=QUERY, help='summary or full, default=full'),
+)
+listing_fields = (
+    Field('q', locations=QUERY, lower=True, default='', help='Search'),
+    Field('limit', type=int, locations=QUERY, default=6, minimum=1, help='Limit per page, default=6',
+          messages={'type': "Invalid limit value!!", 'minimum': "Limit number must be a positive integer!! "}),
+    Field('page', type=int, locations=QUERY, default=1, minimum=1, help='Page number, default=1',
+          messages={'type': "Invalid page value!!", 'minimum': "Page number must be a positive integer!! "}),
+) + fields_fields
+category_list_schema = Schema(*(listing_fields + (
+    Field('expand', locations=QUERY, help='recipes to embed the newest recipes'),
+    Field('per_category', type=int, locations=QUERY, default=3, help='Recipes embedded per category, default=3'),
+)))
+category_schema = Schema(
+    Field('name', required=True, lower=True, max_length=30, forbid=INVALID_CHAR, help='Category name'),
+    Field('desc', required=True, lower=True, max_length=255, forbid=INVALID_CHAR, help='Category Description'),
+    empty="Name or description cannot be empty")
 
 
 @category_namespace.route('', methods=['GET', 'POST'])
 class UserCategory(Resource):
     method_decorators = [token_required]
 
-    @api.doc(parser=category_get_parser)
+    @category_namespace.doc(parser=category_list_schema.parser)
     def get(self, user_id):
         """Gets all categories [ENDPOINT] GET /category"""
-        args = category_get_parser.parse_args()
-        q = request.values.get('q', '').strip().lower()
+        args, error = category_list_schema.load()
+        if error:
+            return error, 400
+        q = args['q']
         page = args['page']
         limit = args['limit']
 
-        if limit:
-            try:
-                limit = int(limit)
-                if limit < 1:
-                    return {
-                               "message": "Limit number must be a positive integer!! "
-                           }, 400
-            except Exception:
-                return {
-                           "message": "Invalid limit value!!"
-                       }, 400
-        else:
-            limit = 6
-
-        if page:
-            try:
-                page = int(page)
-                if page < 1:
-                    return {
-                               "message": "Page number must be a positive integer!! "
-                           }, 400
-            except Exception:
-                return {
-                           "message": "Invalid page value!!"
-                       }, 400
-        else:
-            page = 1
+        fields, error = requested_fields(args, CATEGORY_FIELDS, CATEGORY_SUMMARY)
+        if not error:
+            error = page_limit_error(limit)
+        if not error:
+            per_category, error = requested_expansion(args)
+        if error:
+            return {"message": error, "status": "error"}, 400
 
         if q:
-            categories = Categories.query. \
-                filter(Categories.name.like('%' + q + '%')).paginate(page, limit)
-            user_categories = []
-            for x in categories.items:
-                if x.user_id == user_id:
-                    user_categories.append(x)
-            if user_categories:
-                categories = []
-                for category in user_categories:
-                    obj = {
-                        "id": category.id,
-                        "name": category.name.title(),
-                        "desc": category.desc,
-                        "date_created": humanize.naturaldate(category.date_created),
-                        "date_modified": humanize.naturaldate(category.date_modified),
-                        "user_id": category.user_id
-                    }
-                    categories.append(obj)
+            categories = Categories.query.filter_by(user_id=user_id).\
+                filter(Categories.name.like('%' + q + '%')).\
+                options(load_fields(Categories, fields)).paginate(page, limit)
+            if categories.items:
+                found = [serialize(category, fields) for category in categories.items]
+                if per_category:
+                    expand_recipes(categories.items, found, per_category)
                 response = jsonify({
-                    "categories": categories,
+                    "categories": found,
                     "status": "success"
                 })
                 response.status_code = 200
@@ -415,7 +612,7 @@ class UserCategory(Resource):
 
         try:
             recipe_category = Categories.query.filter_by(user_id=user_id).order_by(desc(Categories.date_created)).\
-                paginate(page, limit, error_out=True)
+                options(load_fields(Categories, fields)).paginate(page, limit, error_out=True)
         except Exception as e:
             response = jsonify({
                 "message": str(e),
@@ -425,17 +622,9 @@ class UserCategory(Resource):
             return response
 
         if recipe_category:
-            recipecategories = []
-            for category in recipe_category.items:
-                obj = {
-                    "id": category.id,
-                    "name": category.name.title(),
-                    "desc": category.desc,
-                    "date_created": humanize.naturaldate(category.date_created),
-                    "date_modified": humanize.naturaldate(category.date_modified),
-                    "user_id": category.user_id
-                }
-                recipecategories.append(obj)
+            recipecategories = [serialize(category, fields) for category in recipe_category.items]
+            if recipecategories and per_category:
+                expand_recipes(recipe_category.items, recipecategories, per_category)
             response = jsonify({'Next Page': recipe_category.next_num,
                                 'Prev Page': recipe_category.prev_num,
                                 'Has next': recipe_category.has_next,
@@ -455,94 +644,69 @@ class UserCategory(Resource):
 
             return response
 
-    @api.expect(category_parser)
+    @category_namespace.expect(category_schema.parser)
+    @idempotent
     def post(self, user_id):
         """Handles adding a new category [ENDPOINT] POST /category"""
-        post_data = category_parser.parse_args()
-
-        category = Categories.query.filter_by(name=post_data['name'].strip().lower()).filter_by(user_id=user_id).first()
-        if not category:
-
-            if post_data:
-                name = post_data['name'].strip().lower()
-                desc = post_data['desc'].strip().lower()
-
-                if len(name) > 30:
-                    response = jsonify({
-                        "Message": "Please make the length of the name less than 30 characters",
-                        "Status": "error"
-                    })
-                    response.status_code = 400
-                    return response
+        post_data, error = category_schema.load()
+        if error:
+            return error, 400
 
-                if name and desc:
-                    if Categories.validate_input(name=name, desc=desc):
-                        response = jsonify({
-                            "message": "{} contains invalid characters".format(
-                                Categories.validate_input(name=name, desc=desc)),
-                            "status": "error"})
-                        response.status_code = 400
-                        return response
-                    category = Categories(name=name, desc=desc, user_id=user_id)
-                    category.save()
-                    obj = {
-                        "id": category.id,
-                        "name": category.name.title(),
-                        "desc": category.desc,
-                        "date_created": humanize.naturaldate(category.date_created),
-                        "date_modified": humanize.naturaldate(category.date_modified),
-                        "user_id": category.user_id
-                    }
-
-                    response = jsonify({
-                        "message": "Category added successfully",
-                        "status": "success",
-                        "category": obj
-                    })
-                    response.status_code = 201
-                    return response
-            response = jsonify({
-                "message": "Name or description cannot be empty",
-                "status": "error"
-            })
-            response.status_code = 400
-            return response
-        else:
+        category = Categories(name=post_data['name'], desc=post_data['desc'], user_id=user_id)
+        try:
+            category.save()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
             response = jsonify({
                 "message": "Category already exists",
                 "status": "error"
             })
             response.status_code = 400
             return response
+        obj = {
+            "id": category.id,
+            "name": category.name.title(),
+            "desc": category.desc,
+            "date_created": humanize.naturaldate(category.date_created),
+            "date_modified": humanize.naturaldate(category.date_modified),
+            "user_id": category.user_id
+        }
+
+        response = jsonify({
+            "message": "Category added successfully",
+            "status": "success",
+            "category": obj
+        })
+        response.status_code = 201
+        return response
 
 
-category_parser = api.parser()
-category_parser.add_argument('name', type=str, help='Category name', location='form', required=True)
-category_parser.add_argument('desc', type=str, help='Category Description', location='form', required=True)
+# fields= and view= for endpoints returning a single resource
+fields_schema = Schema(*fields_fields)
 
 
-@category_namespace.route('/<int:_id>', methods=['GET', 'PUT', 'DELETE'])
+@category_namespace.route('/<int:_id>', methods=['GET', 'PUT', 'PATCH', 'DELETE'])
 class UserCategories(Resource):
     method_decorators = [token_required]
 
-    @staticmethod
-    def get(user_id, _id=None):
+    @category_namespace.doc(parser=fields_schema.parser)
+    def get(self, user_id, _id=None):
         """Gets a single category by id [ENDPOINT] GET /category/<id>"""
+        args, error = fields_schema.load()
+        if error:
+            return error, 400
+        fields, error = requested_fields(args, CATEGORY_FIELDS, CATEGORY_SUMMARY)
+        if error:
+            return {"message": error, "status": "error"}, 400
 
         if _id:
-            category = Categories.query.filter_by(id=_id).filter_by(user_id=user_id).first()
+            category = Categories.query.filter_by(id=_id).filter_by(user_id=user_id).\
+                options(load_fields(Categories, fields)).first()
             if category:
-                obj = {
-                    "id": category.id,
-                    "name": category.name.title(),
-                    "desc": category.desc,
-                    "date_created"
-                    "": humanize.naturaldate(category.date_created),
-                    "date_modified": humanize.naturaldate(category.date_modified),
-                    "user_id": category.user_id
-                }
                 response = jsonify({
-                    "category": obj,
+                    "category": serialize(category, fields),
                     "status": "success",
                 })
                 response.status_code = 200
@@ -554,68 +718,44 @@ class UserCategories(Resource):
             response.status_code = 404
             return response
 
-    @api.expect(category_parser)
+    @category_namespace.expect(category_schema.parser)
     def put(self, user_id, _id):
         """Handles adding updating an existing category [ENDPOINT] PUT /category/<id>"""
 
-        category = Categories.query.filter_by(id=_id).first()
+        category = Categories.owned(_id, user_id)
 
         if category:
-            post_data = category_parser.parse_args()
-            if post_data:
-                name = post_data['name'].strip().lower()
-                desc = post_data['desc'].strip().lower()
-
-                if len(name) > 30:
-                    response = jsonify({
-                        "Message": "Please make the length of the name less than 30 characters",
-                        "Status": "error"
-                    })
-                    response.status_code = 400
-                    return response
-
-                if name and desc:
-                    if Categories.validate_input(name=name, desc=desc):
-                        response = jsonify({
-                            "message": "{} contains invalid characters".format(
-                                Categories.validate_input(name=name, desc=desc)),
-                            "status": "error"})
-                        response.status_code = 400
-                        return response
-                    check_category = Categories.query.filter_by(user_id=user_id, name=name.strip().lower()).first()
-                    if check_category:
+            post_data, error = category_schema.load()
+            if error:
+                return error, 400
 
-                        response = jsonify({
-                            "message": "Category already exists",
-                            "status": "error",
-                        })
-                        response.status_code = 400
-                        if check_category.id != _id:
-                            return response
-
-                    category.update(name, desc, _id)
-
-                    obj = {
-                        "id": category.id,
-                        "name": category.name.title(),
-                        "desc": category.desc,
-                        "date_created": humanize.naturaldate(category.date_created),
-                        "date_modified": humanize.naturaldate(category.date_modified),
-                        "user_id": category.user_id
-                    }
-                    response = jsonify({
-                        "message": "Category updated successfully",
-                        "status": "success",
-                        "category": obj
-                    })
-                    response.status_code = 200
-                    return response
+            try:
+                category.update(post_data['name'], post_data['desc'], _id)
+            except IntegrityError as e:
+                db.session.rollback()
+                if not is_unique_violation(e):
+                    raise
+                response = jsonify({
+                    "message": "Category already exists",
+                    "status": "error",
+                })
+                response.status_code = 400
+                return response
 
+            obj = {
+                "id": category.id,
+                "name": category.name.title(),
+                "desc": category.desc,
+                "date_created": humanize.naturaldate(category.date_created),
+                "date_modified": humanize.naturaldate(category.date_modified),
+                "user_id": category.user_id
+            }
             response = jsonify({
-                "message": "Name or description cannot be empty",
-                "status": "error"
+                "message": "Category updated successfully",
+                "status": "success",
+                "category": obj
             })
-            response.status_code = 400
+            response.status_code = 200
             return response
         response = jsonify({
             "message": "Category does not exist",
@@ -625,13 +765,43 @@ class UserCategories(Resource):
         response.status_code = 404
         return response
 
+    @category_namespace.expect(category_schema.parser)
+    def patch(self, user_id, _id):
+        """Updates the given fields of a category [ENDPOINT] PATCH /category/<id>"""
+        values, error = category_schema.load(partial=True)
+        if error:
+            return error, 400
+        if not values:
+            return {"message": "Nothing to update", "status": "error"}, 400
+
+        try:
+            category = Categories.patch(_id, user_id, values)
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
+            return {"message": "Category already exists", "status": "error"}, 400
+
+        if not category:
+            return {"message": "Category does not exist", "status": "error"}, 404
+        response = jsonify({
+            "message": "Category updated successfully",
+            "status": "success",
+            "category": serialize(category, CATEGORY_FIELDS)
+        })
+        response.status_code = 200
+        return response
+
     @staticmethod
     def delete(user_id, _id):
         """Handles deleting an existing category [ENDPOINT] DELETE /category/<id>"""
 
-        category = Categories.query.filter_by(id=_id).filter_by(user_id=user_id).first()
+        category = Categories.owned(_id, user_id)
         if category:
+            image_keys = RecipeImage.keys_of_category(_id)
             category.delete()
+            forget_category(category_id=_id)
+            get_storage().delete(*image_keys)
             response = jsonify({
                 "message": "Category deleted successfully",
                 "status": "success"
@@ -646,30 +816,39 @@ class UserCategories(Resource):
         return response
 
 
-recipe_parser = api.parser()
-recipe_get_parser = api.parser()
-recipe_get_parser.add_argument('q', type=str, help='Search')
-recipe_get_parser.add_argument('page', type=int, help='Page number, default=1')
-recipe_get_parser.add_argument('limit', type=int, help='Limit per page, default=6')
-recipe_parser.add_argument('name', type=str, help='Recipe name', location='form', required=True)
-recipe_parser.add_argument('time', type=str, help='Expected time', location='form', required=True)
-recipe_parser.add_argument('ingredients', type=str, help='Ingredients', location='form', required=True)
-recipe_parser.add_argument('procedure', type=str, help='Procedures', location='form', required=True)
+def recipe_fields(too_long):
+    """Fields of a recipe form, too_long is the message for a long name or time"""
+    return (
+        Field('name', required=True, lower=True, max_length=30, forbid=INVALID_CHAR, help='Recipe name',
+              messages={'too_long': too_long}),
+        Field('time', required=True, lower=True, max_length=30, forbid=INVALID_CHAR, help='Expected time',
+              messages={'too_long': too_long}),
+        Field('ingredients', required=True, lower=True, max_length=256, forbid=INVALID_CHAR, help='Ingredients'),
+        Field('procedure', required=True, lower=True, max_length=256, forbid=INVALID_CHAR, help='Procedures'),
+    )
+
+
+recipe_list_schema = Schema(*(listing_fields + (
+    Field('min_time', type=int, locations=QUERY, minimum=0, help='Shortest time in minutes',
+          messages={'type': "Invalid min_time value!!"}),
+    Field('max_time', type=int, locations=QUERY, minimum=0, help='Longest time in minutes',
+          messages={'type': "Invalid max_time value!!"}),
+    Field('sort', locations=QUERY, default='-date_created', pattern=re.compile(r'^-?(time|name|date_created)$'),
+          help='time, name or date_created, with - for descending, default=-date_created',
+          messages={'pattern': "Invalid sort. Use time, name or date_created, with - for descending"}),
+)))
+recipe_schema = Schema(*recipe_fields("Please make the name or time shorter than 30 characters"),
+                       empty="Name or time or ingredients or procedure cannot be empty")
 
 
 @recipe_namespace.route('', methods=['GET', 'POST'])
 class UserRecipe(Resource):
     method_decorators = [token_required]
 
-    @api.doc(parser=recipe_get_parser)
+    @recipe_namespace.doc(parser=recipe_list_schema.parser)
     def get(self, user_id, category_id):
         """Gets all Recipes[ENDPOINT] GET /category/<int:category_id>/recipes """
-        args = recipe_get_parser.parse_args()
-        q = request.values.get('q', '').strip().lower()
-        page = args['page']
-        limit = args['limit']
-
-        if not Categories.get_single(category_id):
+        if not owns_category(category_id, user_id):
             response = jsonify({
                 "message": "Category does not exist",
                 "status": "error"
@@ -677,59 +856,26 @@ class UserRecipe(Resource):
             response.status_code = 404
             return response
 
-        if limit:
-            try:
-                limit = int(limit)
-                if limit < 1:
-                    return {
-                               "message": "Limit number must be a positive integer!! "
-                           }, 400
-            except Exception:
-                return {
-                           "message": "Invalid limit value!!"
-                       }, 400
-        else:
-            limit = 6
+        args, error = recipe_list_schema.load()
+        if error:
+            return error, 400
+        q = args['q']
+        page = args['page']
+        limit = args['limit']
 
-        if page:
-            try:
-                page = int(page)
-                if page < 1:
-                    return {
-                               "message": "Page number must be a positive integer!! "
-                           }, 400
-            except Exception:
-                return {
-                           "message": "Invalid page value!!"
-                       }, 400
-        else:
-            page = 1
+        fields, error = requested_fields(args, RECIPE_FIELDS, RECIPE_SUMMARY)
+        if not error:
+            error = page_limit_error(limit)
+        if error:
+            return {"message": error, "status": "error"}, 400
 
         if q:
-
-            recipes = Recipes.query. \
-                filter(Recipes.name.like('%' + q + '%')).paginate(page, limit)
-            user_recipes = []
-            for x in recipes.items:
-                if x.category_id == category_id:
-                    user_recipes.append(x)
-            if user_recipes:
-                recipes = []
-                for recipe in user_recipes:
-                    obj = {
-                        "id": recipe.id,
-                        "name": recipe.name.title(),
-                        "time": recipe.time,
-                        "ingredients": recipe.ingredients,
-                        "procedure": recipe.procedure,
-                        "category_id": recipe.category_id,
-                        "date_created": humanize.naturaldate(recipe.date_created),
-                        "date_modified": humanize.naturaldate(recipe.date_modified),
-                    }
-                    recipes.append(obj)
-
+            recipes = filter_recipes(Recipes.query.filter_by(category_id=category_id, user_id=user_id).
+                                     filter(Recipes.name.like('%' + q + '%')), args).\
+                options(load_fields(Recipes, fields)).paginate(page, limit)
+            if recipes.items:
                 response = jsonify({
-                    "recipes": recipes,
+                    "recipes": [serialize(recipe, fields) for recipe in recipes.items],
                     "status": "success"
                 })
                 response.status_code = 200
@@ -741,9 +887,12 @@ class UserRecipe(Resource):
                 })
                 response.status_code = 404
                 return response
+        query = filter_recipes(Recipes.query.filter_by(category_id=category_id), args).\
+            options(load_fields(Recipes, fields))
+        # big pages are streamed instead of being built in memory as one string
+        stream = limit >= current_app.config.get('JSON_STREAM_MIN_LIMIT', 200)
         try:
-            category_recipes = Recipes.query.filter_by(category_id=category_id).order_by(desc(Recipes.date_created)).\
-                paginate(page, limit, error_out=True)
+            category_recipes = paginate(query, page, limit, load_items=not stream)
         except Exception as e:
             response = jsonify({
                 "message": str(e).split(".")[0] + '.',
@@ -753,52 +902,27 @@ class UserRecipe(Resource):
             return response
 
         if category_recipes:
-
-            if not Categories.query.filter_by(id=category_id).filter_by(user_id=user_id).first():
-                response = jsonify({
-                    "message": "Category does not exist",
-                    "status": "error"
-                })
-                response.status_code = 404
-                return response
-            recipe = Recipes.get_all(category_id)
-            if not recipe:
+            if not category_recipes.total:
                 response = jsonify({
                     "message": "Recipe not available at the moment. You can add some.",
                     "status": "error"
                 })
                 response.status_code = 404
                 return response
-            categoryrecipes = []
-            for rec in category_recipes.items:
-                obj = {
-                    "id": rec.id,
-                    "name": rec.name.title(),
-                    "time": rec.time,
-                    "ingredients": rec.ingredients,
-                    "procedure": rec.procedure,
-                    "category_id": rec.category_id,
-                    "date_created": humanize.naturaldate(rec.date_created),
-                    "date_modified": humanize.naturaldate(rec.date_modified),
-                }
-                categoryrecipes.append(obj)
-
-            response = jsonify({'Next Page': category_recipes.next_num,
-                                'Prev Page': category_recipes.prev_num,
-                                'Has next': category_recipes.has_next,
-                                'total items': category_recipes.total,
-                                'current page': category_recipes.page,
-                                'total pages': category_recipes.pages,
-                                'Has previous': category_recipes.has_prev}, categoryrecipes)
+            if stream:
+                return stream_page(page_meta(category_recipes), query.limit(limit).offset((page - 1) * limit),
+                                   fields)
+            categoryrecipes = [serialize(rec, fields) for rec in category_recipes.items]
+
+            response = jsonify(page_meta(category_recipes), categoryrecipes)
             response.status_code = 200
             return response
 
-    @api.expect(recipe_parser)
+    @recipe_namespace.expect(recipe_schema.parser)
+    @idempotent
     def post(self, user_id, category_id):
         """Handles adding a new recipe [ENDPOINT] POST /categories/<category_id>/recipe"""
-        post_data = recipe_parser.parse_args()
-
-        if not Categories.query.filter_by(id=category_id).filter_by(user_id=user_id).first():
+        if not owns_category(category_id, user_id):
             response = jsonify({
                 "message": "Category does not exist",
                 "status": "error"
@@ -806,87 +930,70 @@ class UserRecipe(Resource):
             response.status_code = 404
             return response
 
-        recipe = Recipes.query.filter_by(name=post_data['name'].strip().lower()). \
-            filter_by(category_id=category_id).first()
-        if not recipe:
-
-            if post_data:
-                name = post_data['name'].strip().lower()
-                time = post_data['time'].strip().lower()
-                ingredients = post_data['ingredients'].strip().lower()
-                procedure = post_data['procedure'].strip().lower()
-
-                if len(name) >= 30 or len(time) >= 30:
-                    response = jsonify({
-                        "Message": "Please make the name or time shorter than 30 characters",
-                        "Status": "error"
-                    })
-                    response.status_code = 400
-                    return response
-
-                if name and time and ingredients and procedure:
-                    if Categories.validate_input(name=name, time=time,
-                                                 ingredients=ingredients, procedure=procedure):
-                        response = jsonify({
-                            "message": "{} contains invalid characters".format(
-                                Categories.validate_input(name=name, time=time,
-                                                          ingredients=ingredients, procedure=procedure)),
-                            "status": "error"})
-                        response.status_code = 400
-                        return response
-                    recipe = Recipes(name=name, time=time,
-                                     ingredients=ingredients, procedure=procedure,
-                                     category_id=category_id, user_id=user_id)
-                    recipe.save()
-                    obj = {
-                        "id": recipe.id,
-                        "name": recipe.name.title(),
-                        "time": recipe.time,
-                        "ingredients": recipe.ingredients,
-                        "procedure": recipe.procedure,
-                        "category_id": recipe.category_id,
-                        "date_created": humanize.naturaldate(recipe.date_created),
-                        "date_modified": humanize.naturaldate(recipe.date_modified),
-
-                    }
-                    response = jsonify({
-                        "message": "Recipe added successfully",
-                        "status": "success",
-                        "recipe": obj
-                    })
+        post_data, error = recipe_schema.load()
+        if error:
+            return error, 400
 
-                    response.status_code = 201
-                    return response
+        recipe = Recipes(name=post_data['name'], time=post_data['time'],
+                         ingredients=post_data['ingredients'], procedure=post_data['procedure'],
+                         category_id=category_id, user_id=user_id)
+        try:
+            recipe.save()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
             response = jsonify({
-                "message": "Name or time or ingredients or procedure cannot be empty",
+                "message": "Recipe already exists",
                 "status": "error"
             })
-            response.status_code = 400
+            response.status_code = 401
             return response
+        obj = {
+            "id": recipe.id,
+            "name": recipe.name.title(),
+            "time": recipe.time,
+            "ingredients": recipe.ingredients,
+            "procedure": recipe.procedure,
+            "category_id": recipe.category_id,
+            "date_created": humanize.naturaldate(recipe.date_created),
+            "date_modified": humanize.naturaldate(recipe.date_modified),
+
+        }
         response = jsonify({
-            "message": "Recipe already exists",
-            "status": "error"
+            "message": "Recipe added successfully",
+            "status": "success",
+            "recipe": obj
         })
-        response.status_code = 401
-        return response
 
+        response.status_code = 201
+        return response
 
-recipe_parser = api.parser()
 
-recipe_parser.add_argument('name', type=str, help='Recipe name', location='form', required=True)
-recipe_parser.add_argument('time', type=str, help='Expected time', location='form', required=True)
-recipe_parser.add_argument('ingredients', type=str, help='Ingredients', location='form', required=True)
-recipe_parser.add_argument('procedure', type=str, help='procedures', location='form', required=True)
+recipe_update_schema = Schema(
+    *recipe_fields("Please make the length of the name or time shorter than 30 characters"),
+    empty="Name or time or ingredients or procedure cannot be empty")
+# PATCH only validates the fields that were sent, category_id moves the recipe
+recipe_patch_schema = Schema(*(recipe_update_schema.fields + (
+    Field('category_id', type=int, help='Moves the recipe to this category'),
+)))
 
 
-@recipe_namespace.route('/<int:_id>', methods=['GET', 'PUT', 'DELETE'])
+@recipe_namespace.route('/<int:_id>', methods=['GET', 'PUT', 'PATCH', 'DELETE'])
 class UserRecipes(Resource):
     method_decorators = [token_required]
 
-    @staticmethod
-    def get(user_id, category_id, _id=None):
+    @recipe_namespace.doc(parser=fields_schema.parser)
+    def get(self, user_id, category_id, _id=None):
         """Gets a single recipe by id [ENDPOINT] GET /category/<int:category_id>/recipes/<int:_id> """
-        if not Categories.query.filter_by(id=category_id).filter_by(user_id=user_id).first():
+        args, error = fields_schema.load()
+        if error:
+            return error, 400
+        fields, error = requested_fields(args, RECIPE_FIELDS, RECIPE_SUMMARY)
+        if error:
+            return {"message": error, "status": "error"}, 400
+
+        if not owns_category(category_id, user_id):
             response = jsonify({
                 "message": "Category does not exist",
                 "status": "error"
@@ -895,7 +1002,8 @@ class UserRecipes(Resource):
             return response
 
         if _id:
-            recipe = Recipes.get_single(_id, category_id)
+            recipe = Recipes.query.filter_by(id=_id, category_id=category_id).\
+                options(load_fields(Recipes, fields)).first()
             if not recipe:
                 response = jsonify({
                     "message": "Recipe not available at the moment. You can add some",
@@ -904,27 +1012,17 @@ class UserRecipes(Resource):
                 response.status_code = 404
                 return response
 
-            obj = {
-                "id": recipe.id,
-                "name": recipe.name.title(),
-                "time": recipe.time,
-                "ingredients": recipe.ingredients,
-                "procedure": recipe.procedure,
-                "category_id": recipe.category_id,
-                "date_created": humanize.naturaldate(recipe.date_created),
-                "date_modified": humanize.naturaldate(recipe.date_modified),
-            }
             response = jsonify({
-                "recipes": obj,
+                "recipes": serialize(recipe, fields),
                 "status": "success"
             })
             response.status_code = 200
             return response
 
-    @api.expect(recipe_parser)
+    @recipe_namespace.expect(recipe_update_schema.parser)
     def put(self, user_id, category_id, _id):
         """Handles updating an existing recipe [ENDPOINT] PUT /categories/<category_id>/recipes/<id>"""
-        if not Categories.query.filter_by(id=category_id).filter_by(user_id=user_id).first():
+        if not owns_category(category_id, user_id):
             response = jsonify({
                 "message": "Category does not exist",
                 "status": "error"
@@ -935,71 +1033,41 @@ class UserRecipes(Resource):
         recipe = Recipes.get_single(_id, category_id)
 
         if recipe:
-            post_data = recipe_parser.parse_args()
-
-            if post_data:
-                name = post_data['name'].strip().lower()
-                time = post_data['time'].strip().lower()
-                ingredients = post_data['ingredients'].strip().lower()
-                procedure = post_data['procedure'].strip().lower()
+            post_data, error = recipe_update_schema.load()
+            if error:
+                return error, 400
 
-                if len(name) > 30 or len(time) > 30:
-                    response = jsonify({
-                        "Message": "Please make the length of the name or time shorter than 30 characters",
-                        "Status": "error"
-                    })
-                    response.status_code = 400
-                    return response
-
-                if name and time and ingredients and procedure:
-                    if Categories.validate_input(name=name, time=time,
-                                                 ingredients=ingredients, procedure=procedure):
-                        response = jsonify({
-                            "message": "{} contains invalid characters".format(
-                                Categories.validate_input(name=name, time=time,
-                                                          ingredients=ingredients, procedure=procedure)),
-                            "status": "error"})
-                        response.status_code = 400
-                        return response
-
-                    recipe_check = Recipes.query.filter_by(user_id=user_id, category_id=category_id,
-                                                           name=name.strip().lower()).first()
-
-                    if recipe_check:
-
-                        response = jsonify({
-                            "message": "Recipe already exists",
-                            "status": "error"
-                        })
-                        response.status_code = 400
-
-                        if recipe_check.id != _id:
-                            return response
-                    recipe.update(name, time, ingredients, procedure, _id)
-
-                    obj = {
-                        "id": recipe.id,
-                        "name": recipe.name.title(),
-                        "time": recipe.time,
-                        "ingredients": recipe.ingredients,
-                        "procedure": recipe.procedure,
-                        "category_id": recipe.category_id,
-                        "date_created": humanize.naturaldate(recipe.date_created),
-                        "date_modified": humanize.naturaldate(recipe.date_modified),
-                    }
-                    response = jsonify({
-                        "message": "Recipe updated successfully",
-                        "status": "success",
-                        "recipe": obj
-                    })
-                    response.status_code = 200
-                    return response
+            try:
+                recipe.update(post_data['name'], post_data['time'], post_data['ingredients'],
+                              post_data['procedure'], _id)
+            except IntegrityError as e:
+                db.session.rollback()
+                if not is_unique_violation(e):
+                    raise
                 response = jsonify({
-                    "message": "Name or time or ingredients or procedure cannot be empty",
+                    "message": "Recipe already exists",
                     "status": "error"
                 })
                 response.status_code = 400
                 return response
+
+            obj = {
+                "id": recipe.id,
+                "name": recipe.name.title(),
+                "time": recipe.time,
+                "ingredients": recipe.ingredients,
+                "procedure": recipe.procedure,
+                "category_id": recipe.category_id,
+                "date_created": humanize.naturaldate(recipe.date_created),
+                "date_modified": humanize.naturaldate(recipe.date_modified),
+            }
+            response = jsonify({
+                "message": "Recipe updated successfully",
+                "status": "success",
+                "recipe": obj
+            })
+            response.status_code = 200
+            return response
         response = jsonify({
             "message": "Recipe not found",
             "status": "error"
@@ -1007,10 +1075,41 @@ class UserRecipes(Resource):
         response.status_code = 404
         return response
 
+    @recipe_namespace.expect(recipe_patch_schema.parser)
+    def patch(self, user_id, category_id, _id):
+        """Updates the given fields of a recipe [ENDPOINT] PATCH /category/<category_id>/recipes/<id>"""
+        values, error = recipe_patch_schema.load(partial=True)
+        if error:
+            return error, 400
+        if not values:
+            return {"message": "Nothing to update", "status": "error"}, 400
+
+        target = values.get('category_id', category_id)
+        if target != category_id and not owns_category(target, user_id):
+            return {"message": "Category does not exist", "status": "error"}, 404
+
+        try:
+            recipe = Recipes.patch(_id, category_id, user_id, values)
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
+            return {"message": "Recipe already exists", "status": "error"}, 400
+
+        if not recipe:
+            return {"message": "Recipe not found", "status": "error"}, 404
+        response = jsonify({
+            "message": "Recipe updated successfully",
+            "status": "success",
+            "recipe": serialize(recipe, RECIPE_FIELDS)
+        })
+        response.status_code = 200
+        return response
+
     @staticmethod
     def delete(user_id, category_id, _id):
         """Deletes a single recipe by id [ENDPOINT] DELETE /category/<int:category_id>/recipes/<int:_id> """
-        if not Categories.query.filter_by(id=category_id).filter_by(user_id=user_id).first():
+        if not owns_category(category_id, user_id):
             response = jsonify({
                 "message": "Category does not exist",
                 "status": "error"
@@ -1020,7 +1119,10 @@ class UserRecipes(Resource):
 
         recipe = Recipes.get_single(_id, category_id)
         if recipe:
+            image = RecipeImage.query.filter_by(recipe_id=recipe.id).first()
             recipe.delete()
+            if image:
+                get_storage().delete(image.key, image.thumbnail_key)
             response = jsonify({
                 "message": "Recipe deleted successfully",
                 "status": "success"
@@ -1033,3 +1135,256 @@ class UserRecipes(Resource):
         })
         response.status_code = 404
         return response
+
+
+def image_json(image, category_id):
+    """Serializes a recipe image, its urls change whenever the image is replaced"""
+    url = '{}/category/{}/recipes/{}/image?v={}'.format(
+        API_PREFIX, category_id, image.recipe_id, image.digest[:12])
+    return {
+        "content_type": image.content_type,
+        "size": image.size,
+        "url": url,
+        "thumbnail_url": url + '&size=thumbnail' if image.has_thumbnail else None
+    }
+
+
+@task('recipe_thumbnail')
+def recipe_thumbnail(image_id, user_id):
+    """Stores a thumbnail of a recipe image"""
+    use_shard(user_id)
+    image = RecipeImage.query.get(image_id)
+    if image is None:
+        # replaced or deleted since
+        return
+    storage = get_storage()
+    with storage.open(image.key) as source:
+        thumbnail = make_thumbnail(source, image.content_type, current_app.config['IMAGE_THUMBNAIL_SIZE'])
+    if thumbnail is not None:
+        storage.put(image.thumbnail_key, thumbnail)
+        RecipeImage.query.filter_by(id=image_id).update({'has_thumbnail': True}, synchronize_session=False)
+        db.session.commit()
+
+
+@recipe_namespace.route('/<int:_id>/image', methods=['GET', 'PUT', 'DELETE'])
+class RecipeImageView(Resource):
+    method_decorators = [token_required]
+
+    @staticmethod
+    def find(user_id, category_id, _id):
+        """Returns (recipe, error response), the recipe must be in a category of the user"""
+        if not owns_category(category_id, user_id):
+            return None, ({"message": "Category does not exist", "status": "error"}, 404)
+        recipe = Recipes.get_single(_id, category_id)
+        if recipe is None:
+            return None, ({"message": "Recipe not found", "status": "error"}, 404)
+        return recipe, None
+
+    def get(self, user_id, category_id, _id):
+        """
+        Downloads the image of a recipe [ENDPOINT] GET /category/<category_id>/recipes/<id>/image
+        size=thumbnail picks the thumbnail, once it was made. Range, If-None-Match and
+        If-Modified-Since are answered by the storage.
+        """
+        recipe, error = self.find(user_id, category_id, _id)
+        if error:
+            return error
+        image = RecipeImage.query.filter_by(recipe_id=recipe.id).first()
+        if image is None:
+            return {"message": "Recipe has no image", "status": "error"}, 404
+        key = image.thumbnail_key if request.args.get('size') == 'thumbnail' and image.has_thumbnail else image.key
+        return get_storage().send(key, image.content_type, current_app.config['IMAGE_MAX_AGE'])
+
+    def put(self, user_id, category_id, _id):
+        """
+        Uploads the image of a recipe as the raw request body [ENDPOINT] PUT /category/<category_id>/recipes/<id>/image
+        The Content-Type header must be image/jpeg, image/png, image/gif or image/webp.
+        """
+        recipe, error = self.find(user_id, category_id, _id)
+        if error:
+            return error
+        content_type = request.mimetype
+        if content_type not in SIGNATURES:
+            return {"message": "Please upload a JPEG, PNG, GIF or WebP image", "status": "error"}, 415
+        max_size = current_app.config['IMAGE_MAX_SIZE']
+        too_large = {"message": "Image must be at most {} bytes".format(max_size), "status": "error"}
+        if (request.content_length or 0) > max_size:
+            return too_large, 413
+        if not request.content_length:
+            return {"message": "Please send the image as the request body", "status": "error"}, 400
+
+        storage = get_storage()
+        try:
+            # streamed to disk chunk by chunk, the upload is never held in memory as a whole
+            key, size, digest = storage.save('{}/{}'.format(user_id, recipe.id),
+                                             image_chunks(request.stream, content_type), max_size)
+        except InvalidImage:
+            return {"message": "The file is not a valid {} image".format(content_type), "status": "error"}, 415
+        except FileTooLarge:
+            return too_large, 413
+
+        image = RecipeImage.query.filter_by(recipe_id=recipe.id).first()
+        replaced = [image.key, image.thumbnail_key] if image and image.key != key else []
+        if image is None:
+            image = RecipeImage(recipe_id=recipe.id, user_id=user_id)
+        image.key, image.content_type, image.size, image.digest = key, content_type, size, digest
+        image.has_thumbnail = False
+        image.save()
+        storage.delete(*replaced)
+        enqueue('recipe_thumbnail', {'image_id': image.id, 'user_id': user_id}, user_id=user_id)
+
+        response = jsonify({
+            "message": "Image uploaded successfully",
+            "image": image_json(image, category_id),
+            "status": "success"
+        })
+        response.status_code = 201
+        return response
+
+    def delete(self, user_id, category_id, _id):
+        """Deletes the image of a recipe [ENDPOINT] DELETE /category/<category_id>/recipes/<id>/image"""
+        recipe, error = self.find(user_id, category_id, _id)
+        if error:
+            return error
+        image = RecipeImage.query.filter_by(recipe_id=recipe.id).first()
+        if image is None:
+            return {"message": "Recipe has no image", "status": "error"}, 404
+        db.session.delete(image)
+        db.session.commit()
+        get_storage().delete(image.key, image.thumbnail_key)
+        return {"message": "Image deleted successfully", "status": "success"}, 200
+
+
+pantry_schema = Schema(
+    Field('ingredients', required=True, locations=QUERY, help='Comma separated ingredients on hand'),
+    Field('limit', type=int, locations=QUERY, default=10, minimum=1, help='Number of recipes, default=10',
+          messages={'minimum': "Limit number must be a positive integer!! "}),
+    empty="Please list the ingredients you have")
+
+
+@pantry_namespace.route('', methods=['GET'])
+class Pantry(Resource):
+    method_decorators = [token_required]
+
+    @pantry_namespace.doc(parser=pantry_schema.parser)
+    def get(self, user_id):
+        """Ranks the user's recipes by the share of their ingredients on hand [ENDPOINT] GET /pantry"""
+        args, error = pantry_schema.load()
+        if error:
+            return error, 400
+        names = set(normalize(name) for name in args['ingredients'].split(','))
+        names.discard('')
+        limit = args['limit']
+
+        if not names:
+            return {"message": "Please list the ingredients you have", "status": "error"}, 400
+        error = page_limit_error(limit)
+        if error:
+            return {"message": error, "status": "error"}, 400
+
+        ranked = RecipeIngredient.cookable(user_id, names, limit=limit)
+        if not ranked:
+            response = jsonify({
+                "message": "No recipes use those ingredients",
+                "status": "error"
+            })
+            response.status_code = 404
+            return response
+
+        ingredients = RecipeIngredient.names_by_recipe([recipe.id for recipe, matched, total in ranked])
+        recipes = []
+        for recipe, matched, total in ranked:
+            obj = serialize(recipe, RECIPE_SUMMARY)
+            obj.update({
+                "matched": int(matched),
+                "total": int(total),
+                "coverage": round(float(matched) / total, 2),
+                "missing": sorted(ingredients.get(recipe.id, set()) - names)
+            })
+            recipes.append(obj)
+        response = jsonify({
+            "recipes": recipes,
+            "status": "success"
+        })
+        response.status_code = 200
+        return response
+
+
+@batch_namespace.route('')
+class Batch(Resource):
+    method_decorators = [token_required]
+
+    @staticmethod
+    def post(user_id):
+        """
+        Runs several requests in one round trip [ENDPOINT] POST /batch
+        The JSON body lists the requests, e.g. {"requests": [{"method": "GET", "path": "/category?limit=3"},
+        {"method": "POST", "path": "/category", "body": {"name": "soups", "desc": "warm"}}]}
+        """
+        body = request.get_json(silent=True)
+        requests = body.get('requests') if isinstance(body, dict) else None
+        if not isinstance(requests, list) or not requests:
+            return {"message": "Please send a JSON body with a list of requests", "status": "error"}, 400
+        limit = current_app.config['BATCH_MAX_REQUESTS']
+        if len(requests) > limit:
+            return {"message": "A batch can have at most {} requests".format(limit), "status": "error"}, 400
+        for number, sub_request in enumerate(requests):
+            error = batch_request_error(sub_request)
+            if error:
+                return {"message": "Request {}: {}".format(number, error), "status": "error"}, 400
+
+        responses = [run_batch_request(sub_request, user_id) for sub_request in requests]
+        response = jsonify({
+            "responses": responses,
+            "status": "success"
+        })
+        response.status_code = 200
+        return response
+
+
+def batch_request_error(sub_request):
+    """Returns why a sub-request of a batch is invalid, None when it is valid"""
+    if not isinstance(sub_request, dict):
+        return "Each request must be an object with a method and a path"
+    if str(sub_request.get('method', 'GET')).upper() not in BATCH_METHODS:
+        return "Method must be one of {}".format(', '.join(BATCH_METHODS))
+    path = sub_request.get('path')
+    if not isinstance(path, string_types) or not path.startswith('/'):
+        return "Path must start with /, e.g. /category"
+    if path.split('?')[0].rstrip('/') == batch_namespace.path:
+        return "Batches cannot be nested"
+    if 'body' in sub_request and not isinstance(sub_request['body'], dict):
+        return "Body must be an object"
+    return None
+
+
+def run_batch_request(sub_request, user_id):
+    """
+    Dispatches a sub-request of a batch in-process
+    It shares the app context, and so the database session and shard, of the batch.
+    The before and after request hooks are skipped, the batch as a whole went through them.
+    :return: dict of status and body of the response
+    """
+    app = current_app._get_current_object()
+    builder = EnvironBuilder(path=API_PREFIX + sub_request['path'], base_url=request.host_url,
+                             method=str(sub_request.get('method', 'GET')).upper(),
+                             headers={'Authorization': request.headers.get('Authorization', '')},
+                             data=json.dumps(sub_request['body']) if 'body' in sub_request else None,
+                             content_type='application/json' if 'body' in sub_request else None)
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+    environ[BATCH_USER_ID] = user_id
+
+    with app.request_context(environ):
+        try:
+            response = app.make_response(app.dispatch_request())
+        except Exception as error:
+            response = app.make_response(app.handle_user_exception(error))
+        data = response.get_data()
+    # the session outlives the sub-request and does not expire on commit, a Core UPDATE such as PATCH
+    # would leave the objects it loaded stale for the next sub-request
+    db.session.expire_all()
+    body = json.loads(data.decode()) if response.mimetype == 'application/json' and data else data.decode()
+    return {"path": sub_request['path'], "status": response.status_code, "body": body}
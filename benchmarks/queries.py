@@ -0,0 +1,90 @@
+"""
+Compares the hot lookups built with Query on every call and as baked queries.
+
+Each pair runs the same SQL against the same rows, the difference is the
+Python time spent building and compiling the statement. An in-memory SQLite
+database keeps the round trip out of the numbers, pass --database to time
+them against Postgres instead.
+
+    python benchmarks/queries.py --number 5000
+
+On Python 2.7 and SQLAlchemy 1.1.14, in microseconds per lookup:
+
+                     SQLite              Postgres
+                     query    baked      query    baked
+    token revoked    1088.9   135.4      1327.4   265.3
+    category owner    660.7   164.0       966.9   237.2
+    user by email     512.6   174.4       623.0   268.7
+    together         2262.3   473.9      2917.3   771.2
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from app import db  # noqa: E402
+from app.models import Users, Categories, Blacklist  # noqa: E402
+from app.sharding import init_sharding  # noqa: E402
+
+EMAIL = 'cook@example.com'
+
+
+def revoked_with_query(token, user_id):
+    revoked = db.session.query(Blacklist.token_id).filter_by(revoked_token=token).exists()
+    active = db.session.query(Users.id).filter_by(id=user_id, is_active=True).exists()
+    return db.session.query(db.or_(revoked, ~active)).scalar()
+
+
+def lookups(user_id, category_id):
+    """(name, built on every call, baked) for every hot lookup"""
+    return (
+        ('token revoked', lambda: revoked_with_query('token', user_id),
+         lambda: Blacklist.is_revoked('token', user_id)),
+        ('category owner', lambda: Categories.query.filter_by(id=category_id).filter_by(user_id=user_id).first(),
+         lambda: Categories.owned(category_id, user_id)),
+        ('user by email', lambda: Users.query.filter_by(email=EMAIL).first(),
+         lambda: Users.by_email(EMAIL)),
+    )
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument('--number', type=int, default=5000)
+    arguments.add_argument('--repeat', type=int, default=5)
+    arguments.add_argument('--database', default='sqlite://', help='Database URI, rows are added and removed')
+    args = arguments.parse_args()
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=args.database, SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    init_sharding(app)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        user = Users(email=EMAIL, username='cook', password='secret123')
+        db.session.add(user)
+        db.session.flush()
+        category = Categories(name='soups', desc='warm', user_id=user.id)
+        db.session.add(category)
+        db.session.commit()
+        try:
+            total = [0, 0]
+            for name, built, baked in lookups(user.id, category.id):
+                row = [name]
+                for index, function in enumerate((built, baked)):
+                    function()
+                    best = min(timeit.repeat(function, number=args.number, repeat=args.repeat)) / args.number
+                    total[index] += best
+                    row.append(best * 1e6)
+                print('{:<16} query {:8.1f} us  baked {:8.1f} us'.format(*row))
+            print('{:<16} query {:8.1f} us  baked {:8.1f} us  saved {:.1f} us per request'.format(
+                'together', total[0] * 1e6, total[1] * 1e6, (total[0] - total[1]) * 1e6))
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Measures cold import and first request time of the app.
+
+Each sample runs in a fresh interpreter so nothing is cached between runs.
+``run.py`` builds the app on every revision of this repo, so checking out an
+older commit and running this script gives a comparable baseline.
+
+    APP_SETTINGS=testing python benchmarks/startup.py --runs 10
+
+On Python 2.7 with 30 runs each, in milliseconds. The first request has no
+token, so it is answered with a 403 before any query is sent:
+
+                                     import           first request
+                                     min    median    min    median
+    d56f941 app built at import      173.4  213.5     1.7    1.9
+    9d8db9b create_app factory       174.1  189.4     1.8    2.0
+    e8f335b with the later backlog   229.1  279.3     1.4    2.0
+
+The factory on its own leaves the import time where it was, the mail and
+docs it defers are a few milliseconds. The later backlog adds about 55 ms
+of imports (sharding, metrics, profiling, images, the spec build).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = """
+import json, time
+started = time.time()
+import run
+imported = time.time()
+response = run.app.test_client().get('/api/v1/category')
+finished = time.time()
+print(json.dumps({'import': imported - started, 'first_request': finished - imported,
+                  'status': response.status_code}))
+"""
+
+
+def sample():
+    output = subprocess.check_output([sys.executable, '-c', SAMPLE], cwd=ROOT)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    samples = [sample() for _ in range(args.runs)]
+    for key in ('import', 'first_request'):
+        values = sorted(s[key] * 1000 for s in samples)
+        print('{:<14} min {:8.1f} ms  median {:8.1f} ms'.format(key, values[0], values[len(values) // 2]))
+
+
+if __name__ == '__main__':
+    main()
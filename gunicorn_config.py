@@ -0,0 +1,26 @@
+"""
+Gunicorn settings, used with `gunicorn -c gunicorn_config.py run:app`
+
+The workers share their Prometheus metrics through files in
+prometheus_multiproc_dir, which must be set before the app is imported.
+"""
+import os
+import shutil
+import tempfile
+
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+bind = '0.0.0.0:' + os.getenv('PORT', '5000')
+
+os.environ.setdefault('prometheus_multiproc_dir', os.path.join(tempfile.gettempdir(), 'yummy_metrics'))
+
+
+def on_starting(server):
+    # samples left by a previous run would be added to the new ones
+    directory = os.environ['prometheus_multiproc_dir']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
@@ -9,8 +10,75 @@ class Config(object):
     SECRET_KEY = os.getenv('SECRET')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
+    # comma separated database URIs to spread users over, the first one also holds the user directory
+    SQLALCHEMY_SHARDS = [uri for uri in os.getenv('DATABASE_SHARDS', '').split(',') if uri]
     # Flask-RESTPlus Config
     SWAGGER_UI_DOC_EXPANSION = 'list'
+    # serve the Swagger UI at the site root
+    API_DOCS = True
+    # swagger.json exported by `python manage.py export_spec`, built at startup when missing
+    API_SPEC_PATH = os.getenv('API_SPEC_PATH')
+    API_SPEC_MAX_AGE = 86400
+
+    # gzip, or brotli when installed, for JSON responses of at least COMPRESS_MIN_SIZE bytes
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_LEVEL = 4
+    COMPRESS_STREAM_THRESHOLD = 256 * 1024
+    COMPRESS_CACHE_SIZE = 64
+
+    # request, bcrypt and database timings served at /metrics for Prometheus
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+    # cProfile of requests sent with PROFILE_HEADER: PROFILE_TOKEN, or of a random PROFILE_SAMPLE_RATE of them
+    PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'false').lower() == 'true'
+    PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+    PROFILE_HEADER = 'X-Profile'
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(basedir, os.pardir, 'profiles'))
+
+    # seconds the response of a POST sent with an Idempotency-Key is replayed for
+    IDEMPOTENCY_TTL = 24 * 3600
+
+    # seconds a category owner is cached by each process, 0 only remembers it for the request
+    OWNERSHIP_CACHE_TTL = int(os.getenv('OWNERSHIP_CACHE_TTL', 0))
+    OWNERSHIP_CACHE_SIZE = 10000
+
+    # recipe images, kept by the IMAGE_STORAGE backend of app.storage
+    IMAGE_STORAGE = 'local'
+    IMAGE_DIR = os.getenv('IMAGE_DIR', os.path.join(basedir, os.pardir, 'images'))
+    IMAGE_MAX_SIZE = 5 * 1024 * 1024
+    IMAGE_THUMBNAIL_SIZE = 320
+    # image urls change with the image, so they can be cached for a year
+    IMAGE_MAX_AGE = 365 * 24 * 3600
+    # lets nginx or Apache send the files, see Flask's USE_X_SENDFILE
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+
+    # largest limit= of a listing
+    MAX_PAGE_LIMIT = int(os.getenv('MAX_PAGE_LIMIT', 1000))
+    # recipe pages of at least this many items are streamed, JSON_STREAM_YIELD_PER rows at a time
+    JSON_STREAM_MIN_LIMIT = 200
+    JSON_STREAM_YIELD_PER = 100
+
+    # most requests accepted in one POST /batch
+    BATCH_MAX_REQUESTS = 20
+
+    # largest per_category accepted with GET /category?expand=recipes
+    EXPAND_MAX_PER_CATEGORY = 10
+
+    # deleted accounts are purged by a job, this many rows per transaction
+    ACCOUNT_PURGE_BATCH_SIZE = 500
+
+    # jobs run by `python manage.py worker`, or inline in the request with JOBS_EAGER
+    JOBS_EAGER = False
+    JOBS_CONCURRENCY = int(os.getenv('JOBS_CONCURRENCY', 4))
+    JOBS_POLL_INTERVAL = 1.0
+    JOBS_MAX_ATTEMPTS = 5
+    # seconds before the first retry, doubled for every further attempt
+    JOBS_RETRY_DELAY = 10
+    # seconds a worker may spend on a job before another worker takes it over
+    JOBS_LEASE = 300
 
     MAIL_SERVER = 'smtp.gmail.com'
     MAIL_PORT = 587
@@ -22,6 +90,7 @@ class Config(object):
 
 class ProductionConfig(Config):
     DEBUG = False
+    API_DOCS = os.getenv('API_DOCS', 'true').lower() == 'true'
 
 
 class StagingConfig(Config):
@@ -36,12 +105,24 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
+    JOBS_EAGER = True
     SQLALCHEMY_DATABASE_URI = 'postgresql:///test_db'
+    PROFILE_ENABLED = True
+    PROFILE_TOKEN = 'profile-token'
+    PROFILE_SAMPLE_RATE = 0
+    PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'yummy_profiles')
+    IMAGE_DIR = os.path.join(tempfile.gettempdir(), 'yummy_images')
+
+
+class ShardedTestingConfig(TestingConfig):
+    SQLALCHEMY_SHARDS = ['sqlite:///' + os.path.join(tempfile.gettempdir(), 'yummy_shard{}.db'.format(shard))
+                         for shard in range(3)]
 
 
 app_config = {
     'development': DevelopmentConfig,
     'testing': TestingConfig,
+    'sharded_testing': ShardedTestingConfig,
     'staging': StagingConfig,
     'production': ProductionConfig,
 }
@@ -1,14 +1,98 @@
+import os
 from flask_script import Manager
 from flask_migrate import Migrate, MigrateCommand
-from app.models import db
-from app import app
-migrate = Migrate(app, db)
+from flask import current_app
+from app import create_app, db
+from app.apispec import build_spec
+from app.jobs import Worker
+from app.models import Categories, IdempotencyKey
+from app.profiling import summarize
+from app.seed import Seeder
+from app.sharding import is_sharded, reshard as reshard_users
+
+
+def make_app(config_name=None):
+    """Builds the app only once a command actually runs"""
+    app = create_app(config_name or os.getenv('APP_SETTINGS'))
+    Migrate(app, db)
+    return app
+
 
 # Creating instance of Manager class that handles commands
-manager = Manager(app)
+manager = Manager(make_app)
+manager.add_option('--config', dest='config_name', required=False)
 
 # Define migration command to always be preceded by the word "db" i.e python manage.py db migrate
 manager.add_command('db', MigrateCommand)
 
+
+@manager.option('-u', '--users', dest='users', type=int, default=1000, help='Number of users to create')
+@manager.option('-c', '--categories', dest='categories', default='uniform:1:5',
+                help='Categories per user: fixed:N, uniform:LOW:HIGH, poisson:MEAN or pareto:ALPHA:MAX')
+@manager.option('-r', '--recipes', dest='recipes', default='uniform:0:20',
+                help='Recipes per category, same format as --categories')
+@manager.option('-b', '--batch-size', dest='batch_size', type=int, default=5000, help='Users per COPY batch')
+@manager.option('-s', '--seed', dest='seed', type=int, default=None, help='Random seed for repeatable data')
+@manager.option('-p', '--password', dest='password', default='password', help='Password shared by all users')
+def seed(users, categories, recipes, batch_size, seed, password):
+    """Bulk-loads synthetic users, categories and recipes for load testing"""
+    if is_sharded():
+        # COPY writes straight to one database and would bypass the user directory
+        print('Seeding is not supported with SQLALCHEMY_SHARDS, seed a single database instead')
+        return
+    totals = Seeder(db, users, categories=categories, recipes=recipes,
+                    batch_size=batch_size, seed=seed, password=password).run()
+    print('Seeded {users} users, {categories} categories and {recipes} recipes'.format(**totals))
+
+
+@manager.option('-o', '--output', dest='output', default='swagger.json', help='File to write the spec to')
+def export_spec(output):
+    """Writes swagger.json so it can be served without building it at startup"""
+    app = current_app._get_current_object()
+    with open(output, 'wb') as spec:
+        spec.write(build_spec(app, app.extensions['api']))
+    print('Wrote {}'.format(output))
+
+
+@manager.command
+def repair_counts():
+    """Recomputes the recipe counters of every category"""
+    print('Repaired {} category recipe counts'.format(Categories.repair_recipe_counts()))
+
+
+@manager.option('-d', '--directory', dest='directory', default=None, help='Profiles directory, PROFILE_DIR by default')
+@manager.option('-n', '--limit', dest='limit', type=int, default=20, help='Number of functions to list')
+@manager.option('-e', '--endpoint', dest='endpoint', default=None, help='Only the profiles of this endpoint')
+def profile_summary(directory, limit, endpoint):
+    """Lists the slowest functions across the request profiles"""
+    directory = directory or current_app.config['PROFILE_DIR']
+    summary = summarize(directory, limit, endpoint) if os.path.isdir(directory) else None
+    print(summary or 'No profiles in {}'.format(directory))
+
+
+@manager.command
+def expire_idempotency_keys():
+    """Deletes the stored responses older than IDEMPOTENCY_TTL"""
+    deleted = IdempotencyKey.expire(current_app.config['IDEMPOTENCY_TTL'])
+    print('Deleted {} idempotency keys'.format(deleted))
+
+
+@manager.option('-c', '--concurrency', dest='concurrency', type=int, default=None,
+                help='Jobs run at once, JOBS_CONCURRENCY by default')
+@manager.option('--once', dest='once', action='store_true', default=False,
+                help='Exit once the queue is empty instead of waiting for new jobs')
+def worker(concurrency, once):
+    """Runs queued jobs such as account purges and reset mails"""
+    Worker(current_app._get_current_object(), concurrency=concurrency).run(once=once)
+
+
+@manager.option('-f', '--from-shards', dest='from_shards', type=int, required=True,
+                help='Number of shards the users are spread over now')
+def reshard(from_shards):
+    """Creates the tables of new shards and moves the users whose shard changed"""
+    moved = reshard_users(db, current_app._get_current_object(), from_shards)
+    print('Moved {} users'.format(moved))
+
+
 if __name__ == "__main__":
     manager.run()
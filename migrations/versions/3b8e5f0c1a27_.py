@@ -0,0 +1,39 @@
+"""jobs queue
+
+Revision ID: 3b8e5f0c1a27
+Revises: e7a1b94d2c60
+Create Date: 2026-10-19 20:11:52.640318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e5f0c1a27'
+down_revision = 'e7a1b94d2c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jobs',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('name', sa.String(length=64), nullable=False),
+                    sa.Column('payload', sa.Text(), nullable=False),
+                    sa.Column('status', sa.String(length=16), nullable=False),
+                    sa.Column('attempts', sa.Integer(), nullable=False),
+                    sa.Column('max_attempts', sa.Integer(), nullable=False),
+                    sa.Column('run_at', sa.DateTime(), nullable=False),
+                    sa.Column('last_error', sa.String(length=500), nullable=True),
+                    sa.Column('user_id', sa.Integer(), nullable=True),
+                    sa.Column('date_created', sa.DateTime(), nullable=True),
+                    sa.Column('date_modified', sa.DateTime(), nullable=True),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ix_jobs_status_run_at', 'jobs', ['status', 'run_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_status_run_at', table_name='jobs')
+    op.drop_table('jobs')
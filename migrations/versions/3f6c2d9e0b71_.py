@@ -0,0 +1,60 @@
+"""parsed recipe ingredients
+
+Revision ID: 3f6c2d9e0b71
+Revises: a44758e06964
+Create Date: 2026-10-19 11:20:37.902441
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.ingredients import parse_ingredients
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c2d9e0b71'
+down_revision = 'a44758e06964'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    recipe_ingredients = op.create_table('recipe_ingredients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=True),
+    sa.Column('unit', sa.String(length=16), nullable=True),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # backfill from the free-text column, walking recipes by id in batches
+    bind = op.get_bind()
+    recipes = sa.table('recipes', sa.column('id'), sa.column('user_id'), sa.column('ingredients'))
+    last_id = 0
+    while True:
+        batch = bind.execute(sa.select([recipes.c.id, recipes.c.user_id, recipes.c.ingredients]).
+                             where(recipes.c.id > last_id).order_by(recipes.c.id).limit(BATCH_SIZE)).fetchall()
+        if not batch:
+            break
+        rows = [{'recipe_id': recipe_id, 'user_id': user_id, 'name': name, 'quantity': quantity, 'unit': unit}
+                for recipe_id, user_id, text in batch if user_id is not None
+                for name, quantity, unit in parse_ingredients(text)]
+        if rows:
+            op.bulk_insert(recipe_ingredients, rows)
+        last_id = batch[-1][0]
+
+    # indexes are built after the backfill, which is faster than maintaining them row by row
+    op.create_index('ix_recipe_ingredients_recipe_id', 'recipe_ingredients', ['recipe_id'], unique=False)
+    op.create_index('ix_recipe_ingredients_user_id_name', 'recipe_ingredients', ['user_id', 'name'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recipe_ingredients_user_id_name', table_name='recipe_ingredients')
+    op.drop_index('ix_recipe_ingredients_recipe_id', table_name='recipe_ingredients')
+    op.drop_table('recipe_ingredients')
@@ -0,0 +1,38 @@
+"""recipe images
+
+Revision ID: 5a7f3c9e2d41
+Revises: 9d2c4e7b5f13
+Create Date: 2026-10-19 23:05:44.271603
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7f3c9e2d41'
+down_revision = '9d2c4e7b5f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recipe_images',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('recipe_id', sa.Integer(), nullable=False),
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('key', sa.String(length=128), nullable=False),
+                    sa.Column('content_type', sa.String(length=32), nullable=False),
+                    sa.Column('size', sa.Integer(), nullable=False),
+                    sa.Column('digest', sa.String(length=40), nullable=False),
+                    sa.Column('has_thumbnail', sa.Boolean(), server_default=sa.false(), nullable=False),
+                    sa.Column('date_created', sa.DateTime(), nullable=True),
+                    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('recipe_id')
+                    )
+
+
+def downgrade():
+    op.drop_table('recipe_images')
@@ -0,0 +1,26 @@
+"""categories.recipe_count
+
+Revision ID: 691e2f658fa9
+Revises: 3f6c2d9e0b71
+Create Date: 2026-10-19 12:05:52.417730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '691e2f658fa9'
+down_revision = '3f6c2d9e0b71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('categories', sa.Column('recipe_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute('UPDATE categories SET recipe_count = '
+               '(SELECT count(*) FROM recipes WHERE recipes.category_id = categories.id)')
+
+
+def downgrade():
+    op.drop_column('categories', 'recipe_count')
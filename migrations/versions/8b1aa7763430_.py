@@ -0,0 +1,35 @@
+"""cascade deletes in the database
+
+Revision ID: 8b1aa7763430
+Revises: a84559eebb78
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1aa7763430'
+down_revision = 'a84559eebb78'
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = [
+    # (constraint, table, column, referred table)
+    ('categories_user_id_fkey', 'categories', 'user_id', 'users'),
+    ('recipes_category_id_fkey', 'recipes', 'category_id', 'categories'),
+    ('recipes_user_id_fkey', 'recipes', 'user_id', 'users'),
+]
+
+
+def upgrade():
+    for name, table, column, referred in FOREIGN_KEYS:
+        op.execute('ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}'.format(table, name))
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    for name, table, column, referred in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'])
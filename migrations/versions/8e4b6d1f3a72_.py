@@ -0,0 +1,51 @@
+"""recipe time in minutes
+
+Revision ID: 8e4b6d1f3a72
+Revises: 5a7f3c9e2d41
+Create Date: 2026-10-19 23:48:12.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.durations import parse_minutes
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b6d1f3a72'
+down_revision = '5a7f3c9e2d41'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.add_column('recipes', sa.Column('time_minutes', sa.Integer(), nullable=True))
+
+    # backfill from the free-text column, walking recipes by id in batches
+    bind = op.get_bind()
+    recipes = sa.table('recipes', sa.column('id'), sa.column('time'), sa.column('time_minutes'))
+    update = recipes.update().where(recipes.c.id == sa.bindparam('recipe_id')).\
+        values(time_minutes=sa.bindparam('minutes'))
+    last_id = 0
+    while True:
+        batch = bind.execute(sa.select([recipes.c.id, recipes.c.time]).
+                             where(recipes.c.id > last_id).order_by(recipes.c.id).limit(BATCH_SIZE)).fetchall()
+        if not batch:
+            break
+        rows = [{'recipe_id': recipe_id, 'minutes': parse_minutes(time)} for recipe_id, time in batch]
+        rows = [row for row in rows if row['minutes'] is not None]
+        if rows:
+            bind.execute(update, rows)
+        last_id = batch[-1][0]
+
+    # indexes are built after the backfill, which is faster than maintaining them row by row
+    op.create_index('ix_recipes_category_id_time_minutes', 'recipes', ['category_id', 'time_minutes'], unique=False)
+    op.create_index('ix_recipes_category_id_date_created', 'recipes', ['category_id', 'date_created'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recipes_category_id_date_created', table_name='recipes')
+    op.drop_index('ix_recipes_category_id_time_minutes', table_name='recipes')
+    op.drop_column('recipes', 'time_minutes')
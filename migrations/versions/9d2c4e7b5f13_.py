@@ -0,0 +1,34 @@
+"""idempotency keys
+
+Revision ID: 9d2c4e7b5f13
+Revises: 3b8e5f0c1a27
+Create Date: 2026-10-19 21:37:05.118940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2c4e7b5f13'
+down_revision = '3b8e5f0c1a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('idempotency_keys',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('key', sa.String(length=64), nullable=False),
+                    sa.Column('fingerprint', sa.String(length=40), nullable=False),
+                    sa.Column('status_code', sa.Integer(), nullable=True),
+                    sa.Column('body', sa.Text(), nullable=True),
+                    sa.Column('date_created', sa.DateTime(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('user_id', 'key', name='ux_idempotency_keys_user_id_key')
+                    )
+
+
+def downgrade():
+    op.drop_table('idempotency_keys')
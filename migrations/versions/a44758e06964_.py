@@ -0,0 +1,24 @@
+"""users.is_active for account deletion
+
+Revision ID: a44758e06964
+Revises: 8b1aa7763430
+Create Date: 2026-10-19 10:02:11.540319
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a44758e06964'
+down_revision = '8b1aa7763430'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'is_active')
@@ -0,0 +1,29 @@
+"""shared ids of categories, recipes and images for sharding
+
+Revision ID: b6e2f48a1c93
+Revises: 8e4b6d1f3a72
+Create Date: 2026-10-20 10:12:41.268305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e2f48a1c93'
+down_revision = '8e4b6d1f3a72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # only the sequence is used, `manage.py reshard` moves it past the ids already given out
+    op.create_table('shared_ids',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'),
+                    sqlite_autoincrement=True
+                    )
+
+
+def downgrade():
+    op.drop_table('shared_ids')
@@ -0,0 +1,31 @@
+"""unique lower(name) and lower(email) indexes
+
+Revision ID: c52e8b7f13d4
+Revises: 691e2f658fa9
+Create Date: 2026-10-19 16:02:11.384215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e8b7f13d4'
+down_revision = '691e2f658fa9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # fails if duplicates that only differ by case already exist, they have to be renamed first
+    op.create_index('ux_users_lower_email', 'users', [sa.text('lower(email)')], unique=True)
+    op.create_index('ux_categories_user_id_lower_name', 'categories',
+                    ['user_id', sa.text('lower(name)')], unique=True)
+    op.create_index('ux_recipes_category_id_lower_name', 'recipes',
+                    ['category_id', sa.text('lower(name)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('ux_recipes_category_id_lower_name', table_name='recipes')
+    op.drop_index('ux_categories_user_id_lower_name', table_name='categories')
+    op.drop_index('ux_users_lower_email', table_name='users')
@@ -0,0 +1,33 @@
+"""user directory for sharding and the owner of revoked tokens
+
+Revision ID: e7a1b94d2c60
+Revises: c52e8b7f13d4
+Create Date: 2026-10-19 18:24:37.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a1b94d2c60'
+down_revision = 'c52e8b7f13d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_directory',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('email', sa.String(length=40), nullable=False),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ux_user_directory_lower_email', 'user_directory', [sa.text('lower(email)')], unique=True)
+    # tokens revoked before this revision have no owner, `manage.py reshard` reads it from the token
+    op.add_column('blacklist', sa.Column('user_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('blacklist', 'user_id')
+    op.drop_index('ux_user_directory_lower_email', table_name='user_directory')
+    op.drop_table('user_directory')
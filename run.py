@@ -1,6 +1,8 @@
-from app.views import app
+import os
+from app import create_app
+
+app = create_app(os.getenv('APP_SETTINGS'))
 
 if __name__ == '__main__':
 
     app.run()
-
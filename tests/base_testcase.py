@@ -1,13 +1,16 @@
 import unittest
 import json
 import jwt
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
-from app import app, db
+from sqlalchemy import event
+
+from app import create_app, db
+from app.sharding import shard_engines
 
 from app.models import Users
 
-from instance.config import app_config
 from faker import Faker
 
 
@@ -15,16 +18,16 @@ class BaseTestCase(unittest.TestCase):
     """Base test case class."""
 
     def setUp(self):
-        self.app = app.config.from_object(app_config['testing'])
+        self.app = create_app('testing')
         self.fake = Faker()
-        self.client = app.test_client
+        self.client = self.app.test_client
         self.user = {'email': self.fake.email(), 'username': self.fake.name(), 'password':  self.fake.name()}
         self.category = {'name': 'nametrf', 'desc': 'description'}
         self.recipe = {'name': 'meat pie', 'time': '1 hour',
                        'ingredients': '1 tbsp powder', 'procedure': 'stir'}
         self.wrong_user = {'name': 'testuser_wrong', 'email': self.fake.email(),
                            'password': 'testuser_wrong'}
-        with app.app_context():
+        with self.app.app_context():
 
             db.create_all()
             user = Users(username="test_user", email=self.fake.email(), password="test_password")
@@ -32,12 +35,15 @@ class BaseTestCase(unittest.TestCase):
             db.session.commit()
 
     def tearDown(self):
-        db.session.remove()
-        db.drop_all()
-        db.session.commit()
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.session.commit()
+        # every test builds its own app and engines, their pooled connections are closed here
+        for engine in shard_engines(db, self.app):
+            engine.dispose()
 
-    @staticmethod
-    def generate_token(email):
+    def generate_token(self, email):
         """Generates access token for a user"""
         # set up a payload with an expiration time
         # iat - issued at
@@ -52,12 +58,28 @@ class BaseTestCase(unittest.TestCase):
         # create the byte string token using the payload and the SECRET
         jwt_token = jwt.encode(
             payload,
-            app.config.get('SECRET_KEY'),
+            self.app.config.get('SECRET_KEY'),
             algorithm='HS256'
         )
 
         return jwt_token
 
+    @contextmanager
+    def count_queries(self):
+        """Collects the SQL statements run inside the block"""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
     def authenticate(self):
         self.client().post('api/v1/auth/register', data=self.user)
         result = self.client().post('api/v1/auth/login', data=self.user)
@@ -0,0 +1,61 @@
+import unittest
+
+from flask import json
+
+from tests.base_testcase import BaseTestCase
+
+
+class BatchTestCase(BaseTestCase):
+    """Tests for running several requests in one round trip"""
+
+    def batch(self, requests, jwt_token=None):
+        if jwt_token is None:
+            jwt_token = json.loads(self.authenticate().data.decode())['jwt_token']
+        return self.client().post('api/v1/batch', headers=dict(Authorization="Bearer " + jwt_token),
+                                  data=json.dumps({'requests': requests}), content_type='application/json')
+
+    def test_batch_runs_every_request(self):
+        """Test sub-requests run in order and their responses come back together"""
+        result = self.batch([
+            {'method': 'POST', 'path': '/category', 'body': self.category},
+            {'method': 'POST', 'path': '/category/1/recipes', 'body': self.recipe},
+            {'method': 'GET', 'path': '/category?limit=2'},
+            {'method': 'GET', 'path': '/category/1/recipes?fields=name'},
+            {'method': 'GET', 'path': '/category/99'},
+        ])
+        self.assertEqual(result.status_code, 200)
+        responses = json.loads(result.data.decode())['responses']
+        self.assertEqual([response['status'] for response in responses], [201, 201, 200, 200, 404])
+        self.assertIn('Meat Pie', json.dumps(responses[3]['body']))
+
+    def test_batch_reads_its_own_writes(self):
+        """Test a GET after a PATCH in the same batch sees the new values"""
+        result = self.batch([
+            {'method': 'POST', 'path': '/category', 'body': self.category},
+            {'method': 'POST', 'path': '/category/1/recipes', 'body': self.recipe},
+            {'method': 'GET', 'path': '/category/1/recipes/1'},
+            {'method': 'PATCH', 'path': '/category/1/recipes/1', 'body': {'time': '2 hours'}},
+            {'method': 'GET', 'path': '/category/1/recipes/1'},
+        ])
+        responses = json.loads(result.data.decode())['responses']
+        self.assertEqual([response['status'] for response in responses], [201, 201, 200, 200, 200])
+        self.assertEqual(responses[4]['body']['recipes']['time'], '2 hours')
+
+    def test_batch_validation_errors(self):
+        """Test the sub-request cap and nested batches are rejected"""
+        result = self.batch([{'path': '/category'}] * (self.app.config['BATCH_MAX_REQUESTS'] + 1))
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("at most", str(result.data))
+        result = self.batch([{'method': 'POST', 'path': '/batch'}])
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("Batches cannot be nested", str(result.data))
+
+    def test_batch_requires_login(self):
+        """Test a batch without a valid token is rejected before any sub-request runs"""
+        result = self.client().post('api/v1/batch', data=json.dumps({'requests': [{'path': '/category'}]}),
+                                    content_type='application/json')
+        self.assertEqual(result.status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
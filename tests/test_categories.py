@@ -1,4 +1,5 @@
 from flask import json
+from app.models import Recipes
 from tests.base_testcase import BaseTestCase
 
 
@@ -201,6 +202,27 @@ class CategoriesTestCase(BaseTestCase):
             )
         self.assertEqual(result.status_code, 404)
 
+    def test_edit_category_of_another_user(self):
+        """Test a user cannot edit a category they do not own"""
+        result = self.create_category()
+        self.assertEqual(result.status_code, 201)
+
+        other = dict(self.user, email='other@mail.com')
+        self.client().post('api/v1/auth/register', data=other)
+        result = self.client().post('api/v1/auth/login', data=other)
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+
+        result = self.client().put(
+            'api/v1/category/1',
+            headers=dict(Authorization="Bearer " + jwt_token),
+            data={'name': 'taken', 'desc': 'taken'})
+        self.assertEqual(result.status_code, 404)
+
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        result = self.client().get('api/v1/category/1', headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertNotIn('Taken', str(result.data))
+
     def test_category_deletion(self):
         """Test category can be deleted"""
         result = self.authenticate()
@@ -215,6 +237,19 @@ class CategoriesTestCase(BaseTestCase):
             headers=dict(Authorization="Bearer " + jwt_token), )
         self.assertEqual(result.status_code, 200)
 
+    def test_category_deletion_removes_recipes(self):
+        """Test deleting a category deletes its recipes in the database"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+
+        result = self.client().delete(
+            'api/v1/category/1',
+            headers=dict(Authorization="Bearer " + jwt_token), )
+        self.assertEqual(result.status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(Recipes.query.filter_by(category_id=1).count(), 0)
+
     def test_delete_non_existing_category(self):
         """Test deletion of non existing category"""
         result = self.authenticate()
@@ -316,3 +351,138 @@ class CategoriesTestCase(BaseTestCase):
         )
         self.assertEqual(result.status_code, 400)
         self.assertIn('Limit number must be a positive integer!!', str(result.data))
+
+    def test_summary_view(self):
+        """Test view=summary only returns the summary fields"""
+        result = self.authenticate()
+        self.create_category()
+
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+
+        result = self.client().get(
+            'api/v1/category?view=summary',
+            headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+        categories = json.loads(result.data.decode())[1]
+        self.assertEqual(sorted(categories[0].keys()), ['id', 'name', 'recipe_count'])
+
+    def test_sparse_fields(self):
+        """Test fields= returns the requested fields and the id"""
+        result = self.authenticate()
+        self.create_category()
+
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+
+        result = self.client().get(
+            'api/v1/category/1?fields=desc',
+            headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+        category = json.loads(result.data.decode())['category']
+        self.assertEqual(category, {'id': 1, 'desc': 'description'})
+
+    def test_unknown_fields(self):
+        """Test fields= with an unknown field"""
+        result = self.authenticate()
+        self.create_category()
+
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+
+        result = self.client().get(
+            'api/v1/category?fields=name,password',
+            headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("Unknown field(s): password", str(result.data))
+
+    def test_expand_recipes(self):
+        """Test expand=recipes embeds the newest recipes of each category"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_category()
+        for name in ('pancakes', 'omelette', 'waffles'):
+            self.client().post('api/v1/category/1/recipes', headers=dict(Authorization="Bearer " + jwt_token),
+                               data={'name': name, 'time': '10 minutes', 'ingredients': 'eggs',
+                                     'procedure': 'cook'})
+
+        result = self.client().get(
+            'api/v1/category?expand=recipes&per_category=2',
+            headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+        recipes = json.loads(result.data.decode())[1][0]['recipes']
+        self.assertEqual([recipe['name'] for recipe in recipes], ['Waffles', 'Omelette'])
+        self.assertEqual(sorted(recipes[0].keys()), ['category_id', 'id', 'name', 'time'])
+
+    def test_expand_recipes_of_empty_category(self):
+        """Test expand=recipes on a category without recipes"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_category()
+
+        result = self.client().get(
+            'api/v1/category?expand=recipes',
+            headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(json.loads(result.data.decode())[1][0]['recipes'], [])
+
+    def test_expand_invalid_per_category(self):
+        """Test expand=recipes with too many recipes per category"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_category()
+
+        result = self.client().get(
+            'api/v1/category?expand=recipes&per_category=50',
+            headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("per_category must be between 1 and 10", str(result.data))
+
+    def test_patch_category(self):
+        """Test PATCH only changes the fields that were sent"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_category()
+
+        result = self.client().patch(
+            'api/v1/category/1',
+            headers=dict(Authorization="Bearer " + jwt_token),
+            data={'desc': 'Weekday dinners'})
+        self.assertEqual(result.status_code, 200)
+        category = json.loads(result.data.decode())['category']
+        self.assertEqual(category['desc'], 'weekday dinners')
+        self.assertEqual(category['name'], 'Nametrf')
+
+    def test_patch_category_of_other_user(self):
+        """Test PATCH cannot change a category the user does not own"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+
+        result = self.client().patch(
+            'api/v1/category/1',
+            headers=dict(Authorization="Bearer " + jwt_token),
+            data={'name': 'taken'})
+        self.assertEqual(result.status_code, 404)
+        self.assertIn("Category does not exist", str(result.data))
+
+    def test_patch_category_to_existing_name(self):
+        """Test PATCH to the name of another category"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_category()
+        self.client().post('api/v1/category', headers=dict(Authorization="Bearer " + jwt_token),
+                           data={'name': 'new', 'desc': 'new'})
+
+        result = self.client().patch(
+            'api/v1/category/2',
+            headers=dict(Authorization="Bearer " + jwt_token),
+            data={'name': 'NAMETRF'})
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("Category already exists", str(result.data))
+
+    def test_patch_without_fields(self):
+        """Test PATCH without any field"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_category()
+
+        result = self.client().patch('api/v1/category/1', headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("Nothing to update", str(result.data))
@@ -0,0 +1,55 @@
+import gzip
+import io
+
+from flask import json
+from tests.base_testcase import BaseTestCase
+
+
+class CompressionTestCase(BaseTestCase):
+    """Tests for negotiated response compression"""
+
+    def test_gzip_response(self):
+        """Test JSON responses are gzipped when the client accepts it"""
+        result = self.authenticate()
+        headers = dict(Authorization="Bearer " + json.loads(result.data.decode())['jwt_token'])
+        self.create_recipe()
+        for name in ('stew', 'soup', 'salad', 'bread'):
+            self.client().post('api/v1/category/1/recipes', headers=headers,
+                               data={'name': name, 'time': '1 hour', 'ingredients': 'salt', 'procedure': 'mix'})
+
+        plain = self.client().get('api/v1/category/1/recipes', headers=headers)
+        result = self.client().get('api/v1/category/1/recipes', headers=dict(headers, **{'Accept-Encoding': 'gzip'}))
+
+        self.assertEqual(result.headers.get('Content-Encoding'), 'gzip')
+        self.assertIn('Accept-Encoding', result.headers.get('Vary'))
+        body = gzip.GzipFile(fileobj=io.BytesIO(result.data)).read()
+        self.assertEqual(body, plain.data)
+        self.assertLess(len(result.data), len(plain.data))
+
+    def test_compressed_body_is_reused(self):
+        """Test a repeated response is served from the compressed cache"""
+        compress = self.app.extensions['compress']
+        first = self.client().get('api/v1/swagger.json', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(len(compress.cache), 1)
+
+        calls = []
+        stream = compress.stream
+        compress.stream = lambda chunks, encoding: calls.append(encoding) or stream(chunks, encoding)
+        second = self.client().get('api/v1/swagger.json', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(calls, [])
+        self.assertEqual(first.data, second.data)
+
+    def test_small_response_is_not_compressed(self):
+        """Test responses below the minimum size are sent as is"""
+        result = self.client().get('api/v1/category', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(result.status_code, 403)
+        self.assertIsNone(result.headers.get('Content-Encoding'))
+        self.assertIn("Unauthorized", json.loads(result.data.decode())['message'])
+
+    def test_no_accept_encoding(self):
+        """Test responses are not compressed without Accept-Encoding"""
+        result = self.client().get('api/v1/swagger.json')
+
+        self.assertIsNone(result.headers.get('Content-Encoding'))
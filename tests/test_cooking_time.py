@@ -0,0 +1,101 @@
+import unittest
+
+from flask import json
+
+from app.durations import parse_minutes
+from tests.base_testcase import BaseTestCase
+
+
+class DurationParserTestCase(unittest.TestCase):
+    """Tests for parsing free-text cooking times"""
+
+    def test_parse_minutes(self):
+        """Test hours, minutes and bare numbers are added up"""
+        self.assertEqual(parse_minutes('1 hour'), 60)
+        self.assertEqual(parse_minutes('1 hour 30 minutes'), 90)
+        self.assertEqual(parse_minutes('1h30m'), 90)
+        self.assertEqual(parse_minutes('1.5 hours'), 90)
+        self.assertEqual(parse_minutes('45'), 45)
+
+    def test_ranges_use_their_upper_end(self):
+        """Test '20-30 minutes' is read as 30"""
+        self.assertEqual(parse_minutes('20-30 minutes'), 30)
+        self.assertEqual(parse_minutes('1 to 2 hours'), 120)
+        self.assertEqual(parse_minutes('30 minutes to 1 hour'), 60)
+        self.assertEqual(parse_minutes('1 hour - 1 hour 30 minutes'), 90)
+
+    def test_unreadable_times(self):
+        """Test times without a number or with an unknown unit give None"""
+        self.assertIsNone(parse_minutes('overnight'))
+        self.assertIsNone(parse_minutes('2 eggs'))
+        self.assertIsNone(parse_minutes(None))
+
+
+class CookingTimeTestCase(BaseTestCase):
+    """Tests for the time_minutes of recipes and the listing filters and sorts"""
+
+    def add_recipes(self):
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+        for name, time in (('salad', '15 minutes'), ('stew', '2 hours'), ('bread', 'overnight')):
+            self.client().post('api/v1/category/1/recipes', headers=dict(Authorization="Bearer " + jwt_token),
+                               data={'name': name, 'time': time, 'ingredients': 'salt', 'procedure': 'mix'})
+        return jwt_token
+
+    def names(self, jwt_token, arguments):
+        result = self.client().get('api/v1/category/1/recipes?fields=name,time_minutes&' + arguments,
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+        return [recipe['name'] for recipe in json.loads(result.data.decode())[1]]
+
+    def test_time_minutes_follows_time(self):
+        """Test time_minutes is parsed on create, PUT and PATCH"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+
+        result = self.client().get('api/v1/category/1/recipes/1', headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(json.loads(result.data.decode())['recipes']['time_minutes'], 60)
+
+        self.client().put('api/v1/category/1/recipes/1', headers=dict(Authorization="Bearer " + jwt_token),
+                          data=dict(self.recipe, time='45 minutes'))
+        result = self.client().get('api/v1/category/1/recipes/1', headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(json.loads(result.data.decode())['recipes']['time_minutes'], 45)
+
+        result = self.client().patch('api/v1/category/1/recipes/1', headers=dict(Authorization="Bearer " + jwt_token),
+                                     data={'time': '2 hours'})
+        self.assertEqual(json.loads(result.data.decode())['recipe']['time_minutes'], 120)
+
+    def test_time_range(self):
+        """Test min_time and max_time leave out recipes outside the range"""
+        jwt_token = self.add_recipes()
+
+        self.assertEqual(self.names(jwt_token, 'max_time=60&sort=time'), ['Salad', 'Meat Pie'])
+        self.assertEqual(self.names(jwt_token, 'min_time=61'), ['Stew'])
+
+        result = self.client().get('api/v1/category/1/recipes?q=e&max_time=60',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual([recipe['name'] for recipe in json.loads(result.data.decode())['recipes']], ['Meat Pie'])
+
+    def test_sorts(self):
+        """Test recipes can be sorted by time, name and date_created"""
+        jwt_token = self.add_recipes()
+
+        self.assertEqual(self.names(jwt_token, 'sort=time'), ['Salad', 'Meat Pie', 'Stew', 'Bread'])
+        self.assertEqual(self.names(jwt_token, 'sort=name'), ['Bread', 'Meat Pie', 'Salad', 'Stew'])
+        self.assertEqual(self.names(jwt_token, 'sort=-name'), ['Stew', 'Salad', 'Meat Pie', 'Bread'])
+        self.assertEqual(len(self.names(jwt_token, 'sort=date_created')), 4)
+
+    def test_invalid_sort_and_range(self):
+        """Test unknown sorts and negative times are refused"""
+        jwt_token = self.add_recipes()
+
+        result = self.client().get('api/v1/category/1/recipes?sort=ingredients',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 400)
+        self.assertIn('Invalid sort', str(result.data))
+
+        result = self.client().get('api/v1/category/1/recipes?max_time=-5',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 400)
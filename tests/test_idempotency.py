@@ -0,0 +1,50 @@
+import unittest
+
+from flask import json
+
+from app.models import Categories, IdempotencyKey
+from tests.base_testcase import BaseTestCase
+
+
+class IdempotencyTestCase(BaseTestCase):
+    """Tests for replaying POST requests sent with an Idempotency-Key"""
+
+    def setUp(self):
+        super(IdempotencyTestCase, self).setUp()
+        self.jwt_token = json.loads(self.authenticate().data.decode())['jwt_token']
+
+    def post(self, key, data):
+        return self.client().post('api/v1/category', data=data,
+                                  headers={'Authorization': "Bearer " + self.jwt_token, 'Idempotency-Key': key})
+
+    def test_retry_replays_first_response(self):
+        """Test a retry gets the first response back instead of 'Category already exists'"""
+        first = self.post('abc-1', self.category)
+        self.assertEqual(first.status_code, 201)
+        with self.count_queries() as statements:
+            retry = self.post('abc-1', self.category)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(json.loads(retry.data.decode()), json.loads(first.data.decode()))
+        self.assertFalse([statement for statement in statements if 'categories' in statement])
+        with self.app.app_context():
+            self.assertEqual(Categories.query.count(), 1)
+
+    def test_key_reused_for_another_request(self):
+        """Test a key cannot be reused with a different body"""
+        self.post('abc-2', self.category)
+        result = self.post('abc-2', {'name': 'other', 'desc': 'description'})
+        self.assertEqual(result.status_code, 422)
+
+    def test_expired_keys_run_again(self):
+        """Test a key past its TTL is forgotten"""
+        self.post('abc-3', self.category)
+        with self.app.app_context():
+            self.assertEqual(IdempotencyKey.expire(-1), 1)
+        result = self.post('abc-3', self.category)
+        self.assertEqual(result.status_code, 400)
+        self.assertIn("Category already exists", str(result.data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import struct
+import unittest
+import zlib
+
+from flask import json
+
+from tests.base_testcase import BaseTestCase
+
+
+def png(width=4, height=4):
+    """A valid grey PNG image"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+    rows = b''.join(b'\x00' + b'\x80' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+class RecipeImageTestCase(BaseTestCase):
+    """Tests for recipe image uploads and downloads"""
+
+    def setUp(self):
+        super(RecipeImageTestCase, self).setUp()
+        shutil.rmtree(self.app.config['IMAGE_DIR'], ignore_errors=True)
+        self.create_recipe()
+        result = self.client().post('api/v1/auth/login', data=self.user)
+        self.headers = dict(Authorization="Bearer " + json.loads(result.data.decode())['jwt_token'])
+        self.url = 'api/v1/category/1/recipes/1/image'
+        self.image = png()
+
+    def tearDown(self):
+        shutil.rmtree(self.app.config['IMAGE_DIR'], ignore_errors=True)
+        super(RecipeImageTestCase, self).tearDown()
+
+    def upload(self, data, content_type='image/png'):
+        return self.client().put(self.url, headers=self.headers, data=data, content_type=content_type)
+
+    def test_upload_and_download(self):
+        """Test an uploaded image is served back with cache headers"""
+        result = self.upload(self.image)
+        self.assertEqual(result.status_code, 201)
+        self.assertEqual(json.loads(result.data.decode())['image']['size'], len(self.image))
+
+        result = self.client().get(self.url, headers=self.headers)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.data, self.image)
+        self.assertEqual(result.mimetype, 'image/png')
+        self.assertIn('max-age=31536000', result.headers['Cache-Control'])
+
+        result = self.client().get(self.url, headers=dict(self.headers, **{'If-None-Match': result.headers['ETag']}))
+        self.assertEqual(result.status_code, 304)
+
+    def test_range_download(self):
+        """Test part of an image can be downloaded"""
+        self.upload(self.image)
+        result = self.client().get(self.url, headers=dict(self.headers, Range='bytes=0-7'))
+        self.assertEqual(result.status_code, 206)
+        self.assertEqual(result.data, self.image[:8])
+
+    def test_invalid_uploads(self):
+        """Test other file types, files that are not images and large files are rejected"""
+        self.assertEqual(self.upload(b'hello', content_type='text/plain').status_code, 415)
+        self.assertEqual(self.upload(b'not a png at all').status_code, 415)
+        self.app.config['IMAGE_MAX_SIZE'] = 10
+        self.assertEqual(self.upload(self.image).status_code, 413)
+        self.assertEqual(self.client().get(self.url, headers=self.headers).status_code, 404)
+
+    def test_deleting_the_recipe_deletes_the_file(self):
+        """Test the stored file goes away with its recipe"""
+        self.upload(self.image)
+        # files are kept per user, the user of BaseTestCase.setUp comes first
+        directory = os.path.join(self.app.config['IMAGE_DIR'], '2')
+        self.assertTrue(os.listdir(directory))
+        self.client().delete('api/v1/category/1/recipes/1', headers=self.headers)
+        self.assertEqual(os.listdir(directory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
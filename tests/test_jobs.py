@@ -0,0 +1,83 @@
+import unittest
+from datetime import datetime
+
+from flask import json
+
+from app import db
+from app.jobs import task, enqueue, Worker
+from app.models import Jobs
+from tests.base_testcase import BaseTestCase
+
+calls = []
+
+
+@task('test_record')
+def record(value):
+    calls.append(value)
+
+
+@task('test_fail')
+def fail():
+    raise ValueError('broken')
+
+
+class JobsTestCase(BaseTestCase):
+    """Tests for the queue of deferred work"""
+
+    def setUp(self):
+        super(JobsTestCase, self).setUp()
+        del calls[:]
+        self.app.config['JOBS_EAGER'] = False
+
+    def test_account_deletion_job_status(self):
+        """Test the purge job of a deleted account can be polled with the returned token"""
+        self.app.config['JOBS_EAGER'] = True
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        result = self.client().delete('api/v1/auth/account', headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 202)
+
+        token = json.loads(result.data.decode())['job']
+        result = self.client().get('api/v1/jobs/{}'.format(token))
+        self.assertEqual(result.status_code, 200)
+        job = json.loads(result.data.decode())['job']
+        self.assertEqual((job['name'], job['state']), ('purge_account', 'done'))
+
+    def test_job_status_with_invalid_token(self):
+        """Test a forged job token is rejected"""
+        result = self.client().get('api/v1/jobs/1')
+        self.assertEqual(result.status_code, 404)
+
+    def test_worker_runs_queued_jobs(self):
+        """Test queued jobs wait for a worker, which runs them once"""
+        with self.app.app_context():
+            enqueue('test_record', {'value': 1})
+            enqueue('test_record', {'value': 2})
+            self.assertEqual(calls, [])
+        Worker(self.app, concurrency=2).run(once=True)
+        self.assertEqual(sorted(calls), [1, 2])
+        with self.app.app_context():
+            self.assertEqual([job.status for job in Jobs.query.all()], ['done', 'done'])
+
+    def test_failed_job_is_retried_then_given_up(self):
+        """Test a failing job is retried with a backoff until it runs out of attempts"""
+        self.app.config['JOBS_MAX_ATTEMPTS'] = 2
+        with self.app.app_context():
+            job_id = enqueue('test_fail', {}).id
+        Worker(self.app, concurrency=1).run(once=True)
+        with self.app.app_context():
+            job = Jobs.query.get(job_id)
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+            self.assertIn('broken', job.last_error)
+            self.assertGreater(job.run_at, datetime.utcnow())
+            # make the retry due right away
+            job.run_at = datetime.utcnow()
+            db.session.commit()
+        Worker(self.app, concurrency=1).run(once=True)
+        with self.app.app_context():
+            job = Jobs.query.get(job_id)
+            self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from tests.base_testcase import BaseTestCase
+
+
+class MetricsTestCase(BaseTestCase):
+    """Tests for the Prometheus metrics endpoint"""
+
+    def test_requests_are_counted_by_route(self):
+        """Test a request shows up in the counters, latency histogram and bcrypt timings"""
+        self.create_category()
+        result = self.client().get('/metrics')
+        self.assertEqual(result.status_code, 200)
+        self.assertIn('text/plain', result.headers['Content-Type'])
+        body = result.data.decode()
+        self.assertIn('http_requests_total{method="POST",namespace="category",route="/api/v1/category",'
+                      'status="201"}', body)
+        self.assertIn('http_request_duration_seconds_bucket{le="0.005",method="POST",namespace="auth",'
+                      'route="/api/v1/auth/register"}', body)
+        self.assertIn('bcrypt_duration_seconds_count{operation="check"}', body)
+        self.assertIn('db_query_duration_seconds_count{namespace="category"}', body)
+
+    def test_unknown_urls_share_a_label(self):
+        """Test 404s are labelled unmatched instead of by url"""
+        self.client().get('/api/v1/nowhere/12')
+        body = self.client().get('/metrics').data.decode()
+        self.assertIn('route="unmatched",status="404"', body)
+        self.assertNotIn('/api/v1/nowhere', body)
+
+    def test_failed_statements_leave_no_timing_behind(self):
+        """Test a statement rejected by the database is timed and taken off the stack"""
+        with self.app.app_context():
+            with db.engine.connect() as connection:
+                self.assertRaises(DBAPIError, connection.execute, 'SELECT * FROM nowhere')
+                self.assertEqual(connection.info.get('metrics_started'), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from flask import json
+
+from tests.base_testcase import BaseTestCase
+
+
+class OwnershipTestCase(BaseTestCase):
+    """Tests for the cached category ownership checks"""
+
+    def setUp(self):
+        super(OwnershipTestCase, self).setUp()
+        self.create_recipe()
+        result = self.client().post('api/v1/auth/login', data=self.user)
+        self.headers = dict(Authorization="Bearer " + json.loads(result.data.decode())['jwt_token'])
+        self.app.extensions['ownership'].ttl = 60
+
+    def ownership_queries(self, statements):
+        return [statement for statement in statements if 'FROM categories' in statement]
+
+    def test_owner_is_cached_between_requests(self):
+        """Test the second recipe request skips the category lookup"""
+        self.client().get('api/v1/category/1/recipes/1', headers=self.headers)
+        with self.count_queries() as statements:
+            result = self.client().get('api/v1/category/1/recipes/1', headers=self.headers)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(self.ownership_queries(statements), [])
+
+    def test_deleted_category_is_forgotten(self):
+        """Test a deleted category is no longer accepted"""
+        self.client().get('api/v1/category/1/recipes/1', headers=self.headers)
+        self.client().delete('api/v1/category/1', headers=self.headers)
+        result = self.client().post('api/v1/category/1/recipes', headers=self.headers, data=self.recipe)
+        self.assertEqual(result.status_code, 404)
+        self.assertIn("Category does not exist", str(result.data))
+
+    def test_batch_checks_ownership_once(self):
+        """Test the sub-requests of a batch share the ownership check"""
+        requests = [{'path': '/category/1/recipes/1'}, {'path': '/category/1/recipes/1?fields=name'}]
+        self.app.extensions['ownership'].ttl = 0
+        with self.count_queries() as statements:
+            result = self.client().post('api/v1/batch', headers=self.headers,
+                                        data=json.dumps({'requests': requests}), content_type='application/json')
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(len(self.ownership_queries(statements)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from flask import json
+from app.ingredients import parse_ingredients, normalize
+from app.models import RecipeIngredient
+from tests.base_testcase import BaseTestCase
+
+
+class IngredientParserTestCase(unittest.TestCase):
+    """Tests for parsing free-text ingredients"""
+
+    def test_parse_quantities_and_units(self):
+        """Test quantities, fractions and units are split from names"""
+        self.assertEqual(parse_ingredients('2 cups flour, 1 1/2 tsp salt; 3 eggs'),
+                         [('flour', 2.0, 'cup'), ('salt', 1.5, 'tsp'), ('egg', 3.0, None)])
+
+    def test_names_are_normalized(self):
+        """Test names are lower cased, singular and free of notes"""
+        self.assertEqual(normalize('Tomatoes (ripe)'), 'tomato')
+        self.assertEqual(normalize('berries'), 'berry')
+        self.assertEqual(normalize('asparagus'), 'asparagus')
+
+    def test_duplicates_and_blanks_are_dropped(self):
+        """Test repeated and empty items are ignored"""
+        self.assertEqual(parse_ingredients('egg, , eggs'), [('egg', None, None)])
+
+
+class PantryTestCase(BaseTestCase):
+    """Tests for finding recipes by ingredients on hand"""
+
+    def add_recipe(self, jwt_token, name, ingredients):
+        return self.client().post('api/v1/category/1/recipes', headers=dict(Authorization="Bearer " + jwt_token),
+                                  data={'name': name, 'time': '1 hour', 'ingredients': ingredients,
+                                        'procedure': 'stir'})
+
+    def test_recipes_ranked_by_coverage(self):
+        """Test recipes are ranked by the share of ingredients on hand"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_category()
+        self.add_recipe(jwt_token, 'pancakes', '2 cups flour, 2 eggs, 1 cup milk')
+        self.add_recipe(jwt_token, 'omelette', '3 eggs, 1 pinch salt')
+
+        result = self.client().get('api/v1/pantry?ingredients=egg,salt,butter',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+        recipes = json.loads(result.data.decode())['recipes']
+        self.assertEqual([recipe['name'] for recipe in recipes], ['Omelette', 'Pancakes'])
+        self.assertEqual(recipes[0]['coverage'], 1.0)
+        self.assertEqual(recipes[1]['missing'], ['flour', 'milk'])
+
+    def test_ingredients_follow_recipe_edits(self):
+        """Test editing a recipe re-parses its ingredients"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+
+        self.client().put('api/v1/category/1/recipes/1', headers=dict(Authorization="Bearer " + jwt_token),
+                          data={'name': 'meat pie', 'time': '1 hour', 'ingredients': 'beef, pastry',
+                                'procedure': 'bake'})
+        with self.app.app_context():
+            names = RecipeIngredient.names_by_recipe([1])
+        self.assertEqual(names, {1: set(['beef', 'pastry'])})
+
+    def test_no_matching_recipes(self):
+        """Test pantry search without matches"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+
+        result = self.client().get('api/v1/pantry?ingredients=caviar',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 404)
+        self.assertIn("No recipes use those ingredients", str(result.data))
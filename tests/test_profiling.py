@@ -0,0 +1,69 @@
+import os
+import shutil
+import sys
+import unittest
+
+from flask import json
+
+from app.profiling import summarize
+from tests.base_testcase import BaseTestCase
+
+
+class ProfilingTestCase(BaseTestCase):
+    """Tests for the per-request profiles"""
+
+    def setUp(self):
+        super(ProfilingTestCase, self).setUp()
+        self.directory = self.app.config['PROFILE_DIR']
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super(ProfilingTestCase, self).tearDown()
+
+    def test_request_with_token_is_profiled(self):
+        """Test a request sent with the profile token writes a profile named after its endpoint"""
+        self.client().post('api/v1/auth/register', data=self.user, headers={'X-Profile': 'profile-token'})
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertIn('-api.auth_user_registration-POST-', files[0])
+
+        summary = summarize(self.directory, limit=5)
+        self.assertIn('POST', summary)
+        self.assertIn('function calls', summary)
+
+    def test_batch_is_profiled_as_one_request(self):
+        """Test a profiled batch writes one profile, its sub-requests do not stop the profiler"""
+        jwt_token = json.loads(self.authenticate().data.decode())['jwt_token']
+        requests = [{'method': 'POST', 'path': '/category', 'body': self.category},
+                    {'method': 'GET', 'path': '/category'}]
+        result = self.client().post('api/v1/batch', data=json.dumps({'requests': requests}),
+                                    content_type='application/json',
+                                    headers={'Authorization': 'Bearer ' + jwt_token, 'X-Profile': 'profile-token'})
+        self.assertEqual(result.status_code, 200)
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertIn('-api.batch_batch-POST-', files[0])
+        self.assertIsNone(sys.getprofile())
+
+    def test_profiler_is_stopped_when_the_request_raises(self):
+        """Test a request that raised does not leave the profiler running on the thread"""
+        def broken():
+            raise RuntimeError('broken')
+        self.app.add_url_rule('/broken', 'broken', broken)
+        self.app.config['PRESERVE_CONTEXT_ON_EXCEPTION'] = False
+
+        self.assertRaises(RuntimeError, self.client().get, '/broken', headers={'X-Profile': 'profile-token'})
+        self.assertIsNone(sys.getprofile())
+
+    def test_request_with_wrong_token_is_not_profiled(self):
+        """Test requests without the right token are not profiled"""
+        self.client().post('api/v1/auth/register', data=self.user, headers={'X-Profile': 'guess'})
+        self.client().post('api/v1/auth/login', data=self.user)
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertIsNone(summarize(self.directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+from flask import json
+from tests.base_testcase import BaseTestCase
+
+
+class QueryCountTestCase(BaseTestCase):
+    """Query budgets of the write endpoints, the token check is one of them"""
+
+    def setUp(self):
+        super(QueryCountTestCase, self).setUp()
+        result = self.authenticate()
+        self.headers = dict(Authorization="Bearer " + json.loads(result.data.decode())['jwt_token'])
+
+    def assertQueries(self, statements, budget):
+        self.assertLessEqual(len(statements), budget, '\n'.join(statements))
+
+    def test_register(self):
+        """Registration is a single INSERT"""
+        with self.count_queries() as statements:
+            result = self.client().post('api/v1/auth/register', data={
+                'email': self.fake.email(), 'username': 'cook', 'password': 'password'})
+        self.assertEqual(result.status_code, 201)
+        self.assertQueries(statements, 1)
+
+    def test_create_category(self):
+        """Token check and INSERT ... RETURNING"""
+        with self.count_queries() as statements:
+            result = self.client().post('api/v1/category', headers=self.headers, data=self.category)
+        self.assertEqual(result.status_code, 201)
+        self.assertQueries(statements, 2)
+
+    def test_update_category(self):
+        """Token check, the category looked up with its owner and its UPDATE"""
+        self.client().post('api/v1/category', headers=self.headers, data=self.category)
+        with self.count_queries() as statements:
+            result = self.client().put('api/v1/category/1', headers=self.headers,
+                                       data={'name': 'new', 'desc': 'new'})
+        self.assertEqual(result.status_code, 200)
+        self.assertQueries(statements, 3)
+
+    def test_patch_category(self):
+        """Token check and UPDATE ... RETURNING"""
+        self.client().post('api/v1/category', headers=self.headers, data=self.category)
+        with self.count_queries() as statements:
+            result = self.client().patch('api/v1/category/1', headers=self.headers, data={'desc': 'new'})
+        self.assertEqual(result.status_code, 200)
+        self.assertQueries(statements, 2)
+
+    def test_create_recipe(self):
+        """Token check, category, counter, INSERT ... RETURNING and its ingredients"""
+        self.client().post('api/v1/category', headers=self.headers, data=self.category)
+        with self.count_queries() as statements:
+            result = self.client().post('api/v1/category/1/recipes', headers=self.headers, data=self.recipe)
+        self.assertEqual(result.status_code, 201)
+        self.assertQueries(statements, 5)
+
+    def test_update_recipe(self):
+        """Token check, category, recipe, UPDATE and the re-parsed ingredients"""
+        self.create_recipe()
+        with self.count_queries() as statements:
+            result = self.client().put('api/v1/category/1/recipes/1', headers=self.headers, data={
+                'name': 'stew', 'time': '2 hours', 'ingredients': 'beef', 'procedure': 'boil'})
+        self.assertEqual(result.status_code, 200)
+        self.assertQueries(statements, 6)
+
+    def test_patch_recipe(self):
+        """Token check and UPDATE ... RETURNING"""
+        self.create_recipe()
+        with self.count_queries() as statements:
+            result = self.client().patch('api/v1/category/1/recipes/1', headers=self.headers,
+                                         data={'time': '2 hours'})
+        self.assertEqual(result.status_code, 200)
+        self.assertQueries(statements, 2)
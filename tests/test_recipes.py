@@ -1,4 +1,6 @@
 from flask import json
+from app import db
+from app.models import Categories
 from tests.base_testcase import BaseTestCase
 
 
@@ -60,6 +62,16 @@ class RecipesTestCase(BaseTestCase):
         self.assertEqual(result.status_code, 401)
         self.assertIn('Recipe already exists', str(result.data))
 
+    def test_existing_recipe_leaves_recipe_count(self):
+        """Test a rejected duplicate recipe does not change the category's recipe count"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+        self.client().post('api/v1/category/1/recipes', headers=dict(Authorization="Bearer " + jwt_token),
+                           data=self.recipe)
+
+        self.assertEqual(self.recipe_count(jwt_token), 1)
+
     def test_recipe_creation_with_invalid_characters(self):
         """Test recipe can be created with invalid characters"""
 
@@ -401,3 +413,129 @@ class RecipesTestCase(BaseTestCase):
         )
         self.assertEqual(result.status_code, 400)
         self.assertIn('Limit number must be a positive integer!!', str(result.data))
+
+    def test_limit_above_maximum(self):
+        """Test api refuses a limit above MAX_PAGE_LIMIT"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+        self.app.config['MAX_PAGE_LIMIT'] = 5
+
+        result = self.client().get('api/v1/category/1/recipes?limit=6',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 400)
+        self.assertIn('Limit number must be at most 5', str(result.data))
+
+    def test_streamed_recipe_page(self):
+        """Test a streamed page has the same body as a built one"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+        self.client().post('api/v1/category/1/recipes', headers=dict(Authorization="Bearer " + jwt_token),
+                           data={'name': 'stew', 'time': '2 hours', 'ingredients': 'beef', 'procedure': 'boil'})
+        built = self.client().get('api/v1/category/1/recipes?limit=2',
+                                  headers=dict(Authorization="Bearer " + jwt_token))
+
+        self.app.config['JSON_STREAM_MIN_LIMIT'] = 2
+        result = self.client().get('api/v1/category/1/recipes?limit=2',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+        self.assertNotIn('Content-Length', result.headers)
+        self.assertEqual(json.loads(result.data.decode()), json.loads(built.data.decode()))
+
+        result = self.client().get('api/v1/category/1/recipes?limit=2&page=2',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 401)
+
+    def test_recipe_summary_view(self):
+        """Test recipe listing with view=summary leaves out ingredients and procedure"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+
+        result = self.client().get('api/v1/category/1/recipes?view=summary',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+        recipe = json.loads(result.data.decode())[1][0]
+        self.assertEqual(sorted(recipe.keys()), ['category_id', 'id', 'name', 'time'])
+
+    def test_recipe_sparse_fields(self):
+        """Test a single recipe with fields="""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+
+        result = self.client().get('api/v1/category/1/recipes/1?fields=name,ingredients',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+        recipe = json.loads(result.data.decode())['recipes']
+        self.assertEqual(recipe, {'id': 1, 'name': 'Meat Pie', 'ingredients': '1 tbsp powder'})
+
+    def recipe_count(self, jwt_token):
+        result = self.client().get('api/v1/category/1', headers=dict(Authorization="Bearer " + jwt_token))
+        return json.loads(result.data.decode())['category']['recipe_count']
+
+    def test_recipe_count_follows_inserts_and_deletes(self):
+        """Test the category recipe counter is kept up to date"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+        self.client().post('api/v1/category/1/recipes', headers=dict(Authorization="Bearer " + jwt_token),
+                           data={'name': 'stew', 'time': '2 hours', 'ingredients': 'beef', 'procedure': 'boil'})
+        self.assertEqual(self.recipe_count(jwt_token), 2)
+
+        self.client().delete('api/v1/category/1/recipes/1', headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(self.recipe_count(jwt_token), 1)
+
+    def test_repair_recipe_counts(self):
+        """Test drifted recipe counters are recomputed"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+        with self.app.app_context():
+            Categories.adjust_recipe_count(1, 5)
+            db.session.commit()
+            self.assertEqual(Categories.repair_recipe_counts(), 1)
+        self.assertEqual(self.recipe_count(jwt_token), 1)
+
+    def test_patch_recipe_ingredients(self):
+        """Test PATCH of the ingredients re-parses them"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+
+        result = self.client().patch('api/v1/category/1/recipes/1', headers=dict(Authorization="Bearer " + jwt_token),
+                                     data={'ingredients': '2 eggs, 1 cup flour'})
+        self.assertEqual(result.status_code, 200)
+        recipe = json.loads(result.data.decode())['recipe']
+        self.assertEqual(recipe['ingredients'], '2 eggs, 1 cup flour')
+        self.assertEqual(recipe['time'], '1 hour')
+
+        result = self.client().get('api/v1/pantry?ingredients=egg,flour',
+                                   headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 200)
+
+    def test_patch_recipe_to_other_category(self):
+        """Test PATCH with category_id moves the recipe and its count"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_recipe()
+        self.client().post('api/v1/category', headers=dict(Authorization="Bearer " + jwt_token),
+                           data={'name': 'new', 'desc': 'new'})
+
+        result = self.client().patch('api/v1/category/1/recipes/1', headers=dict(Authorization="Bearer " + jwt_token),
+                                     data={'category_id': 2})
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(json.loads(result.data.decode())['recipe']['category_id'], 2)
+        self.assertEqual(self.recipe_count(jwt_token), 0)
+
+    def test_patch_non_existing_recipe(self):
+        """Test PATCH of a recipe that does not exist"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.create_category()
+
+        result = self.client().patch('api/v1/category/1/recipes/5', headers=dict(Authorization="Bearer " + jwt_token),
+                                     data={'name': 'stew'})
+        self.assertEqual(result.status_code, 404)
+        self.assertIn("Recipe not found", str(result.data))
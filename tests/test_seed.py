@@ -0,0 +1,58 @@
+import random
+
+from app import db
+from app.models import Users, Categories, Recipes
+from app.seed import Seeder, parse_distribution
+from tests.base_testcase import BaseTestCase
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+class SeedTestCase(BaseTestCase):
+    """Tests for the synthetic data seeder"""
+
+    def seed(self, **kwargs):
+        with self.app.app_context():
+            return Seeder(db, 3, categories='fixed:2', recipes='fixed:4', batch_size=2,
+                          out=StringIO(), **kwargs).run()
+
+    def test_seed_creates_rows(self):
+        """Test seeder bulk loads users, categories and recipes"""
+        totals = self.seed(seed=1)
+
+        self.assertEqual(totals, {'users': 3, 'categories': 6, 'recipes': 24})
+        with self.app.app_context():
+            # one user is created by BaseTestCase.setUp
+            self.assertEqual(Users.query.count(), 4)
+            self.assertEqual(Categories.query.count(), 6)
+            self.assertEqual(Recipes.query.count(), 24)
+            self.assertEqual(Recipes.query.filter(Recipes.time_minutes.is_(None)).count(), 0)
+
+    def test_seeded_users_can_login(self):
+        """Test seeded users share the given password"""
+        self.seed(seed=1, password='secret123')
+        with self.app.app_context():
+            user = Users.query.filter(Users.email.like('%@seed.example.com')).first()
+            self.assertTrue(user.password_is_valid('secret123'))
+
+    def test_seeded_ids_continue_after_load(self):
+        """Test sequences are moved past the copied ids"""
+        self.seed(seed=1)
+        with self.app.app_context():
+            user = Users(username='after_seed', email='after@seed.com', password='password')
+            user.save()
+            self.assertEqual(user.id, 5)
+
+    def test_distributions(self):
+        """Test distribution specs are deterministic for a seed"""
+        for spec in ('fixed:3', 'uniform:1:5', 'poisson:4', 'pareto:1.5:50'):
+            sample = parse_distribution(spec)
+            first = [sample(random.Random(7)) for _ in range(5)]
+            second = [sample(random.Random(7)) for _ in range(5)]
+            self.assertEqual(first, second)
+            self.assertTrue(all(n >= 0 for n in first))
+        self.assertRaises(ValueError, parse_distribution, 'uniform:5:1')
+        self.assertRaises(ValueError, parse_distribution, 'normal:3')
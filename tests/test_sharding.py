@@ -0,0 +1,132 @@
+import os
+import unittest
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app import create_app, db
+from app.models import Users, Categories, UserDirectory, Blacklist, IdempotencyKey, SharedIds
+from app.sharding import create_shards, drop_shards, shard_engines, shard_for, reshard
+
+
+class ShardingTestCase(unittest.TestCase):
+    """Tests for users spread over several databases"""
+
+    def setUp(self):
+        self.app = create_app('sharded_testing')
+        self.client = self.app.test_client
+        self.user = {'email': 'cook@mail.com', 'username': 'cook', 'password': 'password'}
+        with self.app.app_context():
+            create_shards(db, self.app)
+            self.engines = shard_engines(db, self.app)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            drop_shards(db, self.app)
+        for engine in self.engines:
+            engine.dispose()
+        for uri in self.app.config['SQLALCHEMY_SHARDS']:
+            os.remove(uri[len('sqlite:///'):])
+
+    def register(self, email):
+        return self.client().post('api/v1/auth/register', data=dict(self.user, email=email))
+
+    def login(self, email):
+        result = self.client().post('api/v1/auth/login', data=dict(self.user, email=email))
+        return json.loads(result.data.decode())['jwt_token']
+
+    def user_ids(self, shard):
+        users = Users.__table__
+        return [row.id for row in self.engines[shard].execute(select([users.c.id]))]
+
+    def test_users_are_stored_on_their_shard(self):
+        """Test registered users land on the shard picked by their id"""
+        for number in range(6):
+            self.assertEqual(self.register('cook{}@mail.com'.format(number)).status_code, 201)
+        with self.app.app_context():
+            stored = dict((user_id, shard) for shard in range(3) for user_id in self.user_ids(shard))
+            self.assertEqual(sorted(stored), list(range(1, 7)))
+            for user_id, shard in stored.items():
+                self.assertEqual(shard, shard_for(user_id))
+
+    def test_login_and_categories_on_the_user_shard(self):
+        """Test a user found through the directory can log in and keeps their data on their shard"""
+        for number in range(3):
+            self.register('cook{}@mail.com'.format(number))
+        jwt_token = self.login('cook2@mail.com')
+        result = self.client().post('api/v1/category', headers=dict(Authorization="Bearer " + jwt_token),
+                                    data={'name': 'soups', 'desc': 'warm'})
+        self.assertEqual(result.status_code, 201)
+        result = self.client().get('api/v1/category', headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertIn('Soups', str(result.data))
+
+        categories = Categories.__table__
+        with self.app.app_context():
+            shard = shard_for(3)
+            rows = self.engines[shard].execute(select([categories.c.user_id])).fetchall()
+            self.assertEqual([row.user_id for row in rows], [3])
+
+    def test_category_ids_are_unique_across_shards(self):
+        """Test categories of users on different shards never share an id"""
+        ids = []
+        for number in range(4):
+            self.register('cook{}@mail.com'.format(number))
+            jwt_token = self.login('cook{}@mail.com'.format(number))
+            result = self.client().post('api/v1/category', headers=dict(Authorization="Bearer " + jwt_token),
+                                        data={'name': 'soups', 'desc': 'warm'})
+            ids.append(json.loads(result.data.decode())['category']['id'])
+        self.assertEqual(ids, [1, 2, 3, 4])
+
+    def test_duplicate_email_on_another_shard(self):
+        """Test an email is unique across shards, whatever its case"""
+        self.register('cook@mail.com')
+        result = self.register('COOK@mail.com')
+        self.assertEqual(result.status_code, 409)
+
+    def test_reshard_moves_users(self):
+        """Test reshard moves users and their categories from one database to the new shards"""
+        users, categories = Users.__table__, Categories.__table__
+        with self.app.app_context():
+            old = self.engines[0]
+            old.execute(users.insert(), [{'id': user_id, 'email': 'cook{}@mail.com'.format(user_id),
+                                          'username': 'cook', 'password': 'hash'} for user_id in range(1, 7)])
+            old.execute(categories.insert(), [{'name': 'soups', 'desc': 'warm', 'user_id': user_id}
+                                              for user_id in range(1, 7)])
+
+            moved = reshard(db, self.app, 1)
+            self.assertEqual(moved, len([user_id for user_id in range(1, 7) if shard_for(user_id)]))
+            self.assertEqual(reshard(db, self.app, 3), 0)
+            self.assertEqual(UserDirectory.query.count(), 6)
+            for user_id in range(1, 7):
+                engine = self.engines[shard_for(user_id)]
+                self.assertIn(user_id, [row.id for row in engine.execute(select([users.c.id]))])
+                # category user_id was inserted with id user_id and keeps it
+                rows = engine.execute(select([categories.c.id, categories.c.user_id])).fetchall()
+                self.assertIn((user_id, user_id), [tuple(row) for row in rows])
+            self.assertEqual(SharedIds.next_id(), 7)
+
+    def test_reshard_moves_revoked_tokens_and_idempotency_keys(self):
+        """Test tokens revoked before blacklist.user_id and stored responses move with their user"""
+        users, blacklist, keys = Users.__table__, Blacklist.__table__, IdempotencyKey.__table__
+        user_id = next(user_id for user_id in range(1, 20) if shard_for(user_id, 3))
+        with self.app.app_context():
+            old = self.engines[0]
+            old.execute(users.insert(), {'id': user_id, 'email': 'cook@mail.com', 'username': 'cook',
+                                         'password': 'hash'})
+            token = Users.generate_token(user_id).decode()
+            old.execute(blacklist.insert(), {'revoked_token': token, 'user_id': None})
+            old.execute(keys.insert(), {'user_id': user_id, 'key': 'retry-1', 'fingerprint': 'f' * 40,
+                                        'status_code': 201, 'body': '{}', 'date_created': datetime.utcnow()})
+
+            reshard(db, self.app, 1)
+            new = self.engines[shard_for(user_id)]
+            self.assertEqual([(row.revoked_token, row.user_id) for row in new.execute(blacklist.select())],
+                             [(token, user_id)])
+            self.assertEqual([row.key for row in new.execute(keys.select())], ['retry-1'])
+            self.assertEqual(old.execute(keys.select()).fetchall(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+from flask import json
+from tests.base_testcase import BaseTestCase
+
+
+class SpecTestCase(BaseTestCase):
+    """Tests for the cached swagger spec"""
+
+    def test_spec_is_served_with_cache_headers(self):
+        """Test swagger.json carries an ETag and long cache headers"""
+        result = self.client().get('api/v1/swagger.json')
+
+        self.assertEqual(result.status_code, 200)
+        self.assertIn('/category', json.loads(result.data.decode())['paths'])
+        self.assertTrue(result.headers.get('ETag'))
+        self.assertIn('max-age=86400', result.headers.get('Cache-Control'))
+
+    def test_spec_not_modified(self):
+        """Test swagger.json returns 304 for a matching If-None-Match"""
+        etag = self.client().get('api/v1/swagger.json').headers.get('ETag')
+
+        result = self.client().get('api/v1/swagger.json', headers={'If-None-Match': etag})
+        self.assertEqual(result.status_code, 304)
+        self.assertEqual(result.data, b'')
@@ -4,7 +4,7 @@ import jwt
 import time
 from datetime import datetime, timedelta
 
-from app import app
+from app.models import Users, Categories, IdempotencyKey
 from tests.base_testcase import BaseTestCase
 
 
@@ -27,6 +27,24 @@ class TestUserAuth(BaseTestCase):
         self.assertEqual(result.status_code, 409)
         self.assertIn("User already exists. Please login", str(result.data))
 
+    def test_registration_for_existing_email_in_other_case(self):
+        """Tests emails are unique regardless of case"""
+        self.client().post('/api/v1/auth/register', data=self.user)
+        local, domain = self.user['email'].split('@')
+        self.user['email'] = local.upper() + '@' + domain
+        result = self.client().post('/api/v1/auth/register', data=self.user)
+
+        self.assertEqual(result.status_code, 409)
+        self.assertIn("User already exists. Please login", str(result.data))
+
+    def test_login_with_email_in_other_case(self):
+        """Tests login finds the user whatever the case of the email"""
+        self.client().post('/api/v1/auth/register', data=self.user)
+        local, domain = self.user['email'].split('@')
+        result = self.client().post('/api/v1/auth/login', data=dict(self.user, email=local.upper() + '@' + domain))
+
+        self.assertEqual(result.status_code, 200)
+
     def test_registration_for_empty_fields(self):
         """Tests for registration with empty fields"""
         self.user = {'email': self.fake.email(), 'username': '', 'password': ''}
@@ -106,6 +124,41 @@ class TestUserAuth(BaseTestCase):
         self.assertIn("You logged out successfully.", str(result.data))
         self.assertEqual(result.status_code, 200)
 
+    # ENDPOINT: DELETE '/auth/account'
+    def test_account_deletion(self):
+        """Tests a user can delete their account and its data"""
+        result = self.authenticate()
+        jwt_token = json.loads(result.data.decode())['jwt_token']
+        self.client().post('api/v1/category', data=self.category,
+                           headers={'Authorization': "Bearer " + jwt_token, 'Idempotency-Key': 'first-category'})
+
+        result = self.client().delete('api/v1/auth/account', headers=dict(Authorization="Bearer " + jwt_token))
+        self.assertEqual(result.status_code, 202)
+        self.assertIn("Your account is being deleted.", str(result.data))
+
+        with self.app.app_context():
+            self.assertIsNone(Users.query.filter_by(email=self.user['email']).first())
+            self.assertEqual(Categories.query.count(), 0)
+            self.assertEqual(IdempotencyKey.query.count(), 0)
+
+    def test_account_deletion_revokes_tokens(self):
+        """Tests other tokens of a deleted account stop working"""
+        result = self.authenticate()
+        first = json.loads(result.data.decode())['jwt_token']
+        with self.app.app_context():
+            user_id = Users.query.filter_by(email=self.user['email']).first().id
+        # a token from an earlier login, which is not blacklisted
+        second = jwt.encode({'exp': datetime.utcnow() + timedelta(hours=1),
+                             'iat': datetime.utcnow() - timedelta(hours=1),
+                             'sub': user_id}, self.app.config.get('SECRET_KEY'), algorithm='HS256').decode()
+
+        self.client().delete('api/v1/auth/account', headers=dict(Authorization="Bearer " + first))
+
+        result = self.client().get('api/v1/category', headers=dict(Authorization="Bearer " + second))
+        self.assertEqual(result.status_code, 401)
+        result = self.client().post('api/v1/auth/login', data=self.user)
+        self.assertEqual(result.status_code, 401)
+
     # ENDPOINT: POST '/auth/reset-password'
     def test_reset_with_non_existing_email(self):
         """Tests reset password with non existing email"""
@@ -191,7 +244,7 @@ class TestUserAuth(BaseTestCase):
 
         jwt_token = jwt.encode(
             payload,
-            app.config.get('SECRET_KEY'),
+            self.app.config.get('SECRET_KEY'),
             algorithm='HS256'
         )
         time.sleep(2)
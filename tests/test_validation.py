@@ -0,0 +1,79 @@
+import unittest
+
+from flask import Flask, json
+from app.validation import Schema, Field, QUERY, INVALID_CHAR, EMAIL
+
+
+class ValidationTestCase(unittest.TestCase):
+    """Tests for the request validation schemas"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.schema = Schema(
+            Field('name', required=True, lower=True, max_length=10, forbid=INVALID_CHAR),
+            Field('desc', required=True, max_length=20),
+            Field('limit', type=int, locations=QUERY, default=6, minimum=1,
+                  messages={'type': "Invalid limit value!!"}),
+            empty="Name or description cannot be empty")
+
+    def load(self, partial=False, **kwargs):
+        with self.app.test_request_context('/', **kwargs):
+            return self.schema.load(partial=partial)
+
+    def test_valid_form(self):
+        """Test values are cleaned and defaults filled in"""
+        data, error = self.load(method='POST', data={'name': '  Soups ', 'desc': 'Warm'})
+        self.assertIsNone(error)
+        self.assertEqual(data, {'name': 'soups', 'desc': 'Warm', 'limit': 6})
+
+    def test_json_body_and_query_string(self):
+        """Test fields are read from a JSON body and the query string"""
+        data, error = self.load(method='POST', query_string={'limit': '2'},
+                                data=json.dumps({'name': 'soups', 'desc': 'warm'}),
+                                content_type='application/json')
+        self.assertIsNone(error)
+        self.assertEqual(data['limit'], 2)
+
+    def test_all_errors_are_collected(self):
+        """Test every invalid field is reported, the message follows the error order"""
+        data, error = self.load(method='POST', query_string={'limit': 'many'},
+                                data={'name': 'soup<s>', 'desc': ''})
+        self.assertIsNone(data)
+        self.assertEqual(error['message'], "Invalid limit value!!")
+        self.assertEqual(error['errors'], {'name': "name contains invalid characters",
+                                           'desc': "Desc cannot be empty",
+                                           'limit': "Invalid limit value!!"})
+
+    def test_schema_message_overrides_field_message(self):
+        """Test the response message of a schema wins over the field's"""
+        data, error = self.load(method='POST', data={'name': 'soups', 'desc': ' '})
+        self.assertEqual(error['message'], "Name or description cannot be empty")
+
+    def test_missing_field(self):
+        """Test a required field that was not sent"""
+        data, error = self.load(method='POST', data={'name': 'soups'})
+        self.assertEqual(error['errors'], {'desc': "Desc is required"})
+
+    def test_partial(self):
+        """Test partial loads only return and check the fields that were sent"""
+        data, error = self.load(partial=True, method='PATCH', data={'desc': 'cold'})
+        self.assertIsNone(error)
+        self.assertEqual(data, {'desc': 'cold'})
+
+    def test_docs_parser(self):
+        """Test the schema describes its fields for the API docs"""
+        arguments = dict((argument.name, argument) for argument in self.schema.parser.args)
+        self.assertEqual(arguments['limit'].location, 'args')
+        self.assertTrue(arguments['name'].required)
+
+    def test_blank_reported_with_another_code(self):
+        """Test a blank field can be reported as a pattern error, after other blank fields"""
+        self.schema = Schema(
+            Field('email', required=True, pattern=EMAIL, blank='pattern'),
+            Field('password', required=True),
+            empty="Please fill all fields", pattern="Please enter a valid email address")
+
+        data, error = self.load(method='POST', data={'email': '', 'password': 'secret'})
+        self.assertEqual(error['message'], "Please enter a valid email address")
+        data, error = self.load(method='POST', data={'email': '', 'password': ''})
+        self.assertEqual(error['message'], "Please fill all fields")